@@ -8,6 +8,9 @@ CREATE SCHEMA v1;
 
 SET search_path=v1;
 
+-- Trigram indexes for autocomplete
+CREATE EXTENSION IF NOT EXISTS pg_trgm WITH SCHEMA public;
+
 CREATE TABLE v1.accounts (
     id             UUID  PRIMARY KEY  DEFAULT uuidv7(),
     signup_at      TIMESTAMP WITH TIME ZONE  NOT NULL  DEFAULT CURRENT_TIMESTAMP,
@@ -28,6 +31,7 @@ CREATE TABLE v1.accounts (
 );
 
 CREATE UNIQUE INDEX ON v1.accounts (email);
+CREATE INDEX ON v1.accounts USING gin (display_name public.gin_trgm_ops);
 
 CREATE TYPE v1.privacy_level AS ENUM ('public', 'logged-in-only', 'friends-only', 'private');
 
@@ -37,12 +41,121 @@ CREATE TABLE IF NOT EXISTS v1.poetry (
     title          TEXT,
     created_at     DATE  DEFAULT CURRENT_DATE,
     posted_at      TIMESTAMP WITH TIME ZONE  DEFAULT CURRENT_TIMESTAMP,
+    updated_at     TIMESTAMP WITH TIME ZONE  NOT NULL  DEFAULT CURRENT_TIMESTAMP,
     language       TEXT,
     explicit       BOOLEAN,
     privacy_level  privacy_level  DEFAULT 'public',
     content        TEXT,
     notes          TEXT,
-    tags           TEXT[]
+    tags           TEXT[],
+    views          BIGINT  NOT NULL  DEFAULT 0
+);
+
+CREATE INDEX ON v1.poetry (owner, posted_at DESC);
+CREATE INDEX ON v1.poetry (posted_at DESC) WHERE privacy_level = 'public';
+-- Lets the sitemap walk public poems in id order with index-only scans
+CREATE INDEX ON v1.poetry (id) INCLUDE (updated_at) WHERE privacy_level = 'public';
+
+-- Announce changes that affect poem listings, view counts are excluded
+CREATE FUNCTION v1.notify_poetry_changed() RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM pg_notify('poetry_changed', '');
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER poetry_changed
+    AFTER INSERT OR DELETE OR UPDATE OF owner, title, posted_at, updated_at, privacy_level, tags
+    ON v1.poetry
+    FOR EACH STATEMENT EXECUTE FUNCTION v1.notify_poetry_changed();
+
+-- Tags of public poems with the number of poems using them, kept up to
+-- date by triggers so autocomplete does not unnest v1.poetry.tags
+CREATE TABLE v1.tags (
+    tag    TEXT  PRIMARY KEY,
+    poems  INTEGER  NOT NULL  DEFAULT 0
+);
+
+CREATE INDEX ON v1.tags USING gin (tag public.gin_trgm_ops);
+
+CREATE FUNCTION v1.count_tags() RETURNS TRIGGER AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO v1.tags (tag, poems)
+             SELECT tag, count(*)
+               FROM new_rows, unnest(new_rows.tags) AS tag
+              WHERE privacy_level = 'public'
+           GROUP BY tag
+        ON CONFLICT (tag) DO UPDATE SET poems = v1.tags.poems + EXCLUDED.poems;
+    ELSIF TG_OP = 'DELETE' THEN
+        UPDATE v1.tags
+           SET poems = v1.tags.poems - removed.poems
+          FROM (SELECT tag, count(*) AS poems
+                  FROM old_rows, unnest(old_rows.tags) AS tag
+                 WHERE privacy_level = 'public'
+              GROUP BY tag) AS removed
+         WHERE v1.tags.tag = removed.tag;
+    ELSE
+        -- View count flushes update many rows, only rows whose tags or
+        -- visibility changed are counted
+        INSERT INTO v1.tags (tag, poems)
+             SELECT tag, sum(delta)
+               FROM (SELECT tag, -1 AS delta
+                       FROM old_rows AS o
+                       JOIN new_rows AS n USING (id),
+                            unnest(o.tags) AS tag
+                      WHERE o.privacy_level = 'public'
+                        AND (o.tags IS DISTINCT FROM n.tags
+                             OR o.privacy_level IS DISTINCT FROM n.privacy_level)
+                  UNION ALL
+                     SELECT tag, 1
+                       FROM old_rows AS o
+                       JOIN new_rows AS n USING (id),
+                            unnest(n.tags) AS tag
+                      WHERE n.privacy_level = 'public'
+                        AND (o.tags IS DISTINCT FROM n.tags
+                             OR o.privacy_level IS DISTINCT FROM n.privacy_level)) AS changes
+           GROUP BY tag
+             HAVING sum(delta) <> 0
+        ON CONFLICT (tag) DO UPDATE SET poems = v1.tags.poems + EXCLUDED.poems;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- Transition tables need a trigger per event
+CREATE TRIGGER count_tags_insert
+    AFTER INSERT ON v1.poetry REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION v1.count_tags();
+
+CREATE TRIGGER count_tags_update
+    AFTER UPDATE ON v1.poetry REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION v1.count_tags();
+
+CREATE TRIGGER count_tags_delete
+    AFTER DELETE ON v1.poetry REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION v1.count_tags();
+
+-- Poem history, a full snapshot every few revisions and line deltas
+-- against the previous revision in between, see emuse.models.revision
+CREATE TABLE v1.poetry_revisions (
+    poem_id     UUID  NOT NULL  REFERENCES v1.poetry (id) ON DELETE CASCADE ON UPDATE CASCADE,
+    revision    INTEGER  NOT NULL,
+    created_at  TIMESTAMP WITH TIME ZONE  NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    snapshot    BOOLEAN  NOT NULL,
+    data        JSONB  NOT NULL,
+    PRIMARY KEY (poem_id, revision)
+);
+
+CREATE INDEX ON v1.poetry_revisions (poem_id, revision) WHERE snapshot;
+
+-- Friendships are mutual and stored as a row in each direction
+CREATE TABLE v1.friendships (
+    account_id  UUID  NOT NULL  REFERENCES v1.accounts (id) ON DELETE CASCADE ON UPDATE CASCADE,
+    friend_id   UUID  NOT NULL  REFERENCES v1.accounts (id) ON DELETE CASCADE ON UPDATE CASCADE,
+    created_at  TIMESTAMP WITH TIME ZONE  NOT NULL  DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (account_id, friend_id),
+    CHECK (account_id <> friend_id)
 );
 
 CREATE TABLE v1.email_verification_tokens (
@@ -54,5 +167,21 @@ CREATE TABLE v1.email_verification_tokens (
     used_at     TIMESTAMP WITH TIME ZONE
 );
 
-CREATE UNIQUE INDEX ON v1.email_verification_tokens (token);
+-- Only live tokens are looked up, used and expired ones are purged by
+-- the janitor
+CREATE UNIQUE INDEX ON v1.email_verification_tokens (token) WHERE used_at IS NULL;
 CREATE INDEX ON v1.email_verification_tokens (account_id);
+CREATE INDEX ON v1.email_verification_tokens (expires_at);
+
+-- Sliding window rate limit counters, shared by all workers when
+-- RATE_LIMIT_BACKEND=postgres. Losing them on a crash is harmless, so
+-- the table is not WAL logged. Keys are hashes, buckets are the window
+-- number since the epoch.
+CREATE UNLOGGED TABLE v1.rate_limits (
+    key     BYTEA    NOT NULL,
+    bucket  BIGINT   NOT NULL,
+    hits    INTEGER  NOT NULL  DEFAULT 1,
+    PRIMARY KEY (key, bucket)
+);
+
+CREATE INDEX ON v1.rate_limits (bucket);
@@ -0,0 +1,127 @@
+"""Admission control, shedding load with fast 503s when saturated."""
+
+import enum
+import logging
+
+import pydantic_settings
+from starlette import types
+
+from emuse import hashing, metrics
+
+LOGGER = logging.getLogger(__name__)
+
+IN_FLIGHT = metrics.Gauge(
+    'emuse_requests_in_flight', 'HTTP requests currently being handled'
+)
+SHED = metrics.Counter(
+    'emuse_requests_shed_total',
+    'HTTP requests rejected by admission control',
+    ['priority', 'reason'],
+)
+
+# Requests to these paths need a password hash
+_HASHING_PATHS = frozenset({'/api/login', '/api/signup'})
+# Requests to paths with these prefixes need a database connection
+_DATABASE_PREFIXES = ('/api/', '/sitemap')
+
+
+class Priority(enum.IntEnum):
+    """Lower values are shed first"""
+
+    hashing = 0
+    api = 1
+    # Probes, metrics, static files and the SPA shell do not touch the
+    # database, so they may use ADMISSION_RESERVE more requests in flight
+    shell = 2
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'admission_',
+        'extra': 'ignore',
+    }
+
+    max_in_flight: int = 200
+    reserve: int = 50
+    max_pool_waiting: int = 10
+    max_hash_queue: int = 16
+    retry_after: int = 1
+
+
+def classify(path: str) -> Priority:
+    """Return the priority of a request path."""
+    if path in _HASHING_PATHS:
+        return Priority.hashing
+    if path.startswith(_DATABASE_PREFIXES):
+        return Priority.api
+    return Priority.shell
+
+
+def pool_waiting(state: dict) -> int:
+    """Return the number of requests waiting for a database connection."""
+    pool = state.get('postgres')
+    if pool is None:
+        return 0
+    return pool.get_stats().get('requests_waiting', 0)
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware that rejects requests when saturated"""
+
+    def __init__(self, app: types.ASGIApp) -> None:
+        self.app = app
+        self.settings = _Settings()
+        self.in_flight = 0
+
+    async def __call__(
+        self, scope: types.Scope, receive: types.Receive, send: types.Send
+    ) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        priority = classify(scope['path'])
+        reason = self._reject_reason(priority, scope.get('state', {}))
+        if reason:
+            SHED.inc(priority=priority.name, reason=reason)
+            LOGGER.debug('Shed %s request: %s', scope['path'], reason)
+            await self._unavailable(send)
+            return
+        self.in_flight += 1
+        IN_FLIGHT.set(self.in_flight)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
+            IN_FLIGHT.set(self.in_flight)
+
+    def _reject_reason(self, priority: Priority, state: dict) -> str | None:
+        limit = self.settings.max_in_flight
+        if priority == Priority.shell:
+            limit += self.settings.reserve
+        if self.in_flight >= limit:
+            return 'in_flight'
+        if priority == Priority.shell:
+            return None
+        if pool_waiting(state) >= self.settings.max_pool_waiting:
+            return 'pool'
+        if (
+            priority == Priority.hashing
+            and hashing.pending() >= self.settings.max_hash_queue
+        ):
+            return 'hashing'
+        return None
+
+    async def _unavailable(self, send: types.Send) -> None:
+        body = b'{"detail":"Service is busy. Please try again shortly."}'
+        await send({
+            'type': 'http.response.start',
+            'status': 503,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'retry-after', str(self.settings.retry_after).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
@@ -0,0 +1,268 @@
+import dataclasses
+import email.utils
+import functools
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import pathlib
+
+import brotli
+import pydantic
+import pydantic_settings
+from starlette import datastructures, responses, types
+
+from emuse import http_cache
+
+LOGGER = logging.getLogger(__name__)
+
+MANIFEST = pathlib.Path('.vite') / 'manifest.json'
+
+_IMMUTABLE = 'public, max-age=31536000, immutable'
+_REVALIDATE = 'no-cache'
+_COMPRESSIBLE = frozenset({
+    'application/javascript',
+    'application/json',
+    'application/manifest+json',
+    'application/xml',
+    'image/svg+xml',
+    'image/x-icon',
+    'image/vnd.microsoft.icon',
+    'text/javascript',
+})
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'static_',
+        'extra': 'ignore',
+    }
+
+    max_memory_size: int = 256 * 1024
+    compress_min_size: int = 512
+
+
+class ManifestEntry(pydantic.BaseModel):
+    """An entry in the Vite build manifest"""
+
+    file: str
+    css: list[str] = pydantic.Field(default_factory=list)
+    assets: list[str] = pydantic.Field(default_factory=list)
+    imports: list[str] = pydantic.Field(default_factory=list)
+    is_entry: bool = pydantic.Field(default=False, alias='isEntry')
+
+
+@functools.cache
+def manifest(directory: pathlib.Path) -> dict[str, ManifestEntry]:
+    """Return the Vite build manifest, empty if the UI was not built."""
+    try:
+        with (directory / MANIFEST).open('rb') as handle:
+            data = json.load(handle)
+    except FileNotFoundError:
+        return {}
+    return {
+        key: ManifestEntry.model_validate(value) for key, value in data.items()
+    }
+
+
+def entry(directory: pathlib.Path, name: str = 'index.html') -> ManifestEntry:
+    """Return the built files for an entry point of the UI."""
+    value = manifest(directory).get(name)
+    if value is None:  # Older builds without hashed file names
+        return ManifestEntry(file='assets/index.js', css=['assets/index.css'])
+    return value
+
+
+@dataclasses.dataclass(slots=True)
+class _Variant:
+    content: bytes | None
+    etag: str
+
+
+@dataclasses.dataclass(slots=True)
+class _Asset:
+    path: pathlib.Path
+    media_type: str
+    cache_control: str
+    last_modified: str
+    mtime: float
+    variants: dict[str, _Variant]  # By content-encoding, '' for identity
+
+
+def accepted_encodings(header: str | None) -> set[str]:
+    """Return the content-codings an Accept-Encoding header allows."""
+    accepted = set()
+    for value in (header or '').split(','):
+        coding, _, params = value.strip().partition(';')
+        quality = 1.0
+        for param in params.split(';'):
+            name, _, param_value = param.strip().partition('=')
+            if name == 'q':
+                try:
+                    quality = float(param_value)
+                except ValueError:
+                    quality = 0.0
+        if coding and quality > 0:
+            accepted.add(coding.strip().lower())
+    if '*' in accepted:
+        accepted.update(('br', 'gzip'))
+    return accepted
+
+
+class StaticFiles:
+    """ASGI application serving the static directory"""
+
+    def __init__(self, directory: pathlib.Path, reload: bool = False):
+        self.directory = directory.resolve()
+        self.reload = reload
+        self.settings = _Settings()
+        self._assets: dict[str, _Asset] = {}
+        fingerprinted = self._fingerprinted()
+        for path in sorted(self.directory.rglob('*')):
+            relative = path.relative_to(self.directory)
+            if path.is_file() and not self._skip(relative):
+                key = relative.as_posix()
+                self._assets[key] = self._load(path, key in fingerprinted)
+        LOGGER.debug(
+            'Indexed %i static files, %i fingerprinted',
+            len(self._assets),
+            len(fingerprinted),
+        )
+
+    async def __call__(
+        self, scope: types.Scope, receive: types.Receive, send: types.Send
+    ) -> None:
+        if scope['method'] not in {'GET', 'HEAD'}:
+            response = responses.PlainTextResponse(
+                'Method Not Allowed', 405, headers={'Allow': 'GET, HEAD'}
+            )
+            await response(scope, receive, send)
+            return
+        asset = self._lookup(scope['path'].removeprefix(scope['root_path']))
+        if asset is None:
+            response = responses.PlainTextResponse('Not Found', 404)
+            await response(scope, receive, send)
+            return
+        headers = datastructures.Headers(scope=scope)
+        encoding = self._negotiate(asset, headers.get('accept-encoding'))
+        variant = asset.variants[encoding]
+        response_headers = {
+            'Cache-Control': asset.cache_control,
+            'ETag': variant.etag,
+            'Last-Modified': asset.last_modified,
+        }
+        if len(asset.variants) > 1:
+            response_headers['Vary'] = 'Accept-Encoding'
+        if http_cache.not_modified(headers, variant.etag):
+            response = responses.Response(
+                status_code=304, headers=response_headers
+            )
+        elif variant.content is None:
+            response = responses.FileResponse(
+                asset.path,
+                headers=response_headers,
+                media_type=asset.media_type,
+            )
+        else:
+            if encoding:
+                response_headers['Content-Encoding'] = encoding
+            # The server omits the body of responses to HEAD requests
+            response = responses.Response(
+                variant.content,
+                headers=response_headers,
+                media_type=asset.media_type,
+            )
+        await response(scope, receive, send)
+
+    def _fingerprinted(self) -> set[str]:
+        manifest.cache_clear()
+        files = set()
+        for value in manifest(self.directory).values():
+            files.add(value.file)
+            files.update(value.css)
+            files.update(value.assets)
+        return files
+
+    def _load(self, path: pathlib.Path, fingerprinted: bool) -> _Asset:
+        stat = path.stat()
+        media_type = mimetypes.guess_type(path.name)[0]
+        media_type = media_type or 'application/octet-stream'
+        asset = _Asset(
+            path=path,
+            media_type=media_type,
+            cache_control=_IMMUTABLE if fingerprinted else _REVALIDATE,
+            last_modified=email.utils.formatdate(stat.st_mtime, usegmt=True),
+            mtime=stat.st_mtime,
+            variants={},
+        )
+        if stat.st_size > self.settings.max_memory_size:
+            asset.variants[''] = _Variant(
+                None, http_cache.etag(stat.st_mtime_ns, stat.st_size)
+            )
+            return asset
+        content = path.read_bytes()
+        digest = hashlib.blake2b(content, digest_size=16).hexdigest()
+        asset.variants[''] = _Variant(content, http_cache.etag(digest))
+        if not self._compressible(media_type, len(content)):
+            return asset
+        for encoding, compressed in self._compress(path, content).items():
+            # Only worth sending if it saves at least a few percent
+            if len(compressed) < len(content) * 0.95:
+                asset.variants[encoding] = _Variant(
+                    compressed, http_cache.etag(digest, encoding)
+                )
+        return asset
+
+    def _compressible(self, media_type: str, size: int) -> bool:
+        return size >= self.settings.compress_min_size and (
+            media_type.startswith('text/') or media_type in _COMPRESSIBLE
+        )
+
+    @staticmethod
+    def _compress(path: pathlib.Path, content: bytes) -> dict[str, bytes]:
+        variants = {}
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            prebuilt = path.with_name(path.name + suffix)
+            if prebuilt.is_file():
+                variants[encoding] = prebuilt.read_bytes()
+        if 'br' not in variants:
+            variants['br'] = brotli.compress(content, quality=11)
+        if 'gzip' not in variants:
+            variants['gzip'] = gzip.compress(content, 9, mtime=0)
+        return variants
+
+    def _lookup(self, path: str) -> _Asset | None:
+        key = path.lstrip('/')
+        asset = self._assets.get(key)
+        if not self.reload:
+            return asset
+        # Pick up changed and new files while developing
+        file = (self.directory / key).resolve()
+        if not file.is_relative_to(self.directory) or not file.is_file():
+            return None
+        if self._skip(file.relative_to(self.directory)):
+            return None
+        if asset is None or asset.mtime != file.stat().st_mtime:
+            asset = self._load(file, key in self._fingerprinted())
+            self._assets[key] = asset
+        return asset
+
+    @staticmethod
+    def _negotiate(asset: _Asset, accept_encoding: str | None) -> str:
+        if len(asset.variants) == 1:
+            return ''
+        accepted = accepted_encodings(accept_encoding)
+        for encoding in ('br', 'gzip'):
+            if encoding in accepted and encoding in asset.variants:
+                return encoding
+        return ''
+
+    @staticmethod
+    def _skip(relative: pathlib.Path) -> bool:
+        """Hidden files and prebuilt variants are not served directly"""
+        return any(part.startswith('.') for part in relative.parts) or (
+            relative.suffix in {'.br', '.gz'}
+        )
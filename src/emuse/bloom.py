@@ -0,0 +1,57 @@
+"""A compact, array-backed Bloom filter."""
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Set membership with no false negatives and tunable false positives"""
+
+    def __init__(self, capacity: int, error_rate: float) -> None:
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bits = math.ceil(
+            -capacity * math.log(error_rate) / math.log(2) ** 2
+        )
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.count = 0
+        self._array = bytearray(math.ceil(self.bits / 8))
+
+    def __contains__(self, value: str) -> bool:
+        return all(
+            self._array[position >> 3] & (1 << (position & 7))
+            for position in self._positions(value)
+        )
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def size(self) -> int:
+        """Return the size of the bit array in bytes."""
+        return len(self._array)
+
+    def add(self, value: str) -> None:
+        for position in self._positions(value):
+            self._array[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def estimated_error_rate(self) -> float:
+        """Return the expected false positive rate at the current count."""
+        return (
+            1 - math.exp(-self.hashes * self.count / self.bits)
+        ) ** self.hashes
+
+    def _positions(self, value: str) -> list[int]:
+        # Double hashing of a single digest
+        digest = hashlib.blake2b(
+            value.encode('utf-8'), digest_size=16
+        ).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        # A zero step would set the same bit for every hash
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [
+            (first + index * second) % self.bits
+            for index in range(self.hashes)
+        ]
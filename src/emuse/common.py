@@ -1,10 +1,20 @@
+import atexit
+import copy
 import datetime
+import importlib.util
+import json
 import logging
 import pathlib
+import queue
+import sys
 import tomllib
+import types
+import typing
 import uuid
 from logging import config as logging_config
+from logging import handlers as logging_handlers
 
+import pydantic
 import pydantic_settings
 import uuid_utils
 
@@ -22,6 +32,10 @@ class Settings(pydantic_settings.BaseSettings):
     cors_origin: str = '*'
     sentry_dsn: str | None = None
     vite_dev_url: str = 'http://localhost:5173'
+    log_format: typing.Literal['text', 'json'] = 'text'
+    log_queue: bool = False
+    access_log_sample_rate: float = 1.0
+    metrics_token: pydantic.SecretStr | None = None
 
 
 class StatusEndpointFilter(logging.Filter):
@@ -33,14 +47,95 @@ class StatusEndpointFilter(logging.Filter):
         return True
 
 
+class AccessLogSampler(logging.Filter):
+    """Keep a fraction of successful requests in the uvicorn access log"""
+
+    def __init__(self, rate: float = 1.0) -> None:
+        super().__init__()
+        self.rate = rate
+        self._credit = 0.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        args = record.args
+        if isinstance(args, tuple) and len(args) == 5 and args[4] >= 400:
+            return True
+        # Deterministic, a rate of 0.1 keeps every tenth request
+        self._credit += self.rate
+        if self._credit >= 1.0:
+            self._credit -= 1.0
+            return True
+        return False
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as compact, single line JSON objects"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'timestamp': datetime.datetime.fromtimestamp(
+                record.created, datetime.UTC
+            ).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        if record.stack_info:
+            data['stack'] = self.formatStack(record.stack_info)
+        return json.dumps(data, separators=(',', ':'), default=str)
+
+
+class QueuedHandler(logging_handlers.QueueHandler):
+    """Hands records to a background thread for formatting and output"""
+
+    def __init__(self, record_queue: queue.Queue) -> None:
+        super().__init__(record_queue)
+        self._started = False
+
+    def emit(self, record: logging.LogRecord) -> None:
+        # uvicorn configures logging itself and does not start the listener
+        if self.listener is not None and not self._started:
+            with self.lock:
+                if not self._started:
+                    self.listener.start()
+                    atexit.register(self.listener.stop)
+                    self._started = True
+        super().emit(record)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Unlike QueueHandler, leave formatting to the listener, so logged
+        # arguments must not be mutated afterwards
+        return copy.copy(record)
+
+
 def log_config(verbose: bool = False) -> dict:
+    settings = Settings()
     with open(pathlib.Path(__file__).parent / 'logconfig.toml', 'rb') as f:
         value = tomllib.load(f)
-        value['filters'] = {'status_endpoint': {'()': StatusEndpointFilter}}
-        value['handlers']['default']['filters'] = ['status_endpoint']
-        if verbose:
-            value['loggers']['emuse']['level'] = logging.DEBUG
-            value['handlers']['default']['level'] = logging.DEBUG
+    value['filters'] = {'status_endpoint': {'()': StatusEndpointFilter}}
+    # Filter on the logger rather than the handler, so other records skip
+    access_filters = ['status_endpoint']
+    if settings.access_log_sample_rate < 1.0:
+        value['filters']['access_sample'] = {
+            '()': AccessLogSampler,
+            'rate': settings.access_log_sample_rate,
+        }
+        access_filters.append('access_sample')
+    value['loggers']['uvicorn.access']['filters'] = access_filters
+    if settings.log_format == 'json':
+        value['handlers']['default']['formatter'] = 'json'
+    if settings.log_queue:
+        value['handlers']['queue'] = {
+            'class': f'{__name__}.QueuedHandler',
+            'handlers': ['default'],
+            'respect_handler_level': True,
+        }
+        for logger in value['loggers'].values():
+            logger['handlers'] = ['queue']
+    if verbose:
+        value['loggers']['emuse']['level'] = logging.DEBUG
+        value['handlers']['default']['level'] = logging.DEBUG
     return value
 
 
@@ -49,6 +144,27 @@ def configure_logging(verbose: bool = False) -> None:  # pragma: nocover
     logging_config.dictConfig(log_config(verbose))
 
 
+def lazy_import(name: str) -> types.ModuleType:
+    """Import a module, deferring its execution to first attribute access."""
+    # Use module attribute access, ``from module import name`` would load it
+    try:
+        return sys.modules[name]
+    except KeyError:
+        pass
+    spec = importlib.util.find_spec(name)
+    if spec is None or spec.loader is None:
+        raise ModuleNotFoundError(f'No module named {name!r}', name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    parent, _, child = name.rpartition('.')
+    if parent:
+        setattr(sys.modules[parent], child, module)
+    return module
+
+
 def current_date() -> datetime.date:
     """Return the current date in UTC"""
     return current_timestamp().date()
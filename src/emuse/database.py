@@ -1,6 +1,11 @@
+import asyncio
 import contextlib
+import enum
 import logging
+import re
+import time
 import typing
+import weakref
 from collections import abc
 
 import fastapi
@@ -8,7 +13,10 @@ import psycopg
 import psycopg_pool
 import pydantic
 import pydantic_settings
-from psycopg import rows
+from psycopg import rows, sql
+from psycopg.types import enum as enum_types
+
+from emuse import deadline, metrics
 
 LOGGER = logging.getLogger(__name__)
 
@@ -18,10 +26,51 @@ ModelType = type[pydantic.BaseModel]
 PoolType = psycopg_pool.AsyncConnectionPool[ConnectionType]
 
 
+REPLICA_HEALTHY = metrics.Gauge(
+    'emuse_postgres_replica_healthy',
+    'Whether reads are being routed to the replica',
+)
+REPLICA_LAG = metrics.Gauge(
+    'emuse_postgres_replica_lag_seconds', 'Replication lag of the replica'
+)
+POOL_MIN_SIZE = metrics.Gauge(
+    'emuse_postgres_pool_min_size', 'Connections the pool keeps open'
+)
+POOL_SIZE = metrics.Gauge(
+    'emuse_postgres_pool_size', 'Connections currently open in the pool'
+)
+POOL_WAIT = metrics.Gauge(
+    'emuse_postgres_pool_wait_ms',
+    'Average time spent waiting for a connection in the last interval',
+)
+POOL_RESIZES = metrics.Counter(
+    'emuse_postgres_pool_resizes_total',
+    'Adaptive pool resize decisions',
+    ['direction'],
+)
+READS = metrics.Counter(
+    'emuse_postgres_reads_total',
+    'Read connections handed out, by the pool that served them',
+    ['target'],
+)
+
+
 class _Settings(pydantic_settings.BaseSettings):
     url: pydantic.PostgresDsn = 'postgres://localhost/emuse'
     max_size: int = 10
     min_size: int = 2
+    warm_size: int = 4
+    warm_timeout: float = 10.0
+    resize_interval: float = 15.0
+    resize_step: int = 2
+    grow_wait_ms: float = 25.0
+    shrink_utilization: float = 0.25
+    shrink_after: int = 4
+    replica_url: pydantic.PostgresDsn | None = None
+    replica_max_size: int = 10
+    replica_min_size: int = 2
+    replica_max_lag: float = 5.0
+    replica_check_interval: float = 5.0
     model_config = {
         'case_sensitive': False,
         'env_file': '.env',
@@ -30,31 +79,256 @@ class _Settings(pydantic_settings.BaseSettings):
     }
 
 
+# Postgres enum types to register on every connection, with the cached
+# type information so it is only fetched once per process
+_enums: dict[str, tuple[type[enum.Enum], enum_types.EnumInfo | None]] = {}
+
+# Executed on new connections so the backend has catalog entries for the
+# hot tables cached before the first real query arrives
+_PRIME_SQL = 'SELECT FROM v1.accounts, v1.poetry LIMIT 0'
+
+
+def register_enum(name: str, python_enum: type[enum.Enum]) -> None:
+    """Adapt a Postgres enum to a Python enum by value on every connection."""
+    _enums[name] = python_enum, None
+
+
 @contextlib.asynccontextmanager
 async def lifespan() -> abc.AsyncIterator[psycopg_pool.AsyncConnectionPool]:
     settings = _Settings()
     async with psycopg_pool.AsyncConnectionPool(
         settings.url.unicode_string(),
-        min_size=settings.min_size,
+        min_size=max(settings.min_size, settings.warm_size),
         max_size=settings.max_size,
         configure=_configure,
         check=psycopg_pool.AsyncConnectionPool.check_connection,
+        reset=_reset,
+    ) as pool:
+        await _warm(pool, pool.min_size, settings.warm_timeout)
+        sizer = PoolSizer(
+            pool,
+            min_size=settings.min_size,
+            step=settings.resize_step,
+            grow_wait_ms=settings.grow_wait_ms,
+            shrink_utilization=settings.shrink_utilization,
+            shrink_after=settings.shrink_after,
+        )
+        task = asyncio.create_task(sizer.run(settings.resize_interval))
+        try:
+            yield pool
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+async def _warm(pool: PoolType, size: int, max_wait: float) -> None:
+    """Check out and return size connections so they are open and primed."""
+    # Unlike pool.wait() this does not close the pool if connecting fails,
+    # so the application can still start while connections are retried
+    start = time.monotonic()
+    results = await asyncio.gather(
+        *(pool.getconn(timeout=max_wait) for _ in range(size)),
+        return_exceptions=True,
+    )
+    for result in results:
+        if not isinstance(result, BaseException):
+            await pool.putconn(result)
+    warmed = sum(not isinstance(r, BaseException) for r in results)
+    if warmed < size:
+        LOGGER.warning(
+            'Pool warm-up incomplete, %i of %i connections', warmed, size
+        )
+    else:
+        LOGGER.debug(
+            'Pool warmed with %i connections in %.3fs',
+            warmed,
+            time.monotonic() - start,
+        )
+
+
+class PoolSizer:
+    """Grows and shrinks the pool's min_size with demand"""
+
+    def __init__(
+        self,
+        pool: PoolType,
+        *,
+        min_size: int,
+        step: int,
+        grow_wait_ms: float,
+        shrink_utilization: float,
+        shrink_after: int,
+    ) -> None:
+        self._pool = pool
+        self._floor = min_size
+        self._step = step
+        self._grow_wait_ms = grow_wait_ms
+        self._shrink_utilization = shrink_utilization
+        self._shrink_after = shrink_after
+        self._idle_intervals = 0
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.adjust()
+
+    async def adjust(self) -> None:
+        """Sample the pool statistics and resize if warranted."""
+        stats = self._pool.pop_stats()
+        requests = stats.get('requests_num', 0)
+        wait_ms = (
+            stats.get('requests_wait_ms', 0) / requests if requests else 0
+        )
+        size = stats.get('pool_size', 0)
+        in_use = size - stats.get('pool_available', 0)
+        utilization = in_use / size if size else 0.0
+        POOL_WAIT.set(wait_ms)
+        POOL_SIZE.set(size)
+
+        current = self._pool.min_size
+        target = current
+        # Open connections ahead of demand when requests had to wait, and
+        # only shrink after shrink_after intervals of low utilization
+        if wait_ms > self._grow_wait_ms or stats.get('requests_waiting', 0):
+            self._idle_intervals = 0
+            target = min(current + self._step, self._pool.max_size)
+        elif utilization < self._shrink_utilization:
+            self._idle_intervals += 1
+            if self._idle_intervals >= self._shrink_after:
+                self._idle_intervals = 0
+                target = max(current - self._step, self._floor)
+        else:
+            self._idle_intervals = 0
+
+        if target != current:
+            LOGGER.info(
+                'Resizing pool min_size %i -> %i (wait %.1fms, '
+                'utilization %.0f%%)',
+                current,
+                target,
+                wait_ms,
+                utilization * 100,
+            )
+            await self._pool.resize(target, self._pool.max_size)
+            POOL_RESIZES.inc(direction='up' if target > current else 'down')
+        POOL_MIN_SIZE.set(target)
+
+
+class Replica:
+    """A read replica pool, unhealthy when unreachable or lagging"""
+
+    def __init__(self, pool: PoolType, max_lag: float) -> None:
+        self.pool = pool
+        self.healthy = False
+        self.lag: float | None = None
+        self._max_lag = max_lag
+
+    async def check(self) -> bool:
+        """Update and return the health of the replica."""
+        try:
+            async with (
+                self.pool.connection(timeout=1.0) as conn,
+                cursor(conn) as cur,
+            ):
+                await cur.execute(_REPLICA_LAG_SQL)
+                self.lag = float((await cur.fetchone())['lag'])
+        except psycopg.Error as err:
+            if self.healthy:
+                LOGGER.warning('Replica check failed: %s', err)
+            self.healthy, self.lag = False, None
+        else:
+            healthy = self.lag <= self._max_lag
+            if healthy != self.healthy:
+                LOGGER.info(
+                    'Replica is %s (lag %.1fs)',
+                    'healthy' if healthy else 'lagging',
+                    self.lag,
+                )
+            self.healthy = healthy
+            REPLICA_LAG.set(self.lag)
+        REPLICA_HEALTHY.set(int(self.healthy))
+        return self.healthy
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            await self.check()
+
+
+@contextlib.asynccontextmanager
+async def replica_lifespan() -> abc.AsyncGenerator[Replica | None]:
+    """Open the replica pool if a replica is configured."""
+    settings = _Settings()
+    if not settings.replica_url:
+        yield None
+        return
+    async with psycopg_pool.AsyncConnectionPool(
+        settings.replica_url.unicode_string(),
+        min_size=settings.replica_min_size,
+        max_size=settings.replica_max_size,
+        configure=_configure_replica,
+        check=psycopg_pool.AsyncConnectionPool.check_connection,
+        reset=_reset,
     ) as pool:
-        yield pool
+        replica = Replica(pool, settings.replica_max_lag)
+        await replica.check()
+        task = asyncio.create_task(
+            replica.run(settings.replica_check_interval)
+        )
+        try:
+            yield replica
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+
+# Connections opened by the replica pool
+_replica_connections: weakref.WeakSet[ConnectionType] = weakref.WeakSet()
+
+
+def is_replica(conn: ConnectionType) -> bool:
+    """Return True if the connection is to the read replica."""
+    return conn in _replica_connections
+
+
+async def _configure_replica(conn: ConnectionType) -> None:
+    await _configure(conn)
+    _replica_connections.add(conn)
 
 
 async def _configure(conn: ConnectionType) -> None:
     await conn.set_autocommit(True)
+    conn.cursor_factory = _Cursor
     conn.prepare_threshold = None
     conn.row_factory = rows.dict_row
+    for name, (python_enum, info) in _enums.items():
+        if info is None:
+            info = await enum_types.EnumInfo.fetch(conn, name)
+            if info is None:
+                LOGGER.warning('Postgres enum %s does not exist', name)
+                continue
+            _enums[name] = python_enum, info
+        enum_types.register_enum(
+            info,
+            conn,
+            python_enum,
+            mapping={member: member.value for member in python_enum},
+        )
+    try:
+        await conn.execute(_PRIME_SQL)
+    except psycopg.errors.UndefinedTable:
+        LOGGER.debug('Skipping connection priming, schema is missing')
 
 
 async def connection(
     request: fastapi.Request,
 ) -> abc.AsyncIterator[ConnectionType]:
     pool = typing.cast(PoolType, request.state.postgres)
-    async with pool.connection(timeout=5.0) as conn:
-        yield conn
+    async with pool.connection(timeout=deadline.remaining(5.0)) as conn:
+        with _statement_timeout(conn):
+            yield conn
 
 
 InjectConnection = typing.Annotated[
@@ -62,6 +336,88 @@ InjectConnection = typing.Annotated[
 ]
 
 
+async def read_connection(
+    request: fastapi.Request,
+) -> abc.AsyncIterator[ConnectionType]:
+    """Return a replica connection if healthy, otherwise the primary."""
+    # Reads that must see the request's own writes use InjectConnection
+    replica = typing.cast(Replica | None, request.state.postgres_replica)
+    pool, target = typing.cast(PoolType, request.state.postgres), 'primary'
+    conn = None
+    if replica and replica.healthy:
+        try:
+            conn = await replica.pool.getconn(timeout=deadline.remaining(1.0))
+        except psycopg_pool.PoolTimeout:
+            LOGGER.warning('Timed out waiting for a replica connection')
+        else:
+            pool, target = replica.pool, 'replica'
+    if conn is None:
+        conn = await pool.getconn(timeout=deadline.remaining(5.0))
+    READS.inc(target=target)
+    try:
+        with _statement_timeout(conn):
+            yield conn
+    finally:
+        await pool.putconn(conn)
+
+
+InjectReadConnection = typing.Annotated[
+    ConnectionType, fastapi.Depends(read_connection)
+]
+
+
+# Deadlines whose statement_timeout is sent with the connection's first
+# query, and the connections that need it reset when they are returned
+_pending_timeouts: weakref.WeakKeyDictionary[
+    ConnectionType, deadline.Deadline
+] = weakref.WeakKeyDictionary()
+_timeouts_set: weakref.WeakSet[ConnectionType] = weakref.WeakSet()
+
+
+@contextlib.contextmanager
+def _statement_timeout(conn: ConnectionType) -> abc.Iterator[None]:
+    """Limit statements to the request's remaining deadline budget."""
+    # A backstop for when cancelling the request's query does not reach
+    # the server, sent with the first query and reset by the pool
+    value = deadline.current()
+    if value is None:
+        yield
+        return
+    _pending_timeouts[conn] = value
+    try:
+        yield
+    finally:
+        _pending_timeouts.pop(conn, None)
+
+
+async def _reset(conn: ConnectionType) -> None:
+    if conn in _timeouts_set:
+        _timeouts_set.discard(conn)
+        await conn.execute('RESET statement_timeout')
+
+
+class _Cursor(psycopg.AsyncCursor):
+    """Sends a pending statement_timeout along with the first query"""
+
+    async def execute(
+        self,
+        query: typing.Any,
+        params: typing.Any = None,
+        **kwargs: typing.Any,
+    ) -> typing.Self:
+        value = _pending_timeouts.pop(self.connection, None)
+        if value is None:
+            return await super().execute(query, params, **kwargs)
+        milliseconds = max(1, int(value.remaining() * 1000))
+        _timeouts_set.add(self.connection)
+        async with self.connection.pipeline():
+            await self.connection.execute(
+                _SET_STATEMENT_TIMEOUT_SQL, [f'{milliseconds}ms']
+            )
+            await super().execute(query, params, **kwargs)
+        return self
+
+
 @contextlib.asynccontextmanager
 async def cursor(
     conn: ConnectionType, row_factory_class: ModelType | None = None
@@ -72,3 +428,40 @@ async def cursor(
         kwargs['row_factory'] = rows.class_row(row_factory_class)
     async with conn.cursor(**kwargs) as value:
         yield value
+
+
+async def copy_rows(
+    conn: ConnectionType,
+    table: str,
+    columns: abc.Sequence[str],
+    values: abc.Iterable[abc.Sequence[typing.Any]],
+) -> int:
+    """Load rows with COPY, returning the number of rows written."""
+    statement = sql.SQL('COPY {table} ({columns}) FROM STDIN').format(
+        table=sql.Identifier(*table.split('.')),
+        columns=sql.SQL(', ').join(sql.Identifier(c) for c in columns),
+    )
+    count = 0
+    async with conn.cursor() as cursor:
+        async with cursor.copy(statement) as copy:
+            for row in values:
+                await copy.write_row(row)
+                count += 1
+    return count
+
+
+_SET_STATEMENT_TIMEOUT_SQL = (
+    "SELECT set_config('statement_timeout', %s, false)"
+)
+
+_REPLICA_LAG_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0
+            WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+            ELSE COALESCE(EXTRACT(EPOCH FROM now()
+                          - pg_last_xact_replay_timestamp()), 0)
+        END AS lag
+""",
+)
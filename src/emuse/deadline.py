@@ -0,0 +1,201 @@
+"""Per-request deadlines, with cancellation when the client goes away."""
+
+import asyncio
+import contextvars
+import logging
+from collections import abc
+
+import pydantic_settings
+from starlette import types
+
+from emuse import metrics
+
+LOGGER = logging.getLogger(__name__)
+
+EXPIRED = metrics.Counter(
+    'emuse_deadline_expired_total',
+    'Requests cancelled before they completed',
+    ['reason'],
+)
+SAVED = metrics.Counter(
+    'emuse_deadline_seconds_saved_total',
+    'Unused request budget released by cancelling abandoned requests',
+    ['reason'],
+)
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'deadline_',
+        'extra': 'ignore',
+    }
+
+    default: float = 10.0
+    routes: dict[str, float] = {'/api/poems/import': 300.0}
+
+
+class Deadline:
+    """The time by which a request must complete"""
+
+    def __init__(self, budget: float) -> None:
+        self.budget = budget
+        self.reason: str | None = None
+        self._loop = asyncio.get_running_loop()
+        self._started_at = self._loop.time()
+        self._expires_at = self._started_at + budget
+        self._timeout: asyncio.Timeout | None = None
+
+    def elapsed(self) -> float:
+        """Return the seconds since the request started."""
+        return self._loop.time() - self._started_at
+
+    def remaining(self) -> float:
+        """Return the seconds left in the budget."""
+        return max(0.0, self._expires_at - self._loop.time())
+
+    def timeout(self) -> asyncio.Timeout:
+        """Return the asyncio timeout that enforces the deadline."""
+        self._timeout = asyncio.timeout_at(self._expires_at)
+        return self._timeout
+
+    def expire(self, reason: str) -> None:
+        """Cancel the request now, recording the unused budget as saved."""
+        if self.reason is not None:
+            return
+        self.reason = reason
+        SAVED.inc(self.remaining(), reason=reason)
+        self._expires_at = self._loop.time()
+        if self._timeout is not None:
+            self._timeout.reschedule(self._expires_at)
+
+
+_current: contextvars.ContextVar[Deadline | None] = contextvars.ContextVar(
+    'deadline', default=None
+)
+
+
+def current() -> Deadline | None:
+    """Return the deadline of the request being handled, if any."""
+    return _current.get()
+
+
+def remaining(default: float) -> float:
+    """Return the default, reduced to what is left of the budget."""
+    # For example: client.post(url, timeout=deadline.remaining(10.0))
+    value = _current.get()
+    if value is None:
+        return default
+    return min(default, value.remaining())
+
+
+class _Receiver:
+    """Wraps receive so disconnects are noticed while the app is busy"""
+
+    def __init__(self, receive: types.Receive, has_body: bool) -> None:
+        self._receive = receive
+        self._queue: asyncio.Queue[types.Message] = asyncio.Queue()
+        self._pumping = asyncio.Event()
+        self.disconnected = False
+        if not has_body:
+            self._pumping.set()
+
+    async def __call__(self) -> types.Message:
+        if not self._pumping.is_set():
+            message = await self._receive()
+            if message['type'] != 'http.request' or not message.get(
+                'more_body', False
+            ):
+                self._pumping.set()
+            return message
+        if self.disconnected and self._queue.empty():
+            return {'type': 'http.disconnect'}
+        return await self._queue.get()
+
+    async def pump(self, on_disconnect: abc.Callable[[], None]) -> None:
+        # Once the body has been read, receive on the application's behalf
+        # so the disconnect is seen even if it never asks for it
+        await self._pumping.wait()
+        while not self.disconnected:
+            message = await self._receive()
+            if message['type'] == 'http.disconnect':
+                self.disconnected = True
+                on_disconnect()
+            self._queue.put_nowait(message)
+
+
+class DeadlineMiddleware:
+    """Pure ASGI middleware that enforces the per-request deadline"""
+
+    def __init__(self, app: types.ASGIApp) -> None:
+        self.app = app
+        self.settings = _Settings()
+
+    async def __call__(
+        self, scope: types.Scope, receive: types.Receive, send: types.Send
+    ) -> None:
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        value = Deadline(
+            self.settings.routes.get(scope['path'], self.settings.default)
+        )
+        token = _current.set(value)
+        headers = dict(scope['headers'])
+        receiver = _Receiver(
+            receive,
+            headers.get(b'content-length', b'0') != b'0'
+            or b'transfer-encoding' in headers,
+        )
+        started = completed = False
+
+        async def send_wrapper(message: types.Message) -> None:
+            nonlocal started, completed
+            started = True
+            await send(message)
+            if message['type'] == 'http.response.body' and not message.get(
+                'more_body', False
+            ):
+                completed = True
+
+        def on_disconnect() -> None:
+            if not completed:
+                value.expire('disconnect')
+
+        watcher = asyncio.create_task(receiver.pump(on_disconnect))
+        # Cancelling the handler also makes psycopg cancel its query
+        timeout = value.timeout()
+        try:
+            async with timeout:
+                await self.app(scope, receiver, send_wrapper)
+        except TimeoutError:
+            # The application's own timeouts are not the deadline's
+            if not timeout.expired():
+                raise
+            reason = value.reason or 'timeout'
+            EXPIRED.inc(reason=reason)
+            LOGGER.warning(
+                'Request to %s cancelled after %.1fs (%s)',
+                scope['path'],
+                value.elapsed(),
+                reason,
+            )
+            if not started and reason == 'timeout':
+                await self._timed_out(send)
+        finally:
+            watcher.cancel()
+            _current.reset(token)
+
+    @staticmethod
+    async def _timed_out(send: types.Send) -> None:
+        body = b'{"detail":"The request took too long to complete."}'
+        await send({
+            'type': 'http.response.start',
+            'status': 504,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
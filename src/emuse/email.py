@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 import logging
 import secrets
@@ -9,7 +10,7 @@ import aiosmtplib
 import pydantic
 import pydantic_settings
 
-from emuse import common, database, template
+from emuse import common, database, deadline, template
 
 LOGGER = logging.getLogger(__name__)
 
@@ -27,6 +28,7 @@ class _Settings(pydantic_settings.BaseSettings):
     smtp_username: str = ''
     smtp_password: str = ''
     smtp_use_tls: bool = True
+    smtp_timeout: float = 60.0
     from_address: pydantic.EmailStr = 'noreply@emuse.org'
     from_name: str = 'eMuse'
     base_url: str = 'https://emuse.org'
@@ -75,11 +77,9 @@ async def send_verification_email(
         'verification_url': verification_url,
     }
 
-    text_content = await template.render_async(
-        'email/verify.txt.j2', **template_context
-    )
-    html_content = await template.render_async(
-        'email/verify.html.j2', **template_context
+    text_content, html_content = await asyncio.gather(
+        template.render_async('email/verify.txt.j2', **template_context),
+        template.render_async('email/verify.html.j2', **template_context),
     )
 
     message.attach(MIMEText(text_content, 'plain'))
@@ -95,6 +95,7 @@ async def send_verification_email(
                 username=settings.smtp_username,
                 password=settings.smtp_password,
                 start_tls=True,
+                timeout=deadline.remaining(settings.smtp_timeout),
             )
         else:
             await aiosmtplib.send(
@@ -103,6 +104,7 @@ async def send_verification_email(
                 port=settings.smtp_port,
                 username=settings.smtp_username,
                 password=settings.smtp_password,
+                timeout=deadline.remaining(settings.smtp_timeout),
             )
         LOGGER.info('Verification email sent to %s', email)
     except Exception:
@@ -117,22 +119,20 @@ async def verify_token(
     async with database.cursor(postgres) as cursor:
         await cursor.execute(
             """
-            SELECT account_id, expires_at, used_at
+            SELECT account_id, expires_at
               FROM v1.email_verification_tokens
              WHERE token = %(token)s
+               AND used_at IS NULL
             """,
             {'token': token},
         )
         if not cursor.rowcount:
+            # Unknown, already used, or purged by the janitor
+            LOGGER.warning('Token not found or already used: %s', token)
             return None
 
         data = await cursor.fetchone()
 
-        # Check if token has been used
-        if data['used_at']:
-            LOGGER.warning('Token already used: %s', token)
-            return None
-
         # Check if token has expired
         if data['expires_at'] < common.current_timestamp():
             LOGGER.warning('Token expired: %s', token)
@@ -144,8 +144,12 @@ async def verify_token(
             UPDATE v1.email_verification_tokens
                SET used_at = %(used_at)s
              WHERE token = %(token)s
+               AND used_at IS NULL
             """,
             {'token': token, 'used_at': common.current_timestamp()},
         )
+        if not cursor.rowcount:
+            # Used by a concurrent request
+            return None
 
         return data['account_id']
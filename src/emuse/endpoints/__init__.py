@@ -1,17 +1,27 @@
+from .autocomplete import router as autocomplete_router
 from .index import router as index_router
 from .login import router as login_router
 from .logout import router as logout_router
 from .me import router as me_router
+from .metrics import router as metrics_router
+from .poems import router as poems_router
 from .signup import router as signup_router
+from .sitemap import router as sitemap_router
+from .status import router as status_router
 from .turnstile import router as turnstile_router
 from .verify_email import router as verify_email_router
 
 __all__ = [
+    'autocomplete_router',
     'index_router',
     'login_router',
     'logout_router',
     'me_router',
+    'metrics_router',
+    'poems_router',
     'signup_router',
+    'sitemap_router',
+    'status_router',
     'turnstile_router',
     'verify_email_router',
 ]
@@ -0,0 +1,108 @@
+import re
+import typing
+
+import fastapi
+import pydantic
+
+from emuse import cache, database, models
+
+router = fastapi.APIRouter()
+
+# Called on every keystroke, so results are capped and cached briefly
+_MAX_RESULTS = 10
+_CACHE_CONTROL = 'public, max-age=30'
+
+Kind = typing.Literal['authors', 'tags']
+
+
+class Suggestions(pydantic.BaseModel):
+    authors: list[models.Author] = pydantic.Field(default_factory=list)
+    tags: list[str] = pydantic.Field(default_factory=list)
+
+
+# Up to _MAX_RESULTS suggestions by kind and lowercased prefix
+_suggestions: cache.LRUCache[tuple[Kind, str], list] = cache.LRUCache(
+    maxsize=4096, ttl=30
+)
+
+
+def _escape(prefix: str) -> str:
+    """Escape LIKE wildcards in user input"""
+    return re.sub(r'([\\%_])', r'\\\1', prefix)
+
+
+async def _search(
+    postgres: database.ConnectionType, kind: Kind, prefix: str
+) -> list:
+    key = kind, prefix
+    value = _suggestions.get(key)
+    if value is None:
+        escaped = _escape(prefix)
+        params = {
+            'prefix': f'{escaped}%',
+            'word': f'% {escaped}%',
+            'limit': _MAX_RESULTS,
+        }
+        if kind == 'authors':
+            async with database.cursor(postgres, models.Author) as cursor:
+                await cursor.execute(_AUTHORS_SQL, params)
+                value = await cursor.fetchall()
+        else:
+            async with database.cursor(postgres) as cursor:
+                await cursor.execute(_TAGS_SQL, params)
+                value = [row['tag'] async for row in cursor]
+        _suggestions.set(key, value)
+    return value
+
+
+@router.get('/api/autocomplete')
+async def autocomplete(
+    postgres: database.InjectReadConnection,
+    response: fastapi.Response,
+    q: str = fastapi.Query(min_length=2, max_length=100),
+    kind: Kind | None = None,
+    limit: int = fastapi.Query(default=_MAX_RESULTS, ge=1, le=_MAX_RESULTS),
+) -> Suggestions:
+    """Return authors and tags starting with the prefix."""
+    prefix = q.strip().casefold()
+    result = Suggestions()
+    if len(prefix) >= 2:
+        if kind in {None, 'authors'}:
+            # Authors match at the start of any word of their display name
+            authors = await _search(postgres, 'authors', prefix)
+            result.authors = authors[:limit]
+        if kind in {None, 'tags'}:
+            tags = await _search(postgres, 'tags', prefix)
+            result.tags = tags[:limit]
+    response.headers['Cache-Control'] = _CACHE_CONTROL
+    return result
+
+
+_AUTHORS_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+  SELECT id,
+         display_name,
+         memorial
+    FROM v1.accounts
+   WHERE (display_name ILIKE %(prefix)s OR display_name ILIKE %(word)s)
+     AND activated
+     AND NOT locked
+ORDER BY length(display_name), display_name
+   LIMIT %(limit)s
+""",
+)
+
+_TAGS_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+  SELECT tag
+    FROM v1.tags
+   WHERE tag ILIKE %(prefix)s
+     AND poems > 0
+ORDER BY poems DESC, tag
+   LIMIT %(limit)s
+""",
+)
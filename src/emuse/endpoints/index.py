@@ -1,38 +1,39 @@
 import fastapi
 
-from emuse import common, database, template
+from emuse import assets, common, feed, template
 
 router = fastapi.APIRouter()
 
 
-async def _render_index(_postgres: database.InjectConnection) -> str:
+async def _render_index(homepage_feed: feed.HomepageFeed) -> str:
     """Render the index HTML template."""
-    # Leave the _postgres connection as we're going to use it for real data
-    # at some point in the development process when we add things to the
-    # homepage
     settings = common.Settings()
     return await template.render_async(
         'index.html.j2',
         title='Home',
         debug=settings.debug,
         vite_dev_url=settings.vite_dev_url,
+        feed=homepage_feed.json,
+        assets=assets.entry(template.STATIC_PATH),
     )
 
 
 @router.get('/')
-async def get_index(postgres: database.InjectConnection) -> fastapi.Response:
-    html = await _render_index(postgres)
+async def get_index(
+    homepage_feed: feed.InjectHomepageFeed,
+) -> fastapi.Response:
+    html = await _render_index(homepage_feed)
     return fastapi.Response(content=html, media_type='text/html')
 
 
 @router.get('/{full_path:path}')
 async def spa_catchall(
-    full_path: str, postgres: database.InjectConnection
+    full_path: str, homepage_feed: feed.InjectHomepageFeed
 ) -> fastapi.Response:
     """Catch-all route to serve the SPA for any non-API route."""
     # Only serve HTML for routes that don't start with /api or /static
     if full_path.startswith('api/') or full_path.startswith('static/'):
         raise fastapi.HTTPException(status_code=404, detail='Not Found')
 
-    html = await _render_index(postgres)
+    html = await _render_index(homepage_feed)
     return fastapi.Response(content=html, media_type='text/html')
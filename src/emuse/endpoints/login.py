@@ -5,7 +5,9 @@ import fastapi
 import pydantic
 from fastapi import responses
 
-from emuse import database, models, session, turnstile
+from emuse import common, database, models, rate_limit, serialization, session
+
+turnstile = common.lazy_import('emuse.turnstile')
 
 router = fastapi.APIRouter()
 
@@ -37,11 +39,16 @@ class PublicAccount(pydantic.BaseModel):
     administrator: bool
 
 
-@router.post('/api/login')
+# Reject floods before a connection is taken, the Turnstile call and the
+# password hash
+@router.post(
+    '/api/login', dependencies=[fastapi.Depends(rate_limit.limit('login'))]
+)
 async def login(
     credentials: Credentials,
     postgres: database.InjectConnection,
     response: responses.Response,
+    background_tasks: fastapi.BackgroundTasks,
     fastapi_request: fastapi.Request,
 ) -> PublicAccount:
     # Verify Turnstile token before attempting authentication
@@ -54,8 +61,9 @@ async def login(
             detail='CAPTCHA verification failed. Please try again.',
         )
 
+    password = credentials.password.get_secret_value()
     result = await models.Account.authenticate(
-        postgres, credentials.email, credentials.password.get_secret_value()
+        postgres, credentials.email, password
     )
     if isinstance(result, models.Account):
         # Validate account status
@@ -75,7 +83,12 @@ async def login(
                 detail='This is a memorial account and cannot be accessed',
             )
         await session.create(response, result.id)
-        return PublicAccount(**result.model_dump(exclude={'password', 'salt'}))
+        if result.needs_rehash():
+            # Upgrade the hash once the response has been sent
+            background_tasks.add_task(
+                result.rehash, fastapi_request.state.postgres, password
+            )
+        return serialization.project(PublicAccount, result)
     raise fastapi.HTTPException(
         status_code=403, detail='Invalid email or password'
     )
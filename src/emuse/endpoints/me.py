@@ -1,6 +1,6 @@
 import fastapi
 
-from emuse import database, models, session
+from emuse import database, models, serialization, session
 from emuse.endpoints.login import PublicAccount
 
 router = fastapi.APIRouter()
@@ -8,7 +8,7 @@ router = fastapi.APIRouter()
 
 @router.get('/api/me')
 async def me(
-    postgres: database.InjectConnection,
+    postgres: database.InjectReadConnection,
     session_data: session.SessionData = fastapi.Depends(
         session.Session.get_instance().verifier
     ),
@@ -20,4 +20,4 @@ async def me(
             status_code=401, detail='Account not found'
         )
 
-    return PublicAccount(**account.model_dump(exclude={'password', 'salt'}))
+    return serialization.project(PublicAccount, account)
@@ -0,0 +1,42 @@
+import ipaddress
+import secrets
+
+import fastapi
+
+from emuse import common, metrics
+
+router = fastapi.APIRouter()
+
+
+async def _authorize(request: fastapi.Request) -> None:  # noqa: RUF029
+    """Require METRICS_TOKEN or, without one, a private client address"""
+    token = common.Settings().metrics_token
+    if token is not None:
+        scheme, _, value = request.headers.get('Authorization', '').partition(
+            ' '
+        )
+        if scheme.lower() == 'bearer' and secrets.compare_digest(
+            value.encode(), token.get_secret_value().encode()
+        ):
+            return
+    elif request.client is not None:
+        try:
+            address = ipaddress.ip_address(request.client.host)
+        except ValueError:
+            pass
+        else:
+            if address.is_private or address.is_loopback:
+                return
+    raise fastapi.HTTPException(status_code=404, detail='Not Found')
+
+
+@router.get(
+    '/metrics',
+    include_in_schema=False,
+    dependencies=[fastapi.Depends(_authorize)],
+)
+async def get_metrics() -> fastapi.Response:
+    """Expose application metrics in the Prometheus text format."""
+    return fastapi.Response(
+        content=metrics.render(), media_type='text/plain; version=0.0.4'
+    )
@@ -0,0 +1,325 @@
+import datetime
+import io
+import uuid
+from collections import abc
+
+import fastapi
+import pydantic
+import pydantic_core
+from starlette import datastructures, formparsers
+
+from emuse import (
+    cache,
+    database,
+    http_cache,
+    importer,
+    models,
+    serialization,
+    session,
+    view_counter,
+)
+
+router = fastapi.APIRouter()
+
+
+# Serialized public poems, keyed by entity tag
+_public_poems: cache.LRUCache[str, bytes] = cache.LRUCache(
+    maxsize=1024, ttl=300
+)
+
+_PUBLIC_CACHE_CONTROL = 'public, max-age=60, stale-while-revalidate=300'
+_PRIVATE_CACHE_CONTROL = 'private, no-cache'
+
+
+class PoemDetail(pydantic.BaseModel):
+    id: uuid.UUID
+    author: models.Author | None
+    title: str | None
+    created_at: datetime.date
+    posted_at: datetime.datetime
+    updated_at: datetime.datetime
+    language: str | None
+    explicit: bool
+    privacy_level: models.PrivacyLevel
+    content: str
+    notes: str | None
+    tags: list[str]
+
+
+class PoemText(pydantic.BaseModel):
+    content: str = pydantic.Field(min_length=1)
+    notes: str | None = None
+
+
+class PoemUpdated(pydantic.BaseModel):
+    revision: int
+
+
+class PoemListItem(pydantic.BaseModel):
+    id: uuid.UUID
+    author: models.Author | None
+    title: str | None
+    posted_at: datetime.datetime
+    updated_at: datetime.datetime
+    privacy_level: models.PrivacyLevel
+    tags: list[str]
+
+
+async def _list_items(
+    authors: models.AuthorLoader, poems: list[models.PoemSummary]
+) -> list[PoemListItem]:
+    """Attach authors to poems, fetching all of them with one query."""
+    found = await authors.get_many(poem.owner for poem in poems)
+    return [
+        serialization.project(PoemListItem, poem, author=found.get(poem.owner))
+        for poem in poems
+    ]
+
+
+@router.get('/api/poems')
+async def list_poems(
+    owner: uuid.UUID,
+    postgres: database.InjectReadConnection,
+    authors: models.InjectAuthorLoader,
+    viewer: models.InjectViewer,
+    before: datetime.datetime | None = None,
+    limit: int = fastapi.Query(default=20, ge=1, le=100),
+) -> list[PoemListItem]:
+    """List an owner's poems that the current visitor may read."""
+    levels = models.poem.visible_levels(
+        owner, viewer.account_id, await viewer.friend_ids(postgres)
+    )
+    poems = await models.PoemSummary.for_owner(
+        postgres, owner, levels, before, limit
+    )
+    return await _list_items(authors, poems)
+
+
+@router.get('/api/poems/feed')
+async def friends_feed(
+    postgres: database.InjectReadConnection,
+    authors: models.InjectAuthorLoader,
+    viewer: models.InjectViewer,
+    before: datetime.datetime | None = None,
+    limit: int = fastapi.Query(default=20, ge=1, le=100),
+) -> list[PoemListItem]:
+    """List the most recent poems shared by the visitor's friends."""
+    if not viewer.account_id:
+        raise fastapi.HTTPException(status_code=403, detail='Invalid Session')
+    poems = await models.PoemSummary.from_friends(
+        postgres, await viewer.friend_ids(postgres), before, limit
+    )
+    return await _list_items(authors, poems)
+
+
+@router.get('/api/poems/{poem_id}', response_model=PoemDetail)
+async def get_poem(
+    poem_id: uuid.UUID,
+    request: fastapi.Request,
+    postgres: database.InjectReadConnection,
+    viewer: models.InjectViewer,
+    views: view_counter.InjectViewCounter,
+) -> fastapi.Response:
+    """Return a poem if the current visitor is allowed to read it."""
+    account_id = viewer.account_id
+    # Only the version is queried when the client's copy is current
+    version = await models.Poem.get_version(postgres, poem_id)
+    if not version:
+        raise fastapi.HTTPException(status_code=404, detail='Poem not found')
+    friend_ids = (
+        await viewer.friend_ids(postgres)
+        if version.privacy_level == models.PrivacyLevel.friends_only
+        else frozenset()
+    )
+    if not version.visible_to(account_id, friend_ids):
+        raise fastapi.HTTPException(status_code=404, detail='Poem not found')
+
+    public = version.privacy_level == models.PrivacyLevel.public
+    headers = {
+        'Cache-Control': (
+            _PUBLIC_CACHE_CONTROL if public else _PRIVATE_CACHE_CONTROL
+        ),
+        # Covers the author too, as renames do not change updated_at.
+        # Last-Modified is not sent for the same reason.
+        'ETag': http_cache.etag(
+            version.id,
+            version.updated_at.isoformat(),
+            version.author_name,
+            version.author_memorial,
+        ),
+    }
+    if not public:
+        headers['Vary'] = 'Cookie'
+    if http_cache.not_modified(request.headers, headers['ETag']):
+        return fastapi.Response(status_code=304, headers=headers)
+    # Revalidations are not counted as views
+    if version.owner != account_id:
+        views.record(version.id)
+
+    key = headers['ETag']
+    body = _public_poems.get(key) if public else None
+    if body is None:
+        poem = await models.Poem.get(postgres, poem_id)
+        if not poem or not poem.visible_to(account_id, friend_ids):
+            raise fastapi.HTTPException(
+                status_code=404, detail='Poem not found'
+            )
+        author = (
+            None
+            if version.author_name is None
+            else models.Author(
+                id=version.owner,
+                display_name=version.author_name,
+                memorial=bool(version.author_memorial),
+            )
+        )
+        body = pydantic_core.to_json(
+            serialization.project(PoemDetail, poem, author=author)
+        )
+        if public and poem.updated_at == version.updated_at:
+            _public_poems.set(key, body)
+    return fastapi.Response(
+        content=body, media_type='application/json', headers=headers
+    )
+
+
+async def _owned_version(
+    postgres: database.ConnectionType,
+    poem_id: uuid.UUID,
+    viewer: models.Viewer,
+) -> models.PoemVersion:
+    """Return the poem's version if the viewer owns it, otherwise 404"""
+    version = await models.Poem.get_version(postgres, poem_id)
+    if not version or version.owner != viewer.account_id:
+        raise fastapi.HTTPException(status_code=404, detail='Poem not found')
+    return version
+
+
+@router.put('/api/poems/{poem_id}')
+async def update_poem(
+    poem_id: uuid.UUID,
+    text: PoemText,
+    postgres: database.InjectConnection,
+    viewer: models.InjectViewer,
+) -> PoemUpdated:
+    """Replace the content and notes of a poem owned by the visitor."""
+    await _owned_version(postgres, poem_id, viewer)
+    revision = await models.Poem.update_text(
+        postgres, poem_id, text.content, text.notes
+    )
+    return PoemUpdated(revision=revision)
+
+
+@router.get('/api/poems/{poem_id}/revisions')
+async def list_revisions(
+    poem_id: uuid.UUID,
+    postgres: database.InjectReadConnection,
+    viewer: models.InjectViewer,
+) -> list[models.RevisionInfo]:
+    """Return the revision history of a poem to its owner."""
+    await _owned_version(postgres, poem_id, viewer)
+    return await models.revision.history(postgres, poem_id)
+
+
+@router.get('/api/poems/{poem_id}/revisions/{revision}')
+async def get_revision(
+    poem_id: uuid.UUID,
+    revision: int,
+    postgres: database.InjectReadConnection,
+    viewer: models.InjectViewer,
+) -> models.Revision:
+    """Return the content and notes of a poem as of a revision."""
+    await _owned_version(postgres, poem_id, viewer)
+    value = await models.revision.get(postgres, poem_id, revision)
+    if value is None:
+        raise fastapi.HTTPException(
+            status_code=404, detail='Revision not found'
+        )
+    return value
+
+
+async def _limited(
+    stream: abc.AsyncIterator[bytes], limit: int
+) -> abc.AsyncGenerator[bytes]:
+    """Pass the request body through, rejecting it past the limit"""
+    received = 0
+    async for chunk in stream:
+        received += len(chunk)
+        if received > limit:
+            raise fastapi.HTTPException(
+                status_code=413, detail='Import file is too large'
+            )
+        yield chunk
+
+
+@router.post(
+    '/api/poems/import',
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {
+                'multipart/form-data': {
+                    'schema': {
+                        'type': 'object',
+                        'required': ['file'],
+                        'properties': {
+                            'file': {'type': 'string', 'format': 'binary'}
+                        },
+                    }
+                }
+            },
+        }
+    },
+)
+async def import_poems(
+    request: fastapi.Request,
+    postgres: database.InjectConnection,
+    fmt: importer.Format | None = fastapi.Query(default=None, alias='format'),
+    session_data: session.SessionData = fastapi.Depends(
+        session.Session.get_instance().verifier
+    ),
+) -> importer.ImportResult:
+    """Bulk import poems from an uploaded NDJSON or CSV file."""
+    settings = importer.Settings()
+    length = request.headers.get('Content-Length')
+    if length and length.isdigit() and int(length) > settings.max_upload_size:
+        raise fastapi.HTTPException(
+            status_code=413, detail='Import file is too large'
+        )
+    # Parsed here rather than by FastAPI so that oversized uploads are
+    # rejected before they are spooled to disk
+    parser = formparsers.MultiPartParser(
+        request.headers,
+        _limited(request.stream(), settings.max_upload_size),
+        max_files=1,
+        max_fields=1,
+    )
+    try:
+        form = await parser.parse()
+    except formparsers.MultiPartException as err:
+        raise fastapi.HTTPException(
+            status_code=400, detail=err.message
+        ) from err
+    file = form.get('file')
+    try:
+        if not isinstance(file, datastructures.UploadFile):
+            raise fastapi.HTTPException(
+                status_code=422, detail='An import file is required'
+            )
+        fmt = fmt or importer.Format.detect(file.filename)
+        if not fmt:
+            raise fastapi.HTTPException(
+                status_code=400,
+                detail='Unable to determine the file format, specify csv or '
+                'ndjson',
+            )
+        # The upload is spooled by now, so read it as a text stream
+        stream = io.TextIOWrapper(file.file, encoding='utf-8', newline='')
+        try:
+            return await importer.import_poems(
+                postgres, session_data.account_id, stream, fmt
+            )
+        finally:
+            stream.detach()
+    finally:
+        await form.close()
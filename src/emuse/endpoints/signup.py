@@ -6,7 +6,10 @@ import psycopg.errors
 import pydantic
 from pydantic_extra_types import timezone_name
 
-from emuse import database, email, models, turnstile
+from emuse import common, database, known_emails, models, rate_limit
+
+email = common.lazy_import('emuse.email')
+turnstile = common.lazy_import('emuse.turnstile')
 
 router = fastapi.APIRouter()
 
@@ -71,7 +74,11 @@ class SignupResponse(pydantic.BaseModel):
     email: pydantic.EmailStr
 
 
-@router.post('/api/signup')
+# Reject floods before a connection is taken, the Turnstile call and the
+# password hash
+@router.post(
+    '/api/signup', dependencies=[fastapi.Depends(rate_limit.limit('signup'))]
+)
 async def signup(
     request: SignupRequest,
     postgres: database.InjectConnection,
@@ -87,16 +94,18 @@ async def signup(
             detail='CAPTCHA verification failed. Please try again.',
         )
 
-    # Check if email already exists
-    async with database.cursor(postgres) as cursor:
-        await cursor.execute(
-            'SELECT id FROM v1.accounts WHERE email = %(email)s',
-            {'email': str(request.email)},
-        )
-        if cursor.rowcount > 0:
-            raise fastapi.HTTPException(
-                status_code=400, detail='Email already registered'
+    # Check if email already exists, unless the filter rules it out
+    if known_emails.might_exist(str(request.email)):
+        async with database.cursor(postgres) as cursor:
+            await cursor.execute(
+                'SELECT id FROM v1.accounts WHERE email = %(email)s',
+                {'email': str(request.email)},
             )
+            if cursor.rowcount > 0:
+                raise fastapi.HTTPException(
+                    status_code=400, detail='Email already registered'
+                )
+        known_emails.false_positive()
 
     # Create account
     account = models.Account(
@@ -112,7 +121,7 @@ async def signup(
     )
 
     # Set password with proper hashing
-    account.set_password(request.password.get_secret_value())
+    await account.set_password(request.password.get_secret_value())
 
     # Save account to database
     try:
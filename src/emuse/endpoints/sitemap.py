@@ -0,0 +1,271 @@
+import datetime
+import html
+import re
+import typing
+import uuid
+import zlib
+from collections import abc
+
+import fastapi
+import pydantic
+import pydantic_settings
+from fastapi import responses
+
+from emuse import cache, database, http_cache
+
+router = fastapi.APIRouter()
+
+_NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+_CACHE_CONTROL = 'public, max-age=3600'
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'sitemap_',
+        'extra': 'ignore',
+    }
+
+    base_url: str = 'https://emuse.org'
+    chunk_size: int = pydantic.Field(default=10000, le=50000)
+
+
+class Chunk(pydantic.BaseModel):
+    """A range of ids in one sitemap file"""
+
+    kind: typing.Literal['poems', 'authors']
+    first: uuid.UUID
+    last: uuid.UUID
+    count: int
+    lastmod: datetime.datetime
+
+    @property
+    def key(self) -> tuple:
+        return self.kind, self.first, self.last, self.count, self.lastmod
+
+
+# Chunk boundaries, rebuilt after the TTL
+_chunks: cache.LRUCache[int, list[Chunk]] = cache.LRUCache(maxsize=1, ttl=300)
+# Gzipped chunks by their range and content
+_files: cache.LRUCache[tuple, bytes] = cache.LRUCache(maxsize=256)
+
+# The next chunk after an id, read from an index in id order, so each
+# chunk costs a scan of its own rows only
+_BOUNDARIES_SQL = {
+    'poems': re.sub(
+        r'\s+',
+        ' ',
+        """\
+  SELECT 'poems' AS kind,
+         min(id) AS first,
+         max(id) AS last,
+         count(*) AS count,
+         max(updated_at) AS lastmod
+    FROM (SELECT id,
+                 updated_at
+            FROM v1.poetry
+           WHERE privacy_level = 'public'
+             AND id > %(after)s
+        ORDER BY id
+           LIMIT %(size)s) AS chunk
+  HAVING count(*) > 0
+""",
+    ),
+    'authors': re.sub(
+        r'\s+',
+        ' ',
+        """\
+  SELECT 'authors' AS kind,
+         min(id) AS first,
+         max(id) AS last,
+         count(*) AS count,
+         max(lastmod) AS lastmod
+    FROM (SELECT a.id,
+                 max(p.updated_at) AS lastmod
+            FROM v1.accounts AS a
+            JOIN v1.poetry AS p
+              ON p.owner = a.id
+           WHERE p.privacy_level = 'public'
+             AND a.activated
+             AND NOT a.locked
+             AND a.id > %(after)s
+        GROUP BY a.id
+        ORDER BY a.id
+           LIMIT %(size)s) AS chunk
+  HAVING count(*) > 0
+""",
+    ),
+}
+
+_ENTRIES_SQL = {
+    'poems': re.sub(
+        r'\s+',
+        ' ',
+        """\
+  SELECT id,
+         updated_at AS lastmod
+    FROM v1.poetry
+   WHERE privacy_level = 'public'
+     AND id BETWEEN %(first)s AND %(last)s
+ORDER BY id
+""",
+    ),
+    'authors': re.sub(
+        r'\s+',
+        ' ',
+        """\
+  SELECT a.id,
+         max(p.updated_at) AS lastmod
+    FROM v1.accounts AS a
+    JOIN v1.poetry AS p
+      ON p.owner = a.id
+   WHERE p.privacy_level = 'public'
+     AND a.activated
+     AND NOT a.locked
+     AND a.id BETWEEN %(first)s AND %(last)s
+GROUP BY a.id
+ORDER BY a.id
+""",
+    ),
+}
+
+
+async def _get_chunks(
+    postgres: database.ConnectionType, size: int
+) -> list[Chunk]:
+    value = _chunks.get(size)
+    if value is None:
+        value = []
+        async with database.cursor(postgres, Chunk) as cursor:
+            for sql in _BOUNDARIES_SQL.values():
+                after = uuid.UUID(int=0)
+                while True:
+                    await cursor.execute(sql, {'after': after, 'size': size})
+                    chunk = await cursor.fetchone()
+                    if chunk is None:
+                        break
+                    value.append(chunk)
+                    if chunk.count < size:
+                        break
+                    after = chunk.last
+        _chunks.set(size, value)
+    return value
+
+
+def _lastmod(value: datetime.datetime) -> str:
+    return value.astimezone(datetime.UTC).isoformat(timespec='seconds')
+
+
+@router.get('/sitemap.xml')
+async def sitemap_index(
+    postgres: database.InjectReadConnection,
+) -> fastapi.Response:
+    """Return the sitemap index listing every chunk."""
+    settings = _Settings()
+    lines = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<sitemapindex xmlns="{_NAMESPACE}">',
+    ]
+    for number, chunk in enumerate(
+        await _get_chunks(postgres, settings.chunk_size), 1
+    ):
+        loc = html.escape(
+            f'{settings.base_url}/sitemap-{number}.xml.gz', quote=False
+        )
+        lines.append(
+            f'<sitemap><loc>{loc}</loc>'
+            f'<lastmod>{_lastmod(chunk.lastmod)}</lastmod></sitemap>'
+        )
+    lines.append('</sitemapindex>')
+    return fastapi.Response(
+        content='\n'.join(lines),
+        media_type='application/xml',
+        headers={'Cache-Control': _CACHE_CONTROL},
+    )
+
+
+async def _stream(
+    pool: database.PoolType, chunk: Chunk, base_url: str
+) -> abc.AsyncIterator[bytes]:
+    """Yield the gzipped chunk as rows arrive, caching the result."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    parts = []
+
+    def write(text: str) -> bytes:
+        data = compressor.compress(text.encode('utf-8'))
+        parts.append(data)
+        return data
+
+    yield write(
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        f'<urlset xmlns="{_NAMESPACE}">\n'
+    )
+    # The SPA's /poems/<id> and /authors/<id> routes
+    prefix = html.escape(f'{base_url}/{chunk.kind}/', quote=False)
+    async with (
+        pool.connection() as conn,
+        conn.transaction(),
+        conn.cursor('sitemap') as cursor,
+    ):
+        cursor.itersize = 1000
+        await cursor.execute(
+            _ENTRIES_SQL[chunk.kind],
+            {'first': chunk.first, 'last': chunk.last},
+        )
+        async for row in cursor:
+            data = write(
+                f'<url><loc>{prefix}{row["id"]}</loc>'
+                f'<lastmod>{_lastmod(row["lastmod"])}</lastmod></url>\n'
+            )
+            # The compressor buffers, only send what it has produced
+            if data:
+                yield data
+    yield write('</urlset>\n')
+    data = compressor.flush()
+    parts.append(data)
+    yield data
+    _files.set(chunk.key, b''.join(parts))
+
+
+@router.get('/sitemap-{number}.xml.gz')
+async def sitemap_chunk(
+    number: int,
+    request: fastapi.Request,
+    postgres: database.InjectReadConnection,
+) -> fastapi.Response:
+    """Return a gzipped chunk of the sitemap."""
+    settings = _Settings()
+    chunks = await _get_chunks(postgres, settings.chunk_size)
+    if not 0 < number <= len(chunks):
+        raise fastapi.HTTPException(status_code=404, detail='Not Found')
+    chunk = chunks[number - 1]
+    headers = {
+        'Cache-Control': _CACHE_CONTROL,
+        'ETag': http_cache.etag(*chunk.key),
+        'Last-Modified': http_cache.http_date(chunk.lastmod),
+    }
+    if http_cache.not_modified(
+        request.headers, headers['ETag'], chunk.lastmod
+    ):
+        return fastapi.Response(status_code=304, headers=headers)
+    body = _files.get(chunk.key)
+    if body is not None:
+        return fastapi.Response(
+            content=body, media_type='application/gzip', headers=headers
+        )
+    # Stream with a connection of its own rather than relying on the
+    # injected one outliving the handler
+    replica = typing.cast(
+        database.Replica | None, request.state.postgres_replica
+    )
+    pool = (
+        replica.pool
+        if replica and replica.healthy
+        else typing.cast(database.PoolType, request.state.postgres)
+    )
+    return responses.StreamingResponse(
+        _stream(pool, chunk, settings.base_url),
+        media_type='application/gzip',
+        headers=headers,
+    )
@@ -0,0 +1,26 @@
+import fastapi
+import pydantic
+
+from emuse import __version__, admission, hashing
+
+router = fastapi.APIRouter()
+
+
+class Status(pydantic.BaseModel):
+    status: str
+    version: str
+    in_flight: int
+    pool_waiting: int
+    hash_queue: int
+
+
+@router.get('/status', include_in_schema=False)
+async def get_status(request: fastapi.Request) -> Status:
+    """Report the load that admission control decisions are based on."""
+    return Status(
+        status='ok',
+        version=__version__,
+        in_flight=int(admission.IN_FLIGHT.value()),
+        pool_waiting=admission.pool_waiting(request.scope.get('state', {})),
+        hash_queue=hashing.pending(),
+    )
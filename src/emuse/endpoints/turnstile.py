@@ -3,7 +3,9 @@
 import fastapi
 import pydantic
 
-from emuse import turnstile
+from emuse import common
+
+turnstile = common.lazy_import('emuse.turnstile')
 
 router = fastapi.APIRouter()
 
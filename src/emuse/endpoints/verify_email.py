@@ -1,7 +1,9 @@
 import fastapi
 import pydantic
 
-from emuse import database, email, models
+from emuse import common, database, models
+
+email = common.lazy_import('emuse.email')
 
 router = fastapi.APIRouter()
 
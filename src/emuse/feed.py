@@ -0,0 +1,165 @@
+"""Precomputed homepage feed of recent public poems."""
+
+import asyncio
+import contextlib
+import datetime
+import logging
+import time
+import typing
+import uuid
+from collections import abc
+
+import fastapi
+import psycopg
+import pydantic
+import pydantic_core
+import pydantic_settings
+
+from emuse import database, invalidation, metrics, models
+
+LOGGER = logging.getLogger(__name__)
+
+# Announced by a trigger on v1.poetry, marks the feed stale
+CHANNEL = 'poetry_changed'
+
+LAST_REBUILD = metrics.Gauge(
+    'emuse_homepage_feed_last_rebuild_timestamp_seconds',
+    'Unix time of the last homepage feed rebuild',
+)
+REBUILDS = metrics.Counter(
+    'emuse_homepage_feed_rebuilds_total', 'Homepage feed rebuilds'
+)
+REBUILD_ERRORS = metrics.Counter(
+    'emuse_homepage_feed_rebuild_errors_total', 'Failed homepage feed rebuilds'
+)
+
+
+# Escapes that keep JSON from closing the <script> element it is embedded in
+_SCRIPT_SAFE = str.maketrans({
+    '<': '\\u003c',
+    '>': '\\u003e',
+    '&': '\\u0026',
+    "'": '\\u0027',
+})
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'feed_',
+        'extra': 'ignore',
+    }
+
+    size: int = 20
+    max_age: float = 300.0
+    debounce: float = 1.0
+
+
+class FeedItem(pydantic.BaseModel):
+    id: uuid.UUID
+    author: models.Author | None
+    title: str | None
+    posted_at: datetime.datetime
+    tags: list[str]
+
+
+class HomepageFeed:
+    """The most recent public poems, rebuilt in the background"""
+
+    def __init__(
+        self,
+        pool: database.PoolType,
+        size: int,
+        max_age: float,
+        debounce: float,
+    ) -> None:
+        self.items: list[FeedItem] = []
+        self.json = '[]'
+        self._pool = pool
+        self._size = size
+        self._max_age = max_age
+        self._debounce = debounce
+        self._built_at = 0.0
+        self._stale = asyncio.Event()
+
+    @property
+    def age(self) -> float:
+        """Seconds since the feed was last rebuilt."""
+        return time.monotonic() - self._built_at
+
+    def invalidate(self) -> None:
+        """Mark the feed as stale so it is rebuilt."""
+        self._stale.set()
+
+    async def rebuild(self) -> None:
+        async with self._pool.connection() as conn:
+            poems = await models.PoemSummary.recent_public(conn, self._size)
+            authors = await models.AuthorLoader(conn).get_many(
+                poem.owner for poem in poems
+            )
+        self.items = [
+            FeedItem(
+                **poem.model_dump(include=set(FeedItem.model_fields)),
+                author=authors.get(poem.owner),
+            )
+            for poem in poems
+        ]
+        # Serialized once here rather than on every render of the shell
+        value = pydantic_core.to_json(self.items).decode()
+        self.json = value.translate(_SCRIPT_SAFE)
+        self._built_at = time.monotonic()
+        LAST_REBUILD.set(time.time())
+        REBUILDS.inc()
+        LOGGER.debug('Rebuilt homepage feed with %i poems', len(self.items))
+
+    async def run(self) -> None:
+        """Rebuild when invalidated or when the feed reaches max_age."""
+        while True:
+            # Also rebuild on a timer in case a notification was missed
+            timeout = max(self._max_age - self.age, 0)
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._stale.wait(), timeout)
+            # Let a burst of changes settle into a single rebuild
+            if self._stale.is_set():
+                await asyncio.sleep(self._debounce)
+            self._stale.clear()
+            try:
+                await self.rebuild()
+            except psycopg.Error as err:
+                REBUILD_ERRORS.inc()
+                LOGGER.warning('Failed to rebuild homepage feed: %s', err)
+                await asyncio.sleep(self._debounce)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(
+    pool: database.PoolType, bus: invalidation.Bus
+) -> abc.AsyncGenerator[HomepageFeed]:
+    """Build the feed and keep it up to date until shutdown."""
+    settings = _Settings()
+    feed = HomepageFeed(
+        pool, settings.size, settings.max_age, settings.debounce
+    )
+    try:
+        await feed.rebuild()
+    except psycopg.Error as err:
+        REBUILD_ERRORS.inc()
+        LOGGER.warning('Failed to build homepage feed: %s', err)
+    bus.subscribe(CHANNEL, lambda _: feed.invalidate())
+    task = asyncio.create_task(feed.run())
+    try:
+        yield feed
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+async def homepage_feed(request: fastapi.Request) -> HomepageFeed:  # noqa: RUF029
+    return typing.cast(HomepageFeed, request.state.homepage_feed)
+
+
+InjectHomepageFeed = typing.Annotated[
+    HomepageFeed, fastapi.Depends(homepage_feed)
+]
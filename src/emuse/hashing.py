@@ -0,0 +1,71 @@
+"""Runs CPU-bound password hashing off of the event loop."""
+
+import asyncio
+import functools
+import os
+from collections import abc
+from concurrent import futures
+
+import pydantic_settings
+
+from emuse import metrics
+
+QUEUE_DEPTH = metrics.Gauge(
+    'emuse_hash_queue_depth', 'Password hashes queued or running'
+)
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'hashing_',
+        'extra': 'ignore',
+    }
+
+    max_workers: int = min(4, os.cpu_count() or 1)
+
+
+# hashlib releases the GIL, so a few threads hash in parallel
+_executor: futures.ThreadPoolExecutor | None = None
+# Queued or running hashes, so admission control can shed password
+# endpoints before the queue grows unbounded
+_pending = 0
+
+
+def _get_executor() -> futures.ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = futures.ThreadPoolExecutor(
+            max_workers=_Settings().max_workers, thread_name_prefix='hashing'
+        )
+    return _executor
+
+
+def pending() -> int:
+    """Return the number of hashes queued or running."""
+    return _pending
+
+
+async def run[**P, T](
+    func: abc.Callable[P, T], *args: P.args, **kwargs: P.kwargs
+) -> T:
+    """Run a hashing function in the executor and return its result."""
+    global _pending
+    _pending += 1
+    QUEUE_DEPTH.set(_pending)
+    try:
+        return await asyncio.get_running_loop().run_in_executor(
+            _get_executor(), functools.partial(func, *args, **kwargs)
+        )
+    finally:
+        _pending -= 1
+        QUEUE_DEPTH.set(_pending)
+
+
+def shutdown() -> None:
+    """Stop the executor, waiting for running hashes to finish."""
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=True, cancel_futures=True)
+        _executor = None
@@ -0,0 +1,53 @@
+"""Helpers for HTTP caching and conditional requests."""
+
+import datetime
+import email.utils
+import hashlib
+
+import starlette.datastructures
+
+
+def etag(*parts: object) -> str:
+    """Return a strong entity tag derived from the given values."""
+    digest = hashlib.blake2b(
+        '\x00'.join(str(part) for part in parts).encode('utf-8'),
+        digest_size=16,
+    )
+    return f'"{digest.hexdigest()}"'
+
+
+def http_date(value: datetime.datetime) -> str:
+    """Format a timestamp for Last-Modified and similar headers."""
+    return email.utils.format_datetime(
+        value.astimezone(datetime.UTC), usegmt=True
+    )
+
+
+def not_modified(
+    headers: starlette.datastructures.Headers,
+    entity_tag: str,
+    last_modified: datetime.datetime | None = None,
+) -> bool:
+    """Return True if a conditional GET can be answered with a 304."""
+    # If-None-Match takes precedence over If-Modified-Since (RFC 9110)
+    if_none_match = headers.get('if-none-match')
+    if if_none_match is not None:
+        if if_none_match.strip() == '*':
+            return True
+        # Weak comparison is used for GET, so W/ prefixes are ignored
+        tags = {
+            value.strip().removeprefix('W/')
+            for value in if_none_match.split(',')
+        }
+        return entity_tag.removeprefix('W/') in tags
+    if_modified_since = headers.get('if-modified-since')
+    if if_modified_since and last_modified:
+        try:
+            since = email.utils.parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=datetime.UTC)
+        # HTTP dates have a resolution of one second
+        return last_modified.replace(microsecond=0) <= since
+    return False
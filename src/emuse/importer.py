@@ -0,0 +1,238 @@
+"""Bulk poem import from NDJSON or CSV files."""
+
+import asyncio
+import csv
+import datetime
+import enum
+import json
+import logging
+import pathlib
+import typing
+import uuid
+from collections import abc
+
+import pydantic
+import pydantic_settings
+
+from emuse import database, models
+from emuse.models import poem, revision
+
+LOGGER = logging.getLogger(__name__)
+
+# Positions in a COPY row of the columns kept in the first revision
+_ID = poem.COLUMNS.index('id')
+_CONTENT = poem.COLUMNS.index('content')
+_NOTES = poem.COLUMNS.index('notes')
+
+
+class Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'import_',
+        'extra': 'ignore',
+    }
+
+    batch_size: int = 500
+    max_errors: int = 100
+    max_record_size: int = 1024 * 1024
+    max_upload_size: int = 50 * 1024 * 1024
+
+
+class Format(enum.StrEnum):
+    csv = 'csv'
+    ndjson = 'ndjson'
+
+    @classmethod
+    def detect(cls, filename: str | None) -> typing.Self | None:
+        """Guess the format from a file name."""
+        suffix = pathlib.PurePath(filename or '').suffix.lower()
+        if suffix == '.csv':
+            return cls.csv
+        if suffix in {'.json', '.jsonl', '.ndjson'}:
+            return cls.ndjson
+        return None
+
+
+class PoemRecord(pydantic.BaseModel):
+    """A single poem as supplied in an import file"""
+
+    model_config = pydantic.ConfigDict(extra='forbid')
+
+    title: str | None = pydantic.Field(default=None, max_length=1024)
+    created_at: datetime.date | None = None
+    posted_at: datetime.datetime | None = None
+    language: str | None = None
+    explicit: bool = False
+    privacy_level: models.PrivacyLevel = models.PrivacyLevel.public
+    content: str = pydantic.Field(min_length=1)
+    notes: str | None = None
+    tags: list[str] = pydantic.Field(default_factory=list)
+
+    @pydantic.model_validator(mode='before')
+    @classmethod
+    def drop_empty_values(cls, data: typing.Any) -> typing.Any:
+        """CSV has no null, so treat empty cells as missing values."""
+        if isinstance(data, dict):
+            return {k: v for k, v in data.items() if v not in ('', None)}
+        return data
+
+    @pydantic.field_validator('tags', mode='before')
+    @classmethod
+    def split_tags(cls, value: typing.Any) -> typing.Any:
+        """Accept a comma separated string of tags from CSV files."""
+        if isinstance(value, str):
+            return [tag.strip() for tag in value.split(',') if tag.strip()]
+        return value
+
+
+class RowError(pydantic.BaseModel):
+    line: int
+    errors: list[str]
+
+
+class ImportResult(pydantic.BaseModel):
+    imported: int = 0
+    failed: int = 0
+    errors: list[RowError] = pydantic.Field(default_factory=list)
+    errors_truncated: bool = False
+
+
+_Record = tuple[int, dict[str, typing.Any] | str]
+
+
+def read_records(
+    stream: typing.TextIO, fmt: Format, max_record_size: int
+) -> abc.Iterator[_Record]:
+    """Yield (line number, record or error message) for each record."""
+    if fmt == Format.csv:
+        yield from _read_csv(stream, max_record_size)
+    else:
+        yield from _read_ndjson(stream, max_record_size)
+
+
+def _read_csv(
+    stream: typing.TextIO, max_record_size: int
+) -> abc.Iterator[_Record]:
+    # The default limit of 128 KiB is smaller than a long poem
+    csv.field_size_limit(max(csv.field_size_limit(), max_record_size))
+    reader = csv.DictReader(stream)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as err:
+            yield reader.line_num, str(err)
+            continue
+        if None in row:
+            yield reader.line_num, 'Row has more values than the header'
+        else:
+            yield reader.line_num, row
+
+
+def _read_ndjson(
+    stream: typing.TextIO, max_record_size: int
+) -> abc.Iterator[_Record]:
+    line_number = 0
+    while line := stream.readline(max_record_size + 1):
+        line_number += 1
+        if len(line) > max_record_size:
+            yield line_number, 'Record exceeds the maximum record size'
+            # Discard the remainder of the oversized line
+            while line and not line.endswith('\n'):
+                line = stream.readline(max_record_size)
+            continue
+        if not line.strip():
+            continue
+        try:
+            value = json.loads(line)
+        except ValueError as err:
+            yield line_number, f'Invalid JSON: {err}'
+            continue
+        if not isinstance(value, dict):
+            yield line_number, 'Record must be a JSON object'
+            continue
+        yield line_number, value
+
+
+def _to_row(owner: uuid.UUID, record: PoemRecord) -> tuple:
+    value = models.Poem(
+        owner=owner, **record.model_dump(exclude_none=True)
+    ).model_dump()
+    value['privacy_level'] = str(value['privacy_level'])
+    return tuple(value[column] for column in poem.COLUMNS)
+
+
+def _next_batch(
+    records: abc.Iterator[_Record], owner: uuid.UUID, batch_size: int
+) -> tuple[list[tuple], list[RowError], bool]:
+    """Validate records until a batch is full or the stream is exhausted."""
+    values, errors = [], []
+    line = 0
+    try:
+        for line, record in records:
+            if isinstance(record, str):
+                errors.append(RowError(line=line, errors=[record]))
+                continue
+            try:
+                values.append(
+                    _to_row(owner, PoemRecord.model_validate(record))
+                )
+            except pydantic.ValidationError as err:
+                errors.append(
+                    RowError(
+                        line=line,
+                        errors=[
+                            '{}: {}'.format(
+                                '.'.join(str(p) for p in e['loc']) or '-',
+                                e['msg'],
+                            )
+                            for e in err.errors()
+                        ],
+                    )
+                )
+            if len(values) >= batch_size or len(errors) >= batch_size:
+                return values, errors, False
+    except (UnicodeDecodeError, csv.Error) as err:
+        errors.append(RowError(line=line + 1, errors=[str(err)]))
+    return values, errors, True
+
+
+async def import_poems(
+    postgres: database.ConnectionType,
+    owner: uuid.UUID,
+    stream: typing.TextIO,
+    fmt: Format,
+) -> ImportResult:
+    """Validate and load poems from a text stream for the given owner."""
+    settings = Settings()
+    result = ImportResult()
+    records = read_records(stream, fmt, settings.max_record_size)
+    done = False
+    while not done:
+        # Parsing and validation of large files would block the event loop
+        values, errors, done = await asyncio.to_thread(
+            _next_batch, records, owner, settings.batch_size
+        )
+        result.failed += len(errors)
+        available = settings.max_errors - len(result.errors)
+        result.errors.extend(errors[: max(available, 0)])
+        if len(errors) > available:
+            result.errors_truncated = True
+        if values:
+            async with postgres.transaction():
+                result.imported += await database.copy_rows(
+                    postgres, 'v1.poetry', poem.COLUMNS, values
+                )
+                await revision.record_initial(
+                    postgres,
+                    [(row[_ID], row[_CONTENT], row[_NOTES]) for row in values],
+                )
+    LOGGER.info(
+        'Imported %i poems for %s (%i failed)',
+        result.imported,
+        owner,
+        result.failed,
+    )
+    return result
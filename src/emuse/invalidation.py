@@ -0,0 +1,196 @@
+"""Cross-worker cache invalidation over Postgres LISTEN/NOTIFY."""
+
+import asyncio
+import contextlib
+import inspect
+import logging
+from collections import abc
+
+import psycopg
+import pydantic
+import pydantic_settings
+from psycopg import sql
+
+from emuse import database, metrics
+
+LOGGER = logging.getLogger(__name__)
+
+CONNECTED = metrics.Gauge(
+    'emuse_invalidation_connected',
+    'Whether the invalidation listener is connected',
+)
+DISPATCHED = metrics.Counter(
+    'emuse_invalidation_events_dispatched_total',
+    'Invalidation events dispatched to callbacks',
+    ['channel'],
+)
+RECEIVED = metrics.Counter(
+    'emuse_invalidation_notifications_received_total',
+    'Invalidation notifications received from Postgres',
+    ['channel'],
+)
+RECONNECTS = metrics.Counter(
+    'emuse_invalidation_reconnects_total',
+    'Invalidation listener reconnect attempts',
+)
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'invalidation_',
+        'extra': 'ignore',
+    }
+
+    coalesce_window: float = 0.05
+    reconnect_delay: float = 0.5
+    max_reconnect_delay: float = 30.0
+
+
+class Event(pydantic.BaseModel):
+    """Something cached for the channel has changed"""
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    channel: str
+    # None means everything cached for the channel is stale
+    key: str | None = None
+
+
+Callback = abc.Callable[[Event], abc.Awaitable[None] | None]
+
+
+class Bus:
+    """Dispatches invalidation events from Postgres to callbacks"""
+
+    def __init__(
+        self,
+        url: str,
+        coalesce_window: float,
+        reconnect_delay: float,
+        max_reconnect_delay: float,
+    ) -> None:
+        self._url = url
+        self._coalesce_window = coalesce_window
+        self._reconnect_delay = reconnect_delay
+        self._max_reconnect_delay = max_reconnect_delay
+        self._callbacks: dict[str, list[Callback]] = {}
+        self._listening: set[str] = set()
+        self._pending: set[Event] = set()
+        self._ready = asyncio.Event()
+
+    def subscribe(self, channel: str, callback: Callback) -> None:
+        """Invoke the plain or coroutine callback for each channel event."""
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    async def run(self) -> None:
+        """Listen for notifications, reconnecting on failure."""
+        delay = self._reconnect_delay
+        connected_before = False
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(
+                    self._url, autocommit=True
+                ) as conn:
+                    self._listening.clear()
+                    await self._listen(conn)
+                    CONNECTED.set(1)
+                    delay = self._reconnect_delay
+                    # Notifications sent while disconnected are lost
+                    if connected_before:
+                        for channel in self._listening:
+                            self._enqueue(Event(channel=channel))
+                    connected_before = True
+                    while True:
+                        async for notify in conn.notifies(timeout=1.0):
+                            RECEIVED.inc(channel=notify.channel)
+                            self._enqueue(
+                                Event(
+                                    channel=notify.channel,
+                                    key=notify.payload or None,
+                                )
+                            )
+                        # Pick up channels subscribed since the last pass
+                        await self._listen(conn)
+            except psycopg.Error as err:
+                CONNECTED.set(0)
+                RECONNECTS.inc()
+                LOGGER.warning(
+                    'Invalidation listener disconnected, retrying in '
+                    '%.1fs: %s',
+                    delay,
+                    err,
+                )
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self._max_reconnect_delay)
+
+    async def dispatch(self) -> None:
+        """Deliver coalesced events to their callbacks."""
+        while True:
+            await self._ready.wait()
+            await asyncio.sleep(self._coalesce_window)
+            self._ready.clear()
+            events, self._pending = self._pending, set()
+            flushed = {event.channel for event in events if not event.key}
+            for event in events:
+                if event.key and event.channel in flushed:
+                    continue  # Superseded by invalidating the channel
+                for callback in self._callbacks.get(event.channel, []):
+                    await self._invoke(callback, event)
+                DISPATCHED.inc(channel=event.channel)
+
+    def _enqueue(self, event: Event) -> None:
+        self._pending.add(event)
+        self._ready.set()
+
+    async def _listen(self, conn: psycopg.AsyncConnection) -> None:
+        for channel in self._callbacks.keys() - self._listening:
+            await conn.execute(
+                sql.SQL('LISTEN {}').format(sql.Identifier(channel))
+            )
+            self._listening.add(channel)
+
+    @staticmethod
+    async def _invoke(callback: Callback, event: Event) -> None:
+        try:
+            result = callback(event)
+            if inspect.isawaitable(result):
+                await result
+        except Exception:
+            LOGGER.exception('Invalidation callback failed for %s', event)
+
+
+async def publish(
+    postgres: database.ConnectionType, channel: str, key: str | None = None
+) -> None:
+    """Notify every worker that something cached for the channel changed."""
+    # Inside a transaction, only delivered if the transaction commits
+    async with database.cursor(postgres) as cursor:
+        await cursor.execute(
+            'SELECT pg_notify(%(channel)s, %(key)s)',
+            {'channel': channel, 'key': key or ''},
+        )
+
+
+@contextlib.asynccontextmanager
+async def lifespan() -> abc.AsyncGenerator[Bus]:
+    """Run the listener on its own connection until shutdown."""
+    settings = _Settings()
+    bus = Bus(
+        database._Settings().url.unicode_string(),
+        settings.coalesce_window,
+        settings.reconnect_delay,
+        settings.max_reconnect_delay,
+    )
+    tasks = [
+        asyncio.create_task(bus.run()),
+        asyncio.create_task(bus.dispatch()),
+    ]
+    try:
+        yield bus
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        CONNECTED.set(0)
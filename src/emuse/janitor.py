@@ -0,0 +1,130 @@
+"""Background cleanup of expired verification tokens and sessions."""
+
+import asyncio
+import contextlib
+import logging
+import re
+from collections import abc
+
+import psycopg
+import pydantic_settings
+
+from emuse import database, metrics, session
+
+LOGGER = logging.getLogger(__name__)
+
+PURGED = metrics.Counter(
+    'emuse_janitor_purged_total', 'Rows removed by the janitor', ['table']
+)
+ERRORS = metrics.Counter('emuse_janitor_errors_total', 'Failed janitor passes')
+
+# Identifies the janitor's advisory lock, the bytes of "janitor". Each
+# batch holds it so only one worker purges at a time
+_LOCK_KEY = 0x6A616E69746F72
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'janitor_',
+        'extra': 'ignore',
+    }
+
+    enabled: bool = True
+    interval: float = 300.0
+    batch_size: int = 500
+    batch_delay: float = 0.1
+
+
+class Janitor:
+    """Purges expired rows in small batches, so locks are held briefly"""
+
+    def __init__(
+        self, pool: database.PoolType, batch_size: int, batch_delay: float
+    ) -> None:
+        self._pool = pool
+        self._batch_size = batch_size
+        self._batch_delay = batch_delay
+
+    async def purge(self, table: str, sql: str) -> int:
+        """Delete rows in batches, returning the number deleted."""
+        total = 0
+        while True:
+            deleted = await self._batch(sql)
+            if deleted is None:
+                LOGGER.debug('Skipping %s, another worker is purging', table)
+                break
+            total += deleted
+            PURGED.inc(deleted, table=table)
+            if deleted < self._batch_size:
+                break
+            await asyncio.sleep(self._batch_delay)
+        return total
+
+    async def sweep(self) -> None:
+        """Run a full cleanup pass."""
+        # Sessions are held in memory, so every worker expires its own
+        expired = session.Session.get_instance().expire()
+        PURGED.inc(expired, table='sessions')
+        tokens = await self.purge(
+            'email_verification_tokens', _PURGE_TOKENS_SQL
+        )
+        LOGGER.debug('Purged %i tokens and %i sessions', tokens, expired)
+
+    async def run(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.sweep()
+            except psycopg.Error as err:
+                ERRORS.inc()
+                LOGGER.warning('Janitor pass failed: %s', err)
+
+    async def _batch(self, sql: str) -> int | None:
+        async with (
+            self._pool.connection() as conn,
+            conn.transaction(),
+            database.cursor(conn) as cursor,
+        ):
+            await cursor.execute(_TRY_LOCK_SQL, {'key': _LOCK_KEY})
+            result = await cursor.fetchone()
+            if not result['locked']:
+                return None
+            await cursor.execute(sql, {'limit': self._batch_size})
+            return cursor.rowcount
+
+
+@contextlib.asynccontextmanager
+async def lifespan(pool: database.PoolType) -> abc.AsyncGenerator[None]:
+    """Run the janitor until shutdown."""
+    settings = _Settings()
+    if not settings.enabled:
+        yield
+        return
+    janitor = Janitor(pool, settings.batch_size, settings.batch_delay)
+    task = asyncio.create_task(janitor.run(settings.interval))
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+
+_TRY_LOCK_SQL = 'SELECT pg_try_advisory_xact_lock(%(key)s) AS locked'
+
+# Tokens locked by a request verifying them are left for a later pass
+_PURGE_TOKENS_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+DELETE FROM v1.email_verification_tokens
+      WHERE id IN (SELECT id
+                     FROM v1.email_verification_tokens
+                    WHERE used_at IS NOT NULL
+                       OR expires_at < CURRENT_TIMESTAMP
+                    LIMIT %(limit)s
+                      FOR UPDATE SKIP LOCKED)
+""",
+)
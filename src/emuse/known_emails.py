@@ -0,0 +1,166 @@
+"""In-process Bloom filter of the email addresses with accounts."""
+
+import asyncio
+import contextlib
+import logging
+import re
+from collections import abc
+
+import psycopg
+import pydantic_settings
+
+from emuse import bloom, database, metrics
+
+LOGGER = logging.getLogger(__name__)
+
+CHECKS = metrics.Counter(
+    'emuse_known_emails_checks_total',
+    'Signup email checks answered by the filter',
+    ['result'],
+)
+FALSE_POSITIVES = metrics.Counter(
+    'emuse_known_emails_false_positives_total',
+    'Possible matches the database showed to be unknown',
+)
+ENTRIES = metrics.Gauge(
+    'emuse_known_emails_entries', 'Email addresses in the filter'
+)
+SIZE = metrics.Gauge(
+    'emuse_known_emails_bytes', 'Memory used by the filter bit array'
+)
+ERROR_RATE = metrics.Gauge(
+    'emuse_known_emails_estimated_error_rate',
+    'Expected false positive rate of the filter',
+)
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'known_emails_',
+        'extra': 'ignore',
+    }
+
+    enabled: bool = True
+    min_capacity: int = 100000
+    error_rate: float = 0.01
+    rebuild_interval: float = 3600.0
+
+
+# Misses addresses saved by other workers until the next rebuild, which
+# is harmless as the unique index on v1.accounts (email) still applies
+_filter: bloom.BloomFilter | None = None
+# Addresses saved while a rebuild is streaming, applied to the new filter
+_pending: list[str] | None = None
+
+
+def add(email: str) -> None:
+    """Record an address that now has an account."""
+    if _pending is not None:
+        _pending.append(email)
+    # Accounts are saved on every login, only count new addresses
+    if _filter is not None and email not in _filter:
+        _filter.add(email)
+        _update_gauges(_filter)
+
+
+def might_exist(email: str) -> bool:
+    """Return False if no account has the address, True if one may."""
+    if _filter is None:
+        return True
+    result = email in _filter
+    CHECKS.inc(result='possible' if result else 'miss')
+    return result
+
+
+def false_positive() -> None:
+    """Count a possible match that the database did not find."""
+    FALSE_POSITIVES.inc()
+
+
+async def rebuild(pool: database.PoolType, settings: _Settings) -> None:
+    """Build a new filter from v1.accounts and swap it in."""
+    global _filter, _pending
+    _pending = []
+    try:
+        async with pool.connection() as conn:
+            async with database.cursor(conn) as cursor:
+                await cursor.execute(_ESTIMATE_SQL)
+                result = await cursor.fetchone()
+            # Leave room for growth until the next rebuild
+            value = bloom.BloomFilter(
+                max(settings.min_capacity, result['estimate'] * 2),
+                settings.error_rate,
+            )
+            async with (
+                conn.transaction(),
+                conn.cursor('known_emails') as cursor,
+            ):
+                cursor.itersize = 5000
+                await cursor.execute(_EMAILS_SQL)
+                async for row in cursor:
+                    value.add(row['email'])
+        for email in _pending:
+            if email not in value:
+                value.add(email)
+    finally:
+        _pending = None
+    _filter = value
+    _update_gauges(value)
+    LOGGER.debug(
+        'Built the known email filter, %i addresses in %i bytes',
+        len(value),
+        value.size,
+    )
+
+
+async def _run(pool: database.PoolType, settings: _Settings) -> None:
+    while True:
+        await asyncio.sleep(settings.rebuild_interval)
+        try:
+            await rebuild(pool, settings)
+        except psycopg.Error as err:
+            LOGGER.warning('Failed to rebuild the known email filter: %s', err)
+
+
+def _update_gauges(value: bloom.BloomFilter) -> None:
+    ENTRIES.set(len(value))
+    SIZE.set(value.size)
+    ERROR_RATE.set(value.estimated_error_rate())
+
+
+@contextlib.asynccontextmanager
+async def lifespan(pool: database.PoolType) -> abc.AsyncGenerator[None]:
+    """Build the filter and keep it up to date until shutdown."""
+    global _filter
+    settings = _Settings()
+    if not settings.enabled:
+        yield
+        return
+    try:
+        await rebuild(pool, settings)
+    except psycopg.Error as err:
+        # Signup queries the database until the next rebuild succeeds
+        LOGGER.warning('Failed to build the known email filter: %s', err)
+    task = asyncio.create_task(_run(pool, settings))
+    try:
+        yield
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        _filter = None
+
+
+_ESTIMATE_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+SELECT greatest(reltuples, 0)::bigint AS estimate
+  FROM pg_class
+ WHERE oid = 'v1.accounts'::regclass
+""",
+)
+
+_EMAILS_SQL = 'SELECT email FROM v1.accounts'
@@ -1,14 +1,36 @@
 import argparse
+import asyncio
 import contextlib
 import logging
 import pathlib
+import sys
+import typing
+import uuid
 
 import fastapi
 import uvicorn
-from fastapi import staticfiles
 from fastapi.middleware import cors
 
-from emuse import __version__, common, database, endpoints, session, template
+from emuse import (
+    __version__,
+    admission,
+    assets,
+    common,
+    database,
+    deadline,
+    endpoints,
+    feed,
+    hashing,
+    importer,
+    invalidation,
+    janitor,
+    known_emails,
+    models,
+    passwords,
+    session,
+    template,
+    view_counter,
+)
 
 BASE_PATH = pathlib.Path(__file__).parent
 LOGGER = logging.getLogger(__name__)
@@ -18,9 +40,28 @@ LOGGER = logging.getLogger(__name__)
 async def fastapi_lifespan(*_args, **_kwargs):  # pragma: nocover
     """This is invoked by FastAPI for us to control startup and shutdown."""
     LOGGER.info('emuse v%s', __version__)
-    template.initialize()
-    async with database.lifespan() as pool:
-        yield {'postgres': pool}
+    async with (
+        database.lifespan() as pool,
+        database.replica_lifespan() as replica,
+        invalidation.lifespan() as bus,
+        feed.lifespan(pool, bus) as homepage_feed,
+        view_counter.lifespan(pool) as views,
+        janitor.lifespan(pool),
+        known_emails.lifespan(pool),
+    ):
+        models.friendship.subscribe(bus)
+        # Imports jinja2 and loads the templates before the first request,
+        # rather than when the module is imported
+        template.initialize()
+        try:
+            yield {
+                'homepage_feed': homepage_feed,
+                'postgres': pool,
+                'postgres_replica': replica,
+                'view_counter': views,
+            }
+        finally:
+            hashing.shutdown()
     LOGGER.debug('Shutdown complete')
 
 
@@ -30,6 +71,11 @@ def create_app() -> fastapi.FastAPI:
     app = fastapi.FastAPI(
         title='eMuse.org', lifespan=fastapi_lifespan, version=__version__
     )
+    app.add_middleware(session.SessionMiddleware)
+    app.add_middleware(deadline.DeadlineMiddleware)
+    # Added after deadlines so shed requests are rejected before a
+    # deadline is set up, and before CORS so 503s can be read by browsers
+    app.add_middleware(admission.AdmissionMiddleware)
     app.add_middleware(
         cors.CORSMiddleware,
         allow_origins=[settings.cors_origin],
@@ -39,31 +85,22 @@ def create_app() -> fastapi.FastAPI:
         expose_headers=['Content-Range'],
     )
 
-    # Add session cookie middleware to parse cookies before verifier runs
-    @app.middleware('http')
-    async def session_cookie_middleware(request: fastapi.Request, call_next):
-        """Parse session cookie and attach to request.state"""
-        session_instance = session.Session.get_instance()
-        try:
-            # Call the session cookie to parse and attach session IDs
-            session_instance.cookie(request)
-        except fastapi.HTTPException:
-            # Ignore auth errors - the verifier will handle them
-            pass
-        response = await call_next(request)
-        return response
-
     # Mount static files first so they take precedence
     app.mount(
         '/static',
-        staticfiles.StaticFiles(directory=BASE_PATH / 'static'),
+        assets.StaticFiles(BASE_PATH / 'static', reload=settings.debug),
         name='static',
     )
     # Register API routes
+    app.include_router(endpoints.autocomplete_router)
     app.include_router(endpoints.login_router)
     app.include_router(endpoints.logout_router)
     app.include_router(endpoints.me_router)
+    app.include_router(endpoints.metrics_router)
+    app.include_router(endpoints.poems_router)
     app.include_router(endpoints.signup_router)
+    app.include_router(endpoints.sitemap_router)
+    app.include_router(endpoints.status_router)
     app.include_router(endpoints.turnstile_router)
     app.include_router(endpoints.verify_email_router)
     # Register index router last (contains catch-all for SPA routing)
@@ -71,6 +108,39 @@ def create_app() -> fastapi.FastAPI:
     return app
 
 
+async def _import_poems(args: argparse.Namespace) -> bool:
+    """Run a bulk poem import from the command line"""
+    fmt = args.format or importer.Format.detect(args.path.name)
+    if not fmt:
+        LOGGER.error('Unable to determine the format of %s', args.path)
+        return False
+    with args.path.open(encoding='utf-8', newline='') as handle:
+        async with database.lifespan() as pool, pool.connection() as conn:
+            result = await importer.import_poems(
+                conn, args.owner, handle, importer.Format(fmt)
+            )
+    for error in result.errors:
+        LOGGER.error('Line %i: %s', error.line, '; '.join(error.errors))
+    if result.errors_truncated:
+        LOGGER.error('Additional errors were omitted')
+    LOGGER.info('%i imported, %i failed', result.imported, result.failed)
+    return result.failed == 0
+
+
+def _calibrate_passwords(args: argparse.Namespace) -> None:
+    """Log the password hash settings that meet the target time"""
+    algorithm = args.algorithm or passwords.Parameters.configured().algorithm
+    parameters = passwords.calibrate(algorithm, args.target_ms)
+    LOGGER.info('Settings for ~%.0fms per hash:', args.target_ms)
+    LOGGER.info('PASSWORDS_ALGORITHM=%s', algorithm)
+    if algorithm == 'scrypt':
+        LOGGER.info('PASSWORDS_SCRYPT_N=%i', parameters.n)
+        LOGGER.info('PASSWORDS_SCRYPT_R=%i', parameters.r)
+        LOGGER.info('PASSWORDS_SCRYPT_P=%i', parameters.p)
+    else:
+        LOGGER.info('PASSWORDS_PBKDF2_ITERATIONS=%i', parameters.iterations)
+
+
 def main():
     settings = common.Settings()
     parser = argparse.ArgumentParser(prog='eMuse')
@@ -80,7 +150,52 @@ def main():
     parser.add_argument(
         '--version', action='version', version=f'%(prog)s {__version__}'
     )
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.add_parser('serve', help='Run the application (default)')
+    import_parser = subparsers.add_parser(
+        'import-poems', help='Bulk import poems from a NDJSON or CSV file'
+    )
+    import_parser.add_argument(
+        '--format', choices=[str(value) for value in importer.Format]
+    )
+    import_parser.add_argument(
+        'owner', type=uuid.UUID, help='ID of the account that owns the poems'
+    )
+    import_parser.add_argument('path', type=pathlib.Path)
+    compile_parser = subparsers.add_parser(
+        'compile-templates',
+        help='Precompile the Jinja2 templates to Python modules',
+    )
+    compile_parser.add_argument(
+        'target', type=pathlib.Path, nargs='?', default=template.COMPILED_PATH
+    )
+    calibrate_parser = subparsers.add_parser(
+        'calibrate-passwords',
+        help='Pick password hash parameters for a target time per hash',
+    )
+    calibrate_parser.add_argument(
+        '--algorithm', choices=typing.get_args(passwords.Algorithm)
+    )
+    calibrate_parser.add_argument('--target-ms', type=float, default=250.0)
     args = parser.parse_args()
+
+    if args.command == 'calibrate-passwords':
+        common.configure_logging(args.verbose)
+        _calibrate_passwords(args)
+        return
+
+    if args.command == 'compile-templates':
+        common.configure_logging(args.verbose)
+        template.compile_templates(args.target)
+        LOGGER.info('Compiled templates to %s', args.target)
+        return
+
+    if args.command == 'import-poems':
+        common.configure_logging(args.verbose)
+        if not asyncio.run(_import_poems(args)):
+            sys.exit(1)
+        return
+
     app = create_app()
     try:
         uvicorn.run(
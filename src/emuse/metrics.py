@@ -0,0 +1,126 @@
+"""In-process metrics, exposed in the Prometheus text format."""
+
+import contextlib
+import time
+import typing
+from collections import abc
+
+_REGISTRY: dict[str, '_Metric'] = {}
+
+_LabelValues = tuple[str, ...]
+
+
+class _Metric:
+    kind: typing.ClassVar[str]
+
+    def __init__(
+        self, name: str, documentation: str, labels: abc.Sequence[str] = ()
+    ) -> None:
+        if name in _REGISTRY:
+            raise ValueError(f'Metric {name} is already registered')
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values: dict[_LabelValues, float] = {}
+        if not self.labels:
+            self._values[()] = 0.0
+        _REGISTRY[name] = self
+
+    def value(self, **labels: str) -> float:
+        """Return the current value for the given labels."""
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> abc.Iterator[tuple[str, _LabelValues, float]]:
+        for key, value in self._values.items():
+            yield self.name, key, value
+
+    def _key(self, labels: dict[str, typing.Any]) -> _LabelValues:
+        if labels.keys() != set(self.labels):
+            raise ValueError(f'{self.name} requires labels {self.labels}')
+        return tuple(str(labels[name]) for name in self.labels)
+
+
+class Counter(_Metric):
+    """A value that only increases"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1.0, **labels: typing.Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    """A value that can go up and down"""
+
+    kind = 'gauge'
+
+    def set(self, value: float, **labels: typing.Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1.0, **labels: typing.Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: typing.Any) -> None:
+        self.inc(-amount, **labels)
+
+
+class Summary(_Metric):
+    """Tracks the count and sum of observations, such as durations"""
+
+    kind = 'summary'
+
+    def __init__(
+        self, name: str, documentation: str, labels: abc.Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._counts: dict[_LabelValues, int] = dict.fromkeys(self._values, 0)
+
+    def observe(self, value: float, **labels: typing.Any) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + value
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    def count(self, **labels: typing.Any) -> int:
+        return self._counts.get(self._key(labels), 0)
+
+    @contextlib.contextmanager
+    def time(self, **labels: typing.Any) -> abc.Generator[None]:
+        """Observe the duration of the wrapped block in seconds."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> abc.Iterator[tuple[str, _LabelValues, float]]:
+        for key, value in self._values.items():
+            yield f'{self.name}_count', key, self._counts[key]
+            yield f'{self.name}_sum', key, value
+
+
+def render() -> str:
+    """Render all registered metrics in the Prometheus text format."""
+    lines = []
+    for metric in _REGISTRY.values():
+        lines.extend((
+            f'# HELP {metric.name} {metric.documentation}',
+            f'# TYPE {metric.name} {metric.kind}',
+        ))
+        for name, key, value in metric.samples():
+            if key:
+                labels = ','.join(
+                    '{}="{}"'.format(
+                        label,
+                        v.replace('\\', '\\\\')
+                        .replace('"', '\\"')
+                        .replace('\n', '\\n'),
+                    )
+                    for label, v in zip(metric.labels, key, strict=True)
+                )
+                lines.append(f'{name}{{{labels}}} {value}')
+            else:
+                lines.append(f'{name} {value}')
+    lines.append('')
+    return '\n'.join(lines)
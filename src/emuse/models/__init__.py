@@ -1,3 +1,20 @@
 from .account import Account
+from .author import Author, AuthorLoader, InjectAuthorLoader
+from .friendship import InjectViewer, Viewer
+from .poem import Poem, PoemSummary, PoemVersion, PrivacyLevel
+from .revision import Revision, RevisionInfo
 
-__all__ = ['Account']
+__all__ = [
+    'Account',
+    'Author',
+    'AuthorLoader',
+    'InjectAuthorLoader',
+    'InjectViewer',
+    'Poem',
+    'PoemSummary',
+    'PoemVersion',
+    'PrivacyLevel',
+    'Revision',
+    'RevisionInfo',
+    'Viewer',
+]
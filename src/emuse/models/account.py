@@ -1,17 +1,16 @@
-import base64
+import asyncio
 import datetime
-import hashlib
 import logging
 import os
 import re
-import secrets
+import time
 import typing
 import uuid
 
 import pydantic
 from pydantic_extra_types import timezone_name
 
-from emuse import common, database
+from emuse import common, database, hashing, known_emails, passwords
 
 LOGGER = logging.getLogger(__name__)
 
@@ -55,22 +54,27 @@ class Account(pydantic.BaseModel):
         """Authenticate an account, returning an account if successful."""
         async with database.cursor(postgres) as cursor:
             await cursor.execute(_AUTHENTICATE_SQL, {'email': str(email)})
-            if not cursor.rowcount:
-                # Perform dummy hash to maintain consistent timing
-                dummy_salt = os.urandom(16)
-                cls._hash_password(password, dummy_salt)
-                return None
-            data = await cursor.fetchone()
-            value = cls._hash_password(password, data['salt'])
-            # Use constant-time comparison to prevent timing attacks
-            if secrets.compare_digest(value, data['password']):
-                # Fetch full account and update last_login_at
-                account = await cls.get(postgres, data['id'])
-                if account:
-                    account.last_login_at = common.current_timestamp()
-                    await account.save(postgres)
-                return account
+            data = await cursor.fetchone() if cursor.rowcount else None
+        started = time.monotonic()
+        if data is None:
+            # Perform dummy hash to maintain consistent timing
+            valid = await hashing.run(passwords.dummy_verify, password)
+        else:
+            valid = await hashing.run(
+                passwords.verify, password, data['password'], data['salt']
+            )
+        # Pad to the costliest hash so timing reveals neither the account
+        # nor how its password was hashed
+        duration = await hashing.run(passwords.min_duration)
+        await asyncio.sleep(max(0.0, duration - (time.monotonic() - started)))
+        if not valid:
             return None
+        # Fetch full account and update last_login_at
+        account = await cls.get(postgres, data['id'])
+        if account:
+            account.last_login_at = common.current_timestamp()
+            await account.save(postgres)
+        return account
 
     @classmethod
     async def get(
@@ -92,30 +96,36 @@ class Account(pydantic.BaseModel):
             data['password'] = self.password.get_secret_value()
             data['salt'] = self.salt.get_secret_value()
             await cursor.execute(_UPSERT_SQL, data)
+            known_emails.add(data['email'])
             return cursor.rowcount > 0
 
-    def set_password(self, password: str) -> None:
+    async def set_password(self, password: str) -> None:
         """Set the password to the specified value"""
-        hashed = self._hash_password(password, self.salt.get_secret_value())
+        hashed = await hashing.run(
+            passwords.hash, password, self.salt.get_secret_value()
+        )
         self.password = pydantic.SecretStr(hashed)
 
-    @staticmethod
-    def _hash_password(password: str, salt: bytes) -> str:
-        """Hash a password with a user-specific salt using PBKDF2.
-
-        Args:
-            password: The plaintext password to hash
-            salt: Pre-existing salt, generates a new one if None
-
-        Returns:
-            A tuple of (encoded_salt, encoded_key) as strings
-
-        """
-        # Use PBKDF2 with 100,000 iterations and SHA-256
-        key = hashlib.pbkdf2_hmac(
-            'sha256', password.encode('utf-8'), salt, 100000
-        )
-        return base64.b64encode(key).decode('utf-8')
+    def needs_rehash(self) -> bool:
+        """Return True if the password hash uses outdated parameters."""
+        return passwords.needs_rehash(self.password.get_secret_value())
+
+    async def rehash(self, pool: database.PoolType, password: str) -> None:
+        """Rehash a just verified password with the current parameters."""
+        previous = self.password.get_secret_value()
+        await self.set_password(password)
+        async with pool.connection() as conn, database.cursor(conn) as cursor:
+            # Skipped if the password changed in the meantime
+            await cursor.execute(
+                _REHASH_SQL,
+                {
+                    'id': self.id,
+                    'password': self.password.get_secret_value(),
+                    'previous': previous,
+                },
+            )
+            if cursor.rowcount:
+                LOGGER.debug('Rehashed the password for account %s', self.id)
 
 
 _GET_SQL = re.sub(
@@ -185,3 +195,14 @@ SELECT id,
  WHERE email = %(email)s;
 """,
 )
+
+_REHASH_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+UPDATE v1.accounts
+   SET password = %(password)s
+ WHERE id = %(id)s
+   AND password = %(previous)s;
+""",
+)
@@ -0,0 +1,91 @@
+import re
+import typing
+import uuid
+from collections import abc
+
+import fastapi
+import pydantic
+
+from emuse import database
+
+
+class Author(pydantic.BaseModel):
+    """Public view of an account, used to attribute content"""
+
+    id: uuid.UUID
+    display_name: str
+    memorial: bool
+
+
+class AuthorLoader:
+    """Loads the authors wanted by a request with a single query"""
+
+    def __init__(self, postgres: database.ConnectionType) -> None:
+        self._postgres = postgres
+        self._authors: dict[uuid.UUID, Author | None] = {}
+        self._pending: set[uuid.UUID] = set()
+
+    def want(self, *account_ids: uuid.UUID) -> None:
+        """Queue account ids to be fetched on the next load."""
+        self._pending.update(
+            value for value in account_ids if value not in self._authors
+        )
+
+    async def load(self) -> None:
+        """Fetch all queued account ids with one query."""
+        if not self._pending:
+            return
+        account_ids = list(self._pending)
+        self._pending.clear()
+        async with database.cursor(self._postgres, Author) as cursor:
+            await cursor.execute(_LOAD_SQL, {'ids': account_ids})
+            for author in await cursor.fetchall():
+                self._authors[author.id] = author
+        for account_id in account_ids:
+            self._authors.setdefault(account_id, None)
+
+    async def get(self, account_id: uuid.UUID) -> Author | None:
+        """Return a single author, loading any queued ids with it."""
+        self.want(account_id)
+        await self.load()
+        return self._authors[account_id]
+
+    async def get_many(
+        self, account_ids: abc.Iterable[uuid.UUID]
+    ) -> dict[uuid.UUID, Author]:
+        """Return the authors that exist for the given account ids."""
+        account_ids = list(account_ids)
+        self.want(*account_ids)
+        await self.load()
+        return {
+            account_id: self._authors[account_id]
+            for account_id in account_ids
+            if self._authors[account_id]
+        }
+
+
+async def author_loader(  # noqa: RUF029
+    request: fastapi.Request, postgres: database.InjectReadConnection
+) -> AuthorLoader:
+    """Return the author loader for the current request."""
+    if not hasattr(request.state, 'author_loader'):
+        request.state.author_loader = AuthorLoader(postgres)
+    return request.state.author_loader
+
+
+InjectAuthorLoader = typing.Annotated[
+    AuthorLoader, fastapi.Depends(author_loader)
+]
+
+
+_LOAD_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+SELECT id,
+       display_name,
+       memorial
+  FROM v1.accounts
+ WHERE id = ANY(%(ids)s)
+""",
+)
@@ -0,0 +1,148 @@
+"""Friendships between accounts."""
+
+import re
+import typing
+import uuid
+
+import fastapi
+
+from emuse import cache, database, invalidation, session
+
+CHANNEL = 'friendships'
+
+# Friend id sets by account, shared by all requests in this process
+_friend_ids: cache.LRUCache[uuid.UUID, frozenset[uuid.UUID]] = cache.LRUCache(
+    maxsize=10000, ttl=60
+)
+
+
+async def friend_ids(
+    postgres: database.ConnectionType, account_id: uuid.UUID
+) -> frozenset[uuid.UUID]:
+    """Return the ids of the account's friends."""
+    value = _friend_ids.get(account_id)
+    if value is None:
+        async with database.cursor(postgres) as cursor:
+            await cursor.execute(_FRIEND_IDS_SQL, {'id': account_id})
+            value = frozenset([row['friend_id'] async for row in cursor])
+        # A lagging replica could put a removed friend back into the
+        # shared cache, so only the primary's answer is kept
+        if not database.is_replica(postgres):
+            _friend_ids.set(account_id, value)
+    return value
+
+
+async def add(
+    postgres: database.ConnectionType,
+    account_id: uuid.UUID,
+    friend_id: uuid.UUID,
+) -> None:
+    """Make two accounts friends."""
+    async with database.cursor(postgres) as cursor:
+        await cursor.execute(
+            _ADD_SQL, {'account_id': account_id, 'friend_id': friend_id}
+        )
+    await _publish(postgres, account_id, friend_id)
+
+
+async def remove(
+    postgres: database.ConnectionType,
+    account_id: uuid.UUID,
+    friend_id: uuid.UUID,
+) -> None:
+    """End the friendship between two accounts."""
+    async with database.cursor(postgres) as cursor:
+        await cursor.execute(
+            _REMOVE_SQL, {'account_id': account_id, 'friend_id': friend_id}
+        )
+    await _publish(postgres, account_id, friend_id)
+
+
+def invalidate(*account_ids: uuid.UUID) -> None:
+    """Drop cached friend ids for the accounts."""
+    for account_id in account_ids:
+        _friend_ids.delete(account_id)
+
+
+def subscribe(bus: invalidation.Bus) -> None:
+    """Drop cached friend ids when other workers change friendships."""
+    bus.subscribe(CHANNEL, _on_invalidation)
+
+
+def _on_invalidation(event: invalidation.Event) -> None:
+    if event.key:
+        invalidate(uuid.UUID(event.key))
+    else:
+        _friend_ids.clear()
+
+
+async def _publish(
+    postgres: database.ConnectionType, *account_ids: uuid.UUID
+) -> None:
+    invalidate(*account_ids)
+    for account_id in account_ids:
+        await invalidation.publish(postgres, CHANNEL, str(account_id))
+
+
+class Viewer:
+    """The account making a request, if any, and its friends"""
+
+    def __init__(self, account_id: uuid.UUID | None) -> None:
+        self.account_id = account_id
+        self._friend_ids: frozenset[uuid.UUID] | None = None
+
+    async def friend_ids(
+        self, postgres: database.ConnectionType
+    ) -> frozenset[uuid.UUID]:
+        """Return the viewer's friend ids, using the request's connection."""
+        if self._friend_ids is None and not self.account_id:
+            self._friend_ids = frozenset()
+        elif self._friend_ids is None:
+            self._friend_ids = await friend_ids(postgres, self.account_id)
+        return self._friend_ids
+
+
+async def viewer(  # noqa: RUF029
+    session_data: session.SessionData | None = fastapi.Depends(
+        session.current
+    ),
+) -> Viewer:
+    """Return the viewer for the current request."""
+    return Viewer(session_data.account_id if session_data else None)
+
+
+InjectViewer = typing.Annotated[Viewer, fastapi.Depends(viewer)]
+
+
+_FRIEND_IDS_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+SELECT friend_id
+  FROM v1.friendships
+ WHERE account_id = %(id)s
+""",
+)
+
+# Friendships are mutual and stored as a pair of directed rows, so the
+# friends of an account are a single range scan of the primary key
+_ADD_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+INSERT INTO v1.friendships (account_id, friend_id)
+     VALUES (%(account_id)s, %(friend_id)s),
+            (%(friend_id)s, %(account_id)s)
+ON CONFLICT DO NOTHING
+""",
+)
+
+_REMOVE_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+DELETE FROM v1.friendships
+      WHERE (account_id, friend_id) IN ((%(account_id)s, %(friend_id)s),
+                                         (%(friend_id)s, %(account_id)s))
+""",
+)
@@ -0,0 +1,305 @@
+import datetime
+import enum
+import re
+import typing
+import uuid
+from collections import abc
+
+import pydantic
+
+from emuse import common, database
+from emuse.models import revision
+
+
+class PrivacyLevel(enum.StrEnum):
+    """Mirrors the v1.privacy_level enum"""
+
+    public = 'public'
+    logged_in_only = 'logged-in-only'
+    friends_only = 'friends-only'
+    private = 'private'
+
+
+database.register_enum('v1.privacy_level', PrivacyLevel)
+
+
+def visible_levels(
+    owner: uuid.UUID,
+    account_id: uuid.UUID | None,
+    friend_ids: abc.Set[uuid.UUID] = frozenset(),
+) -> list[PrivacyLevel]:
+    """Return the privacy levels of an owner's poems an account may read."""
+    if account_id is not None and account_id == owner:
+        return list(PrivacyLevel)
+    levels = [PrivacyLevel.public]
+    if account_id is not None:
+        levels.append(PrivacyLevel.logged_in_only)
+        if owner in friend_ids:
+            levels.append(PrivacyLevel.friends_only)
+    return levels
+
+
+class PoemVersion(pydantic.BaseModel):
+    """The columns needed to authorize and revalidate a poem read"""
+
+    id: uuid.UUID
+    owner: uuid.UUID
+    privacy_level: PrivacyLevel
+    updated_at: datetime.datetime
+    # The author as serialized with the poem, None if the account is gone
+    author_name: str | None = None
+    author_memorial: bool | None = None
+
+    def visible_to(
+        self,
+        account_id: uuid.UUID | None,
+        friend_ids: abc.Set[uuid.UUID] = frozenset(),
+    ) -> bool:
+        """Return True if the account may read the poem."""
+        return self.privacy_level in visible_levels(
+            self.owner, account_id, friend_ids
+        )
+
+
+class PoemSummary(pydantic.BaseModel):
+    """The columns used when listing poems"""
+
+    id: uuid.UUID
+    owner: uuid.UUID
+    title: str | None
+    posted_at: datetime.datetime
+    updated_at: datetime.datetime
+    privacy_level: PrivacyLevel
+    tags: list[str]
+
+    @classmethod
+    async def for_owner(
+        cls,
+        postgres: database.ConnectionType,
+        owner: uuid.UUID,
+        levels: abc.Sequence[PrivacyLevel],
+        before: datetime.datetime | None = None,
+        limit: int = 20,
+    ) -> list[typing.Self]:
+        """Return an owner's most recent poems with the privacy levels."""
+        async with database.cursor(postgres, cls) as cursor:
+            await cursor.execute(
+                _FOR_OWNER_SQL,
+                {
+                    'owner': owner,
+                    'levels': list(levels),
+                    'before': before,
+                    'limit': limit,
+                },
+            )
+            return await cursor.fetchall()
+
+    @classmethod
+    async def from_friends(
+        cls,
+        postgres: database.ConnectionType,
+        friend_ids: abc.Set[uuid.UUID],
+        before: datetime.datetime | None = None,
+        limit: int = 20,
+    ) -> list[typing.Self]:
+        """Return the most recent poems friends have shared."""
+        if not friend_ids:
+            return []
+        async with database.cursor(postgres, cls) as cursor:
+            await cursor.execute(
+                _FROM_FRIENDS_SQL,
+                {
+                    'friend_ids': list(friend_ids),
+                    'before': before,
+                    'limit': limit,
+                },
+            )
+            return await cursor.fetchall()
+
+    @classmethod
+    async def recent_public(
+        cls, postgres: database.ConnectionType, limit: int = 20
+    ) -> list[typing.Self]:
+        """Return the most recently posted public poems."""
+        async with database.cursor(postgres, cls) as cursor:
+            await cursor.execute(_RECENT_PUBLIC_SQL, {'limit': limit})
+            return await cursor.fetchall()
+
+
+class Poem(pydantic.BaseModel):
+    """A poem owned by an account"""
+
+    model_config = pydantic.ConfigDict(extra='forbid')
+
+    id: uuid.UUID = pydantic.Field(default_factory=common.new_uuid7)
+    owner: uuid.UUID
+    title: str | None = None
+    created_at: datetime.date = pydantic.Field(
+        default_factory=common.current_date
+    )
+    posted_at: datetime.datetime = pydantic.Field(
+        default_factory=common.current_timestamp
+    )
+    updated_at: datetime.datetime = pydantic.Field(
+        default_factory=common.current_timestamp
+    )
+    language: str | None = None
+    explicit: bool = False
+    privacy_level: PrivacyLevel = PrivacyLevel.public
+    content: str
+    notes: str | None = None
+    tags: list[str] = pydantic.Field(default_factory=list)
+    views: int = 0
+
+    @classmethod
+    async def get(
+        cls, postgres: database.ConnectionType, poem_id: uuid.UUID
+    ) -> typing.Self | None:
+        """Fetch a poem by ID."""
+        async with database.cursor(postgres) as cursor:
+            await cursor.execute(_GET_SQL, {'id': poem_id})
+            if cursor.rowcount > 0:
+                data = await cursor.fetchone()
+                return cls(**data)
+        return None
+
+    def visible_to(
+        self,
+        account_id: uuid.UUID | None,
+        friend_ids: abc.Set[uuid.UUID] = frozenset(),
+    ) -> bool:
+        """Return True if the account may read the poem."""
+        return self.privacy_level in visible_levels(
+            self.owner, account_id, friend_ids
+        )
+
+    @staticmethod
+    async def get_version(
+        postgres: database.ConnectionType, poem_id: uuid.UUID
+    ) -> PoemVersion | None:
+        """Fetch what is needed to authorize and revalidate a read only."""
+        async with database.cursor(postgres, PoemVersion) as cursor:
+            await cursor.execute(_GET_VERSION_SQL, {'id': poem_id})
+            return await cursor.fetchone()
+
+    @staticmethod
+    async def update_text(
+        postgres: database.ConnectionType,
+        poem_id: uuid.UUID,
+        content: str,
+        notes: str | None,
+    ) -> int:
+        """Replace the content and notes, returning the new revision."""
+        async with postgres.transaction():
+            number = await revision.record(postgres, poem_id, content, notes)
+            async with database.cursor(postgres) as cursor:
+                await cursor.execute(
+                    _UPDATE_TEXT_SQL,
+                    {'id': poem_id, 'content': content, 'notes': notes},
+                )
+        return number
+
+
+# Column order used when loading rows with COPY
+COLUMNS = tuple(Poem.model_fields)
+
+_GET_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+    SELECT id,
+           owner,
+           title,
+           created_at,
+           posted_at,
+           updated_at,
+           language,
+           explicit,
+           privacy_level,
+           content,
+           notes,
+           tags,
+           views
+      FROM v1.poetry
+     WHERE id = %(id)s
+""",
+)
+
+_GET_VERSION_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+    SELECT p.id,
+           p.owner,
+           p.privacy_level,
+           p.updated_at,
+           a.display_name AS author_name,
+           a.memorial AS author_memorial
+      FROM v1.poetry AS p
+ LEFT JOIN v1.accounts AS a
+        ON a.id = p.owner
+     WHERE p.id = %(id)s
+""",
+)
+
+_SUMMARY_COLUMNS = """\
+    SELECT id,
+           owner,
+           title,
+           posted_at,
+           updated_at,
+           privacy_level,
+           COALESCE(tags, '{}') AS tags
+      FROM v1.poetry
+"""
+
+_FOR_OWNER_SQL = re.sub(
+    r'\s+',
+    ' ',
+    _SUMMARY_COLUMNS
+    + """\
+     WHERE owner = %(owner)s
+       AND privacy_level = ANY(%(levels)s::v1.privacy_level[])
+       AND posted_at < COALESCE(%(before)s::timestamptz, 'infinity')
+  ORDER BY posted_at DESC
+     LIMIT %(limit)s
+""",
+)
+
+# Friends may read everything except private poems, so a single
+# = ANY() over the owner index replaces a per-row friendship lookup
+_FROM_FRIENDS_SQL = re.sub(
+    r'\s+',
+    ' ',
+    _SUMMARY_COLUMNS
+    + """\
+     WHERE owner = ANY(%(friend_ids)s::uuid[])
+       AND privacy_level <> 'private'
+       AND posted_at < COALESCE(%(before)s::timestamptz, 'infinity')
+  ORDER BY posted_at DESC
+     LIMIT %(limit)s
+""",
+)
+
+_RECENT_PUBLIC_SQL = re.sub(
+    r'\s+',
+    ' ',
+    _SUMMARY_COLUMNS
+    + """\
+     WHERE privacy_level = 'public'
+  ORDER BY posted_at DESC
+     LIMIT %(limit)s
+""",
+)
+
+_UPDATE_TEXT_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+UPDATE v1.poetry
+   SET content = %(content)s,
+       notes = %(notes)s,
+       updated_at = CURRENT_TIMESTAMP
+ WHERE id = %(id)s
+""",
+)
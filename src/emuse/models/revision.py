@@ -0,0 +1,235 @@
+import datetime
+import difflib
+import json
+import re
+import uuid
+from collections import abc
+
+import psycopg.types.json
+import pydantic
+import pydantic_settings
+
+from emuse import database
+
+# A [start, end] pair copies lines of the previous text, a string inserts
+type Delta = list[list[int] | str]
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'revisions_',
+        'extra': 'ignore',
+    }
+
+    # Bounds how many deltas are replayed to rebuild a revision
+    snapshot_interval: int = pydantic.Field(default=20, ge=1)
+
+
+class RevisionInfo(pydantic.BaseModel):
+    """A revision without its text, for listing the history"""
+
+    revision: int
+    created_at: datetime.datetime
+    snapshot: bool
+
+
+class Revision(pydantic.BaseModel):
+    """The text of a poem as of a revision"""
+
+    poem_id: uuid.UUID
+    revision: int
+    created_at: datetime.datetime
+    content: str
+    notes: str | None
+
+
+def diff(base: str, target: str) -> Delta:
+    """Return the delta that turns base into target."""
+    base_lines = base.splitlines(keepends=True)
+    target_lines = target.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, base_lines, target_lines, False)
+    delta: Delta = []
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            delta.append([i1, i2])
+        elif j2 > j1:
+            delta.append(''.join(target_lines[j1:j2]))
+    return delta
+
+
+def patch(base: str, delta: Delta) -> str:
+    """Apply a delta from diff to base."""
+    lines = base.splitlines(keepends=True)
+    return ''.join(
+        value if isinstance(value, str) else ''.join(lines[slice(*value)])
+        for value in delta
+    )
+
+
+def _apply(text: dict, data: dict) -> dict:
+    """Apply a stored delta to the content and notes of a revision"""
+    notes = data['notes']
+    if notes is not None:
+        notes = patch(text['notes'] or '', notes)
+    return {'content': patch(text['content'], data['content']), 'notes': notes}
+
+
+async def _chain(
+    postgres: database.ConnectionType, poem_id: uuid.UUID, revision: int | None
+) -> tuple[list[dict], dict | None]:
+    """Return the rows from the nearest snapshot and the text they build"""
+    async with database.cursor(postgres) as cursor:
+        await cursor.execute(
+            _CHAIN_SQL, {'poem_id': poem_id, 'revision': revision}
+        )
+        rows = await cursor.fetchall()
+    if not rows:
+        return rows, None
+    text = rows[0]['data']
+    for row in rows[1:]:
+        text = _apply(text, row['data'])
+    return rows, text
+
+
+async def get(
+    postgres: database.ConnectionType,
+    poem_id: uuid.UUID,
+    revision: int | None = None,
+) -> Revision | None:
+    """Return a revision of a poem, the latest if revision is None."""
+    rows, text = await _chain(postgres, poem_id, revision)
+    if not rows or (revision is not None and rows[-1]['revision'] != revision):
+        return None
+    return Revision(
+        poem_id=poem_id,
+        revision=rows[-1]['revision'],
+        created_at=rows[-1]['created_at'],
+        **text,
+    )
+
+
+async def history(
+    postgres: database.ConnectionType, poem_id: uuid.UUID
+) -> list[RevisionInfo]:
+    """Return the revisions of a poem, oldest first."""
+    async with database.cursor(postgres, RevisionInfo) as cursor:
+        await cursor.execute(_HISTORY_SQL, {'poem_id': poem_id})
+        return await cursor.fetchall()
+
+
+async def record(
+    postgres: database.ConnectionType,
+    poem_id: uuid.UUID,
+    content: str,
+    notes: str | None,
+) -> int:
+    """Store the next revision of a poem, returning its number."""
+    settings = _Settings()
+    snapshot = {'content': content, 'notes': notes}
+    async with postgres.transaction():
+        async with database.cursor(postgres) as cursor:
+            # Serializes concurrent edits of the same poem
+            await cursor.execute(_LOCK_SQL, {'poem_id': poem_id})
+        rows, previous = await _chain(postgres, poem_id, None)
+        data, is_snapshot = snapshot, True
+        if previous is not None:
+            revision = rows[-1]['revision'] + 1
+            delta = {
+                'content': diff(previous['content'], content),
+                'notes': None
+                if notes is None
+                else diff(previous['notes'] or '', notes),
+            }
+            # Snapshot early when a delta would be over half the size
+            chained = revision - rows[0]['revision']
+            if chained < settings.snapshot_interval and (
+                len(json.dumps(delta)) * 2 < len(json.dumps(snapshot))
+            ):
+                data, is_snapshot = delta, False
+        else:
+            revision = 1
+        async with database.cursor(postgres) as cursor:
+            await cursor.execute(
+                _INSERT_SQL,
+                {
+                    'poem_id': poem_id,
+                    'revision': revision,
+                    'snapshot': is_snapshot,
+                    'data': psycopg.types.json.Jsonb(data),
+                },
+            )
+    return revision
+
+
+async def record_initial(
+    postgres: database.ConnectionType,
+    poems: abc.Sequence[tuple[uuid.UUID, str, str | None]],
+) -> None:
+    """Store the first revision of new poems given as id, content, notes."""
+    async with database.cursor(postgres) as cursor:
+        await cursor.execute(
+            _INSERT_INITIAL_SQL,
+            {
+                'ids': [poem[0] for poem in poems],
+                'contents': [poem[1] for poem in poems],
+                'notes': [poem[2] for poem in poems],
+            },
+        )
+
+
+_LOCK_SQL = 'SELECT id FROM v1.poetry WHERE id = %(poem_id)s FOR UPDATE'
+
+_CHAIN_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+  SELECT revision,
+         created_at,
+         data
+    FROM v1.poetry_revisions
+   WHERE poem_id = %(poem_id)s
+     AND revision <= COALESCE(%(revision)s::integer, 2147483647)
+     AND revision >= (SELECT max(revision)
+                        FROM v1.poetry_revisions
+                       WHERE poem_id = %(poem_id)s
+                         AND snapshot
+                         AND revision <= COALESCE(%(revision)s::integer,
+                                                  2147483647))
+ORDER BY revision
+""",
+)
+
+_HISTORY_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+  SELECT revision,
+         created_at,
+         snapshot
+    FROM v1.poetry_revisions
+   WHERE poem_id = %(poem_id)s
+ORDER BY revision
+""",
+)
+
+_INSERT_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+INSERT INTO v1.poetry_revisions (poem_id, revision, snapshot, data)
+     VALUES (%(poem_id)s, %(revision)s, %(snapshot)s, %(data)s)
+""",
+)
+
+_INSERT_INITIAL_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+INSERT INTO v1.poetry_revisions (poem_id, revision, snapshot, data)
+     SELECT id, 1, TRUE, jsonb_build_object('content', content, 'notes', notes)
+       FROM unnest(%(ids)s::uuid[], %(contents)s::text[], %(notes)s::text[])
+         AS p(id, content, notes)
+""",
+)
@@ -0,0 +1,211 @@
+import base64
+import binascii
+import functools
+import hashlib
+import hmac
+import logging
+import os
+import time
+import typing
+
+import pydantic
+import pydantic_settings
+
+LOGGER = logging.getLogger(__name__)
+
+Algorithm = typing.Literal['pbkdf2_sha256', 'scrypt']
+
+_LEGACY_ITERATIONS = 100_000
+_KEY_LENGTH = 32
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'passwords_',
+        'extra': 'ignore',
+    }
+
+    algorithm: Algorithm = 'pbkdf2_sha256'
+    pbkdf2_iterations: int = _LEGACY_ITERATIONS
+    scrypt_n: int = 2**14
+    scrypt_r: int = 8
+    scrypt_p: int = 1
+
+
+class Parameters(pydantic.BaseModel):
+    """The algorithm and cost of a hash"""
+
+    model_config = pydantic.ConfigDict(frozen=True)
+
+    algorithm: Algorithm
+    iterations: int | None = None
+    n: int | None = None
+    r: int | None = None
+    p: int | None = None
+
+    @classmethod
+    def configured(cls) -> typing.Self:
+        """Return the parameters to use for new hashes."""
+        settings = _Settings()
+        if settings.algorithm == 'scrypt':
+            return cls(
+                algorithm='scrypt',
+                n=settings.scrypt_n,
+                r=settings.scrypt_r,
+                p=settings.scrypt_p,
+            )
+        return cls(
+            algorithm='pbkdf2_sha256', iterations=settings.pbkdf2_iterations
+        )
+
+    def derive(self, password: str, salt: bytes) -> bytes:
+        """Derive the key for the password with these parameters."""
+        if self.algorithm == 'scrypt':
+            return hashlib.scrypt(
+                password.encode('utf-8'),
+                salt=salt,
+                n=self.n,
+                r=self.r,
+                p=self.p,
+                # Twice the memory scrypt needs, the default is 32 MiB
+                maxmem=256 * self.r * (self.n + self.p + 2),
+                dklen=_KEY_LENGTH,
+            )
+        return hashlib.pbkdf2_hmac(
+            'sha256', password.encode('utf-8'), salt, self.iterations
+        )
+
+    def encode(self, salt: bytes, key: bytes) -> str:
+        """Return the hash as stored, with the algorithm and its cost."""
+        # pbkdf2_sha256$<iterations>$<salt>$<key> or
+        # scrypt$<n>$<r>$<p>$<salt>$<key>, in unpadded URL-safe base64
+        if self.algorithm == 'scrypt':
+            fields = ['scrypt', self.n, self.r, self.p]
+        else:
+            fields = ['pbkdf2_sha256', self.iterations]
+        fields.extend((_b64encode(salt), _b64encode(key)))
+        return '$'.join(str(field) for field in fields)
+
+
+# Bare base64 digests written before hashes described themselves
+_LEGACY = Parameters(algorithm='pbkdf2_sha256', iterations=_LEGACY_ITERATIONS)
+
+
+def hash(password: str, salt: bytes | None = None) -> str:
+    """Hash a password with the configured parameters."""
+    parameters = Parameters.configured()
+    salt = salt or os.urandom(16)
+    return parameters.encode(salt, parameters.derive(password, salt))
+
+
+def verify(password: str, encoded: str, legacy_salt: bytes) -> bool:
+    """Return True if the password matches the encoded hash."""
+    try:
+        parameters, salt, expected = _decode(encoded, legacy_salt)
+    except ValueError:
+        LOGGER.warning('Unable to decode a stored password hash')
+        return False
+    # Use constant-time comparison to prevent timing attacks
+    return hmac.compare_digest(parameters.derive(password, salt), expected)
+
+
+def needs_rehash(encoded: str) -> bool:
+    """Return True if the hash was made with outdated parameters."""
+    if '$' not in encoded:
+        # The legacy format relies on the salt column, always replace it
+        return True
+    try:
+        parameters = _decode(encoded, b'')[0]
+    except ValueError:
+        return True
+    return parameters != Parameters.configured()
+
+
+def dummy_verify(password: str) -> bool:
+    """Do the work of verifying a password for an unknown account."""
+    _costliest().derive(password, os.urandom(16))
+    return False
+
+
+def min_duration() -> float:
+    """Return the seconds a password check should take at least."""
+    return _cost(_costliest()) / 1000
+
+
+def _costliest() -> Parameters:
+    # Padding every check to this hides whether an account exists and
+    # how its password was hashed
+    return max((Parameters.configured(), _LEGACY), key=_cost)
+
+
+@functools.cache
+def _cost(parameters: Parameters) -> float:
+    """Return how long a hash takes with the parameters in milliseconds"""
+    return _time(parameters, os.urandom(16), 1)
+
+
+def calibrate(
+    algorithm: Algorithm, target_ms: float, samples: int = 3
+) -> Parameters:
+    """Return parameters that take about target_ms per hash on this host."""
+    salt = os.urandom(16)
+    if algorithm == 'scrypt':
+        # N must be a power of two, double it until slow enough
+        parameters = Parameters(algorithm='scrypt', n=2**12, r=8, p=1)
+        while _time(parameters, salt, samples) < target_ms:
+            parameters = parameters.model_copy(update={'n': parameters.n * 2})
+        return parameters
+    # PBKDF2 scales linearly, extrapolate from a short run
+    probe = Parameters(algorithm='pbkdf2_sha256', iterations=20_000)
+    elapsed = _time(probe, salt, samples)
+    iterations = int(probe.iterations * target_ms / elapsed)
+    # Round to a readable number, never below the legacy cost
+    iterations = max(_LEGACY_ITERATIONS, round(iterations, -3))
+    return Parameters(algorithm='pbkdf2_sha256', iterations=iterations)
+
+
+def _time(parameters: Parameters, salt: bytes, samples: int) -> float:
+    """Return the fastest of several runs in milliseconds"""
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        parameters.derive('calibration', salt)
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+
+def _decode(
+    encoded: str, legacy_salt: bytes
+) -> tuple[Parameters, bytes, bytes]:
+    fields = encoded.split('$')
+    try:
+        match fields:
+            case ['pbkdf2_sha256', iterations, salt, key]:
+                parameters = Parameters(
+                    algorithm='pbkdf2_sha256', iterations=int(iterations)
+                )
+            case ['scrypt', n, r, p, salt, key]:
+                parameters = Parameters(
+                    algorithm='scrypt', n=int(n), r=int(r), p=int(p)
+                )
+            case [legacy]:
+                return (
+                    _LEGACY,
+                    legacy_salt,
+                    base64.b64decode(legacy, validate=True),
+                )
+            case _:
+                raise ValueError('Unknown password hash format')
+        return parameters, _b64decode(salt), _b64decode(key)
+    except (binascii.Error, pydantic.ValidationError) as err:
+        raise ValueError(str(err)) from err
+
+
+def _b64encode(value: bytes) -> str:
+    return base64.urlsafe_b64encode(value).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(value: str) -> bytes:
+    return base64.urlsafe_b64decode(value + '=' * (-len(value) % 4))
@@ -0,0 +1,228 @@
+"""Rate limiting for endpoints that are expensive to abuse."""
+
+import contextlib
+import dataclasses
+import enum
+import hashlib
+import logging
+import math
+import re
+import time
+import typing
+from collections import abc
+
+import fastapi
+import pydantic_settings
+
+from emuse import cache, database, deadline, metrics
+
+LOGGER = logging.getLogger(__name__)
+
+REJECTED = metrics.Counter(
+    'emuse_rate_limit_rejected_total',
+    'Requests rejected by the rate limiter',
+    ['scope', 'key'],
+)
+
+
+class Backend(enum.StrEnum):
+    memory = 'memory'
+    postgres = 'postgres'
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'rate_limit_',
+        'extra': 'ignore',
+    }
+
+    backend: Backend = Backend.memory
+    window: int = 60
+    ip_limit: int = 30
+    email_limit: int = 5
+    max_keys: int = 100_000
+
+
+@dataclasses.dataclass(slots=True)
+class _Counter:
+    window: int
+    current: int = 0
+    previous: int = 0
+
+
+class Limiter:
+    """Counts attempts per key and decides if they are allowed"""
+
+    def __init__(self, window: int, max_keys: int) -> None:
+        self.window = window
+        self._counters: cache.LRUCache[bytes, _Counter] = cache.LRUCache(
+            max_keys
+        )
+
+    async def hit(
+        self, postgres: database.ConnectionType | None, key: bytes, limit: int
+    ) -> float:
+        """Record an attempt, returning seconds to wait or 0 if allowed."""
+        now = time.time()
+        window, elapsed = divmod(now, self.window)
+        current, previous = await self._increment(postgres, key, int(window))
+        return self._retry_after(current, previous, elapsed, limit)
+
+    async def _increment(
+        self, postgres: database.ConnectionType | None, key: bytes, window: int
+    ) -> tuple[int, int]:
+        counter = self._counters.get(key)
+        if counter is None:
+            counter = _Counter(window)
+            self._counters.set(key, counter)
+        elif counter.window != window:
+            counter.previous = (
+                counter.current if counter.window == window - 1 else 0
+            )
+            counter.current = 0
+            counter.window = window
+        counter.current += 1
+        return counter.current, counter.previous
+
+    def _retry_after(
+        self, current: int, previous: int, elapsed: float, limit: int
+    ) -> float:
+        # A sliding window counter: the current fixed window's count plus
+        # the previous one's, weighted by how much of it still overlaps,
+        # so each key needs two integers rather than a timestamp per attempt
+        weight = 1 - elapsed / self.window
+        if previous * weight + current <= limit:
+            return 0.0
+        if current >= limit:
+            # Blocked until the current window becomes the previous one
+            # and has decayed enough to let another attempt through
+            decay = 1 - (limit - 1) / current
+            return self.window - elapsed + self.window * decay
+        # Wait for the previous window's share to decay enough for the
+        # next attempt, which also counts, to stay within the limit
+        return self.window * (weight - (limit - current - 1) / previous)
+
+
+class PostgresLimiter(Limiter):
+    """Keeps the counters in Postgres so they are shared across workers"""
+
+    def __init__(self, window: int, max_keys: int) -> None:
+        super().__init__(window, max_keys)
+        self._pruned = 0
+
+    async def _increment(
+        self, postgres: database.ConnectionType, key: bytes, window: int
+    ) -> tuple[int, int]:
+        async with database.cursor(postgres) as cursor:
+            if self._pruned < window:
+                # Once per window, drop counters that are no longer read
+                self._pruned = window
+                await cursor.execute(_PRUNE_SQL, {'previous': window - 1})
+            await cursor.execute(
+                _INCREMENT_SQL,
+                {'key': key, 'window': window, 'previous': window - 1},
+            )
+            row = await cursor.fetchone()
+        return row['current'], row['previous']
+
+
+_limiter: Limiter | None = None
+
+
+def _get_limiter(settings: _Settings) -> Limiter:
+    global _limiter
+    if _limiter is None:
+        cls = (
+            PostgresLimiter
+            if settings.backend == Backend.postgres
+            else Limiter
+        )
+        _limiter = cls(settings.window, settings.max_keys)
+    return _limiter
+
+
+def _key(scope: str, kind: str, value: str) -> bytes:
+    # Hashed so email addresses are not kept in memory or in Postgres
+    return hashlib.blake2b(
+        f'{scope}\x00{kind}\x00{value}'.encode(), digest_size=16
+    ).digest()
+
+
+@contextlib.asynccontextmanager
+async def _connection(
+    request: fastapi.Request, limiter: Limiter
+) -> abc.AsyncIterator[database.ConnectionType | None]:
+    """Take a connection only when the counters are kept in Postgres"""
+    if not isinstance(limiter, PostgresLimiter):
+        yield None
+        return
+    pool = typing.cast(database.PoolType, request.state.postgres)
+    async with pool.connection(timeout=deadline.remaining(5.0)) as conn:
+        yield conn
+
+
+async def enforce(
+    request: fastapi.Request, scope: str, email: str | None = None
+) -> None:
+    """Count an attempt, raising a 429 when either limit is exceeded."""
+    settings = _Settings()
+    limiter = _get_limiter(settings)
+    checks = []
+    if request.client:
+        checks.append(('ip', request.client.host, settings.ip_limit))
+    if email:
+        checks.append(('email', email.lower(), settings.email_limit))
+    retry_after = 0.0
+    async with _connection(request, limiter) as postgres:
+        for kind, value, limit in checks:
+            # Rejected attempts count too, so ignoring Retry-After does
+            # not get a client through
+            wait = await limiter.hit(postgres, _key(scope, kind, value), limit)
+            if wait:
+                REJECTED.inc(scope=scope, key=kind)
+                retry_after = max(retry_after, wait)
+    if retry_after:
+        LOGGER.info('Rate limited %s attempt for %s', scope, request.client)
+        raise fastapi.HTTPException(
+            status_code=429,
+            detail='Too many attempts. Please try again later.',
+            headers={'Retry-After': str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def limit(scope: str) -> abc.Callable[[fastapi.Request], abc.Awaitable[None]]:
+    """Return a route dependency that enforces the limits for a scope."""
+
+    async def dependency(request: fastapi.Request) -> None:
+        email = None
+        with contextlib.suppress(ValueError):  # Not a JSON body
+            body = await request.json()
+            if isinstance(body, dict) and isinstance(body.get('email'), str):
+                email = body['email']
+        await enforce(request, scope, email)
+
+    return dependency
+
+
+_INCREMENT_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+    WITH counted AS (
+        INSERT INTO v1.rate_limits AS r (key, bucket, hits)
+             VALUES (%(key)s, %(window)s, 1)
+        ON CONFLICT (key, bucket)
+          DO UPDATE SET hits = r.hits + 1
+          RETURNING hits)
+    SELECT counted.hits AS current,
+           COALESCE((SELECT hits
+                       FROM v1.rate_limits
+                      WHERE key = %(key)s
+                        AND bucket = %(previous)s), 0) AS previous
+      FROM counted
+""",
+)
+
+_PRUNE_SQL = 'DELETE FROM v1.rate_limits WHERE bucket < %(previous)s'
@@ -0,0 +1,21 @@
+"""Building response models from models that were already validated."""
+
+import typing
+
+import pydantic
+
+
+def project[M: pydantic.BaseModel](
+    model: type[M], source: pydantic.BaseModel, /, **values: typing.Any
+) -> M:
+    """Build a response model from the fields of a validated model."""
+    # Nothing is dumped or validated again, so the copied fields must have
+    # the same types in both models
+    fields = type(source).model_fields
+    data = {
+        name: getattr(source, name)
+        for name in model.model_fields
+        if name in fields and name not in values
+    }
+    data.update(values)
+    return model.model_construct(**data)
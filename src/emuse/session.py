@@ -1,4 +1,6 @@
+import collections
 import logging
+import time
 import typing
 import uuid
 
@@ -8,6 +10,7 @@ import pydantic_settings
 from fastapi_sessions import session_verifier
 from fastapi_sessions.backends import implementations as backends
 from fastapi_sessions.frontends import implementations as frontends
+from starlette import requests, types
 
 from emuse import common
 
@@ -73,9 +76,10 @@ class Session:
         app_settings = common.Settings()
         self.backend = backends.InMemoryBackend[uuid.UUID, SessionData]()
         # Session expires after 7 days (604800 seconds)
+        self.max_age = 604800
         # In debug mode, relax cookie security for local development
         self.cookie_params = frontends.CookieParameters(
-            max_age=604800,
+            max_age=self.max_age,
             httponly=True,
             secure=not app_settings.debug,  # Allow HTTP in debug mode
             samesite='lax' if app_settings.debug else 'strict',
@@ -116,6 +120,19 @@ class Session:
         await self.backend.delete(session_id)
         self.cookie.delete_from_response(response)
 
+    def expire(self) -> int:
+        """Remove expired sessions, returning the number removed."""
+        cutoff = (time.time() - self.max_age) * 1000
+        # The first 48 bits of a UUIDv7 are milliseconds since the epoch
+        expired = [
+            session_id
+            for session_id in self.backend.data
+            if session_id.int >> 80 < cutoff
+        ]
+        for session_id in expired:
+            del self.backend.data[session_id]
+        return len(expired)
+
 
 async def create(response: fastapi.Response, account_id: uuid.UUID) -> None:
     """Create the session cookie"""
@@ -128,6 +145,46 @@ async def delete(response: fastapi.Response, session_id: uuid.UUID) -> None:
     await instance.delete(response, session_id)
 
 
+async def current(request: fastapi.Request) -> SessionData | None:
+    """Return the session for the request, or None if anonymous"""
+    try:
+        return await Session.get_instance().verifier(request)
+    except fastapi.HTTPException:
+        return None
+
+
+class _SessionIds(collections.UserDict):
+    """Parses and verifies the signed session cookie on first access"""
+
+    def __init__(self, scope: types.Scope) -> None:
+        super().__init__()
+        self._scope = scope
+
+    def __missing__(self, key: str) -> typing.Any:
+        # The verifier reads the session ID the cookie frontend stored, so
+        # running the frontend here skips it for requests that never check
+        frontend = cookie()
+        if key != frontend.identifier:
+            raise KeyError(key)
+        # Stores the session ID or FrontendError via attach_id_state
+        frontend(requests.Request(self._scope))
+        return self[key]
+
+
+class SessionMiddleware:
+    """Pure ASGI middleware that makes the session available to the API"""
+
+    def __init__(self, app: types.ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(
+        self, scope: types.Scope, receive: types.Receive, send: types.Send
+    ) -> None:
+        if scope['type'] == 'http' and scope['path'].startswith('/api/'):
+            scope.setdefault('state', {})['session_ids'] = _SessionIds(scope)
+        await self.app(scope, receive, send)
+
+
 def cookie() -> frontends.SessionCookie:
     """Return the session cookie object."""
     return Session.get_instance().cookie
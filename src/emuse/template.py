@@ -1,28 +1,101 @@
+import hashlib
+import json
+import logging
 import pathlib
 
-import jinja2
+from emuse import common, metrics
 
-from emuse import common
+# Only needed once a page or email is rendered, see common.lazy_import
+jinja2 = common.lazy_import('jinja2')
 
+LOGGER = logging.getLogger(__name__)
+
+COMPILED_PATH = pathlib.Path(__file__).parent / 'templates_compiled'
 STATIC_PATH = pathlib.Path(__file__).parent / 'static'
 TEMPLATE_PATH = pathlib.Path(__file__).parent / 'templates'
+# Written with the compiled templates, the hashes of their sources
+SOURCES_MANIFEST = 'sources.json'
 
-_environment: jinja2.Environment | None = None
+RENDER = metrics.Summary(
+    'emuse_template_render_seconds',
+    'Time spent rendering templates',
+    ['template'],
+)
 
+_environment: 'jinja2.Environment | None' = None
 
-def initialize() -> None:
-    global _environment
-    settings = common.Settings()
-    _environment = jinja2.Environment(
-        loader=jinja2.FileSystemLoader(TEMPLATE_PATH),
+
+def _create_environment(
+    loader: 'jinja2.BaseLoader', debug: bool = False
+) -> 'jinja2.Environment':
+    return jinja2.Environment(
+        loader=loader,
         autoescape=True,
-        auto_reload=settings.debug,
+        auto_reload=debug,
         extensions=['jinja2.ext.i18n', 'jinja2_time.TimeExtension'],
         undefined=jinja2.StrictUndefined,
         enable_async=True,
     )
 
 
+def initialize() -> None:
+    """Create the environment, preferring precompiled templates."""
+    global _environment
+    settings = common.Settings()
+    loader = jinja2.FileSystemLoader(TEMPLATE_PATH)
+    if COMPILED_PATH.is_dir() and not settings.debug:
+        if _compiled_is_current(COMPILED_PATH):
+            LOGGER.debug(
+                'Loading precompiled templates from %s', COMPILED_PATH
+            )
+            # Templates missing from the compiled set fall back to source
+            loader = jinja2.ChoiceLoader([
+                jinja2.ModuleLoader(COMPILED_PATH),
+                loader,
+            ])
+        else:
+            LOGGER.warning(
+                'Ignoring precompiled templates in %s, the sources have '
+                'changed since they were compiled',
+                COMPILED_PATH,
+            )
+    _environment = _create_environment(loader, settings.debug)
+
+
+def compile_templates(target: pathlib.Path = COMPILED_PATH) -> None:
+    """Compile every template to a Python module in the target directory."""
+    environment = _create_environment(jinja2.FileSystemLoader(TEMPLATE_PATH))
+    environment.compile_templates(target, zip=None, ignore_errors=False)
+    (target / SOURCES_MANIFEST).write_text(json.dumps(_source_hashes()))
+
+
+def _source_hashes() -> dict[str, str]:
+    """Return the SHA-256 of every template source by name"""
+    return {
+        path.relative_to(TEMPLATE_PATH).as_posix(): hashlib.sha256(
+            path.read_bytes()
+        ).hexdigest()
+        for path in sorted(TEMPLATE_PATH.rglob('*'))
+        if path.is_file()
+    }
+
+
+def _compiled_is_current(path: pathlib.Path) -> bool:
+    """Return True if the templates were compiled from the sources"""
+    try:
+        compiled = json.loads((path / SOURCES_MANIFEST).read_text())
+    except (OSError, ValueError):
+        return False
+    return compiled == _source_hashes()
+
+
+def _get_environment() -> 'jinja2.Environment':
+    """Return the environment, creating it on first use."""
+    if _environment is None:
+        initialize()
+    return _environment
+
+
 def render(template: str, **kwargs) -> str:
     """Render a template
 
@@ -31,8 +104,8 @@ def render(template: str, **kwargs) -> str:
         **kwargs: Variables to pass to the template during rendering
 
     """
-    template = _environment.get_template(template)
-    return template.render(**kwargs)
+    with RENDER.time(template=template):
+        return _get_environment().get_template(template).render(**kwargs)
 
 
 async def render_async(template: str, **kwargs) -> str:
@@ -43,5 +116,7 @@ async def render_async(template: str, **kwargs) -> str:
         **kwargs: Variables to pass to the template during rendering
 
     """
-    template = _environment.get_template(template)
-    return await template.render_async(**kwargs)
+    with RENDER.time(template=template):
+        return await (
+            _get_environment().get_template(template).render_async(**kwargs)
+        )
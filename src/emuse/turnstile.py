@@ -6,6 +6,8 @@ import httpx
 import pydantic
 import pydantic_settings
 
+from emuse import deadline
+
 LOGGER = logging.getLogger(__name__)
 
 
@@ -56,7 +58,7 @@ async def verify_token(token: str, remote_ip: str | None = None) -> bool:
             response = await client.post(
                 'https://challenges.cloudflare.com/turnstile/v0/siteverify',
                 data=data,
-                timeout=10.0,
+                timeout=deadline.remaining(10.0),
             )
             response.raise_for_status()
 
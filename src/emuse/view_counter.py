@@ -0,0 +1,162 @@
+"""Write-behind buffering of poem view counts."""
+
+import asyncio
+import collections
+import contextlib
+import logging
+import re
+import typing
+import uuid
+from collections import abc
+
+import fastapi
+import psycopg
+import pydantic_settings
+
+from emuse import database, metrics
+
+LOGGER = logging.getLogger(__name__)
+
+BUFFERED = metrics.Gauge(
+    'emuse_poem_views_buffered', 'Poem views waiting to be flushed'
+)
+DROPPED = metrics.Counter(
+    'emuse_poem_views_dropped_total',
+    'Poem views dropped because the buffer was full',
+)
+FLUSHED = metrics.Counter(
+    'emuse_poem_views_flushed_total', 'Poem views written to Postgres'
+)
+FLUSH_ERRORS = metrics.Counter(
+    'emuse_poem_views_flush_errors_total', 'Failed poem view flushes'
+)
+
+
+class _Settings(pydantic_settings.BaseSettings):
+    model_config = {
+        'case_sensitive': False,
+        'env_file': '.env',
+        'env_prefix': 'view_counter_',
+        'extra': 'ignore',
+    }
+
+    flush_interval: float = 10.0
+    max_pending: int = 10000
+
+
+class ViewCounter:
+    """Aggregates poem views in memory and flushes them in batches"""
+
+    def __init__(
+        self, pool: database.PoolType, flush_interval: float, max_pending: int
+    ) -> None:
+        self._pool = pool
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        # Popular poems would be hot rows if every view locked them
+        self._pending: collections.Counter[uuid.UUID] = collections.Counter()
+        self._wakeup = asyncio.Event()
+
+    def record(self, poem_id: uuid.UUID) -> None:
+        """Count a view of the poem."""
+        if poem_id not in self._pending:
+            if len(self._pending) >= self._max_pending:
+                # Keep memory bounded, drop the view and flush early
+                DROPPED.inc()
+                self._wakeup.set()
+                return
+            if len(self._pending) + 1 >= self._max_pending:
+                self._wakeup.set()
+        self._pending[poem_id] += 1
+        BUFFERED.inc()
+
+    async def flush(self) -> int:
+        """Write all buffered views, returning the number written."""
+        if not self._pending:
+            return 0
+        pending, self._pending = self._pending, collections.Counter()
+        # Sorting keeps row lock order consistent across workers
+        poem_ids = sorted(pending)
+        counts = [pending[poem_id] for poem_id in poem_ids]
+        try:
+            async with (
+                self._pool.connection() as conn,
+                database.cursor(conn) as cursor,
+            ):
+                await cursor.execute(
+                    _FLUSH_SQL, {'ids': poem_ids, 'counts': counts}
+                )
+        except psycopg.Error as err:
+            LOGGER.warning('Failed to flush poem views: %s', err)
+            FLUSH_ERRORS.inc()
+            self._restore(pending)
+            return 0
+        total = sum(counts)
+        BUFFERED.dec(total)
+        FLUSHED.inc(total)
+        return total
+
+    def _restore(self, pending: collections.Counter[uuid.UUID]) -> None:
+        """Put back views that failed to flush, up to max_pending poems"""
+        dropped = 0
+        for poem_id, count in pending.items():
+            if (
+                poem_id in self._pending
+                or len(self._pending) < self._max_pending
+            ):
+                self._pending[poem_id] += count
+            else:
+                dropped += count
+        if dropped:
+            LOGGER.warning(
+                'Dropped %i poem views that did not fit the buffer', dropped
+            )
+            BUFFERED.dec(dropped)
+            DROPPED.inc(dropped)
+
+    async def run(self) -> None:
+        """Flush on an interval or when the buffer fills up."""
+        while True:
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(
+                    self._wakeup.wait(), self._flush_interval
+                )
+            self._wakeup.clear()
+            await self.flush()
+
+
+@contextlib.asynccontextmanager
+async def lifespan(pool: database.PoolType) -> abc.AsyncGenerator[ViewCounter]:
+    """Run the flush loop, flushing what is left on shutdown."""
+    settings = _Settings()
+    counter = ViewCounter(pool, settings.flush_interval, settings.max_pending)
+    task = asyncio.create_task(counter.run())
+    try:
+        yield counter
+    finally:
+        task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+        flushed = await counter.flush()
+        LOGGER.debug('Flushed %i poem views on shutdown', flushed)
+
+
+async def view_counter(request: fastapi.Request) -> ViewCounter:  # noqa: RUF029
+    return typing.cast(ViewCounter, request.state.view_counter)
+
+
+InjectViewCounter = typing.Annotated[
+    ViewCounter, fastapi.Depends(view_counter)
+]
+
+
+_FLUSH_SQL = re.sub(
+    r'\s+',
+    ' ',
+    """\
+UPDATE v1.poetry AS p
+   SET views = p.views + v.count
+  FROM unnest(%(ids)s::uuid[], %(counts)s::bigint[]) AS v(id, count)
+ WHERE p.id = v.id
+""",
+)
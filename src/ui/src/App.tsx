@@ -1,8 +1,10 @@
 import { Routes, Route } from 'react-router-dom'
 import { AuthProvider } from './contexts/AuthContext'
 import Header from './components/Header'
+import Author from './pages/Author'
 import Home from './pages/Home'
 import Login from './pages/Login'
+import Poem from './pages/Poem'
 import Signup from './pages/Signup'
 import SignupSuccess from './pages/SignupSuccess'
 import VerifyEmail from './pages/VerifyEmail'
@@ -18,6 +20,8 @@ function App() {
         <Route path="/signup" element={<Signup />} />
         <Route path="/signup/success" element={<SignupSuccess />} />
         <Route path="/verify-email/:token" element={<VerifyEmail />} />
+        <Route path="/poems/:poemId" element={<Poem />} />
+        <Route path="/authors/:authorId" element={<Author />} />
       </Routes>
     </AuthProvider>
   )
@@ -0,0 +1,76 @@
+import { useParams, Link } from 'react-router-dom'
+import { useQuery } from '@tanstack/react-query'
+import '@awesome.me/webawesome/dist/components/card/card.js'
+import '@awesome.me/webawesome/dist/components/callout/callout.js'
+import '@awesome.me/webawesome/dist/components/icon/icon.js'
+import '@awesome.me/webawesome/dist/components/spinner/spinner.js'
+
+interface PoemListItem {
+  id: string
+  author: { id: string; display_name: string; memorial: boolean } | null
+  title: string | null
+  posted_at: string
+}
+
+async function fetchPoems(authorId: string): Promise<PoemListItem[]> {
+  const response = await fetch(`/api/poems?owner=${authorId}&limit=100`, {
+    credentials: 'include',
+  })
+
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({ detail: 'Author not found' }))
+    throw new Error(error.detail || 'Author not found')
+  }
+
+  return response.json()
+}
+
+export default function Author() {
+  const { authorId } = useParams<{ authorId: string }>()
+
+  const { data, isLoading, isError, error } = useQuery({
+    queryKey: ['author-poems', authorId],
+    queryFn: () => fetchPoems(authorId!),
+    enabled: !!authorId,
+    retry: false,
+  })
+
+  const author = data?.find((poem) => poem.author)?.author
+
+  return (
+    <div style={{ maxWidth: '700px', margin: '2rem auto', padding: '1rem' }}>
+      {isLoading && (
+        <div style={{ textAlign: 'center', padding: '2rem' }}>
+          <wa-spinner size="large" />
+        </div>
+      )}
+
+      {isError && (
+        <wa-callout variant="danger" open>
+          <wa-icon slot="icon" name="exclamation-triangle" />
+          {error instanceof Error ? error.message : 'Author not found'}
+        </wa-callout>
+      )}
+
+      {data && (
+        <wa-card>
+          <div slot="header">
+            <h1 style={{ margin: 0 }}>{author ? author.display_name : 'Poems'}</h1>
+          </div>
+
+          {data.length === 0 ? (
+            <p>No poems to show.</p>
+          ) : (
+            <ul>
+              {data.map((poem) => (
+                <li key={poem.id}>
+                  <Link to={`/poems/${poem.id}`}>{poem.title || 'Untitled'}</Link>
+                </li>
+              ))}
+            </ul>
+          )}
+        </wa-card>
+      )}
+    </div>
+  )
+}
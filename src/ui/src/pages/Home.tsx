@@ -1,13 +1,64 @@
+import { Link } from 'react-router-dom'
 import '@awesome.me/webawesome/dist/components/card/card.js'
 import '@awesome.me/webawesome/dist/components/button/button.js'
 
+interface Author {
+  id: string
+  display_name: string
+  memorial: boolean
+}
+
+interface FeedItem {
+  id: string
+  author: Author | null
+  title: string | null
+  posted_at: string
+  tags: string[]
+}
+
+// Rendered into the page by the server, so no request is needed
+function readFeed(): FeedItem[] {
+  const element = document.getElementById('homepage-feed')
+  if (!element?.textContent) {
+    return []
+  }
+  try {
+    return JSON.parse(element.textContent) as FeedItem[]
+  } catch {
+    return []
+  }
+}
+
+const feed = readFeed()
+
 export default function Home() {
   return (
     <div style={{ padding: '1rem' }}>
+      <h2 style={{ margin: 0 }}>Welcome</h2>
 
-          <h2 style={{ margin: 0 }}>Welcome</h2>
-
-
+      {feed.length > 0 && (
+        <div style={{ display: 'grid', gap: '1rem', marginTop: '1rem' }}>
+          {feed.map((item) => (
+            <wa-card key={item.id}>
+              <div slot="header">
+                <Link to={`/poems/${item.id}`}>{item.title || 'Untitled'}</Link>
+                {item.author && (
+                  <>
+                    {' by '}
+                    <Link to={`/authors/${item.author.id}`}>
+                      {item.author.display_name}
+                    </Link>
+                  </>
+                )}
+              </div>
+              <time dateTime={item.posted_at}>
+                {new Date(item.posted_at).toLocaleDateString()}
+              </time>
+              {item.tags.length > 0 && <span> &middot; {item.tags.join(', ')}</span>}
+            </wa-card>
+          ))}
+        </div>
+      )}
     </div>
   )
 }
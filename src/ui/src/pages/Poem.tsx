@@ -0,0 +1,89 @@
+import { useParams, Link } from 'react-router-dom'
+import { useQuery } from '@tanstack/react-query'
+import '@awesome.me/webawesome/dist/components/card/card.js'
+import '@awesome.me/webawesome/dist/components/callout/callout.js'
+import '@awesome.me/webawesome/dist/components/icon/icon.js'
+import '@awesome.me/webawesome/dist/components/spinner/spinner.js'
+
+interface Author {
+  id: string
+  display_name: string
+  memorial: boolean
+}
+
+interface PoemDetail {
+  id: string
+  author: Author | null
+  title: string | null
+  posted_at: string
+  content: string
+  notes: string | null
+  tags: string[]
+}
+
+async function fetchPoem(poemId: string): Promise<PoemDetail> {
+  const response = await fetch(`/api/poems/${poemId}`, {
+    credentials: 'include',
+  })
+
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({ detail: 'Poem not found' }))
+    throw new Error(error.detail || 'Poem not found')
+  }
+
+  return response.json()
+}
+
+export default function Poem() {
+  const { poemId } = useParams<{ poemId: string }>()
+
+  const { data, isLoading, isError, error } = useQuery({
+    queryKey: ['poem', poemId],
+    queryFn: () => fetchPoem(poemId!),
+    enabled: !!poemId,
+    retry: false,
+  })
+
+  return (
+    <div style={{ maxWidth: '700px', margin: '2rem auto', padding: '1rem' }}>
+      {isLoading && (
+        <div style={{ textAlign: 'center', padding: '2rem' }}>
+          <wa-spinner size="large" />
+        </div>
+      )}
+
+      {isError && (
+        <wa-callout variant="danger" open>
+          <wa-icon slot="icon" name="exclamation-triangle" />
+          {error instanceof Error ? error.message : 'Poem not found'}
+        </wa-callout>
+      )}
+
+      {data && (
+        <wa-card>
+          <div slot="header">
+            <h1 style={{ margin: 0 }}>{data.title || 'Untitled'}</h1>
+            {data.author && (
+              <Link to={`/authors/${data.author.id}`}>
+                {data.author.display_name}
+              </Link>
+            )}
+          </div>
+
+          <p style={{ whiteSpace: 'pre-wrap' }}>{data.content}</p>
+
+          {data.notes && (
+            <p style={{ whiteSpace: 'pre-wrap', fontStyle: 'italic' }}>{data.notes}</p>
+          )}
+
+          <div slot="footer">
+            <time dateTime={data.posted_at}>
+              {new Date(data.posted_at).toLocaleDateString()}
+            </time>
+            {data.tags.length > 0 && <span> &middot; {data.tags.join(', ')}</span>}
+          </div>
+        </wa-card>
+      )}
+    </div>
+  )
+}
@@ -1,17 +1,37 @@
-import { defineConfig } from 'vite'
+import { rmSync } from 'node:fs'
+import { fileURLToPath } from 'node:url'
+import { defineConfig, type Plugin } from 'vite'
 import react from '@vitejs/plugin-react'
 
+// The output directory also holds the favicons and logo, so rather than
+// emptying it, remove the hashed bundles of earlier builds
+function cleanAssets(): Plugin {
+  return {
+    name: 'emuse-clean-assets',
+    apply: 'build',
+    buildStart() {
+      rmSync(fileURLToPath(new URL('../emuse/static/assets', import.meta.url)), {
+        recursive: true,
+        force: true,
+      })
+    },
+  }
+}
+
 // https://vite.dev/config/
 export default defineConfig({
-  plugins: [react()],
+  plugins: [react(), cleanAssets()],
   build: {
     outDir: '../emuse/static',
     emptyOutDir: false,
+    // Content hashed names let the server cache assets as immutable,
+    // the manifest maps the entry point to them for the index template
+    manifest: true,
     rollupOptions: {
       output: {
-        entryFileNames: 'assets/index.js',
-        chunkFileNames: 'assets/[name].js',
-        assetFileNames: 'assets/index.[ext]',
+        entryFileNames: 'assets/[name]-[hash].js',
+        chunkFileNames: 'assets/[name]-[hash].js',
+        assetFileNames: 'assets/[name]-[hash].[ext]',
       },
     },
   },
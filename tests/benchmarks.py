@@ -0,0 +1,7 @@
+import os
+import unittest
+
+# Wall-clock budgets depend on the machine, so they only run on request
+opt_in = unittest.skipUnless(
+    os.environ.get('EMUSE_BENCHMARKS'), 'set EMUSE_BENCHMARKS=1 to run'
+)
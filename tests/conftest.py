@@ -0,0 +1,6 @@
+import os
+
+os.environ.setdefault('DEBUG', '1')
+os.environ.setdefault('SESSION_COOKIE_SECRET', 'test-secret-' + 'x' * 32)
+os.environ.setdefault('TURNSTILE_SITE_KEY', 'test-site-key')
+os.environ.setdefault('TURNSTILE_SECRET_KEY', 'test-secret-key')
@@ -0,0 +1,91 @@
+import contextlib
+import typing
+
+
+class Cursor:
+    """Returns the rows queued on its Connection, in order"""
+
+    def __init__(self, connection: 'Connection') -> None:
+        self._connection = connection
+        self._rows: list = []
+        self.rowcount = -1
+
+    async def __aenter__(self) -> 'Cursor':
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        pass
+
+    async def execute(self, query: str, params: typing.Any = None) -> None:
+        self._connection.executed.append((query, params))
+        self._rows = (
+            self._connection.results.pop(0) if self._connection.results else []
+        )
+        self.rowcount = len(self._rows)
+
+    async def fetchone(self) -> typing.Any:
+        return self._rows.pop(0) if self._rows else None
+
+    async def fetchall(self) -> list:
+        rows, self._rows = self._rows, []
+        return rows
+
+    @contextlib.asynccontextmanager
+    async def copy(self, statement: object) -> typing.AsyncIterator['Copy']:
+        copy = Copy()
+        yield copy
+        self._connection.copied.append((statement, copy.rows))
+
+    def __aiter__(self) -> 'Cursor':
+        return self
+
+    async def __anext__(self) -> typing.Any:
+        if not self._rows:
+            raise StopAsyncIteration
+        return self._rows.pop(0)
+
+
+class Copy:
+    def __init__(self) -> None:
+        self.rows: list = []
+
+    async def write_row(self, row: typing.Sequence) -> None:
+        self.rows.append(row)
+
+
+class Connection:
+    """A stand-in for psycopg.AsyncConnection without a database
+
+    Each execute takes the next list from results as its rows, rows are
+    returned as given whatever row factory was requested.
+
+    """
+
+    def __init__(self, *results: list) -> None:
+        self.results = list(results)
+        self.executed: list[tuple[str, typing.Any]] = []
+        self.copied: list[tuple[object, list]] = []
+        self.transactions = 0
+
+    def cursor(self, *args: object, **kwargs: object) -> Cursor:
+        return Cursor(self)
+
+    @contextlib.asynccontextmanager
+    async def transaction(self) -> typing.AsyncIterator[None]:
+        self.transactions += 1
+        yield
+
+
+class Pool:
+    """Hands out a single Connection, counting how often"""
+
+    def __init__(self, connection: Connection) -> None:
+        self.connection_count = 0
+        self._connection = connection
+
+    @contextlib.asynccontextmanager
+    async def connection(
+        self, *args: object, **kwargs: object
+    ) -> typing.AsyncIterator[Connection]:
+        self.connection_count += 1
+        yield self._connection
@@ -0,0 +1,45 @@
+import base64
+import hashlib
+import os
+import time
+import unittest
+import uuid
+from unittest import mock
+
+from emuse import models, passwords
+from tests import fakes
+
+
+class AuthenticateTimingTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        passwords._cost.cache_clear()
+        # New hashes are cheaper than the legacy ones still stored
+        patcher = mock.patch.dict(
+            os.environ, {'PASSWORDS_PBKDF2_ITERATIONS': '1000'}
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _elapsed(self, *results: list) -> float:
+        start = time.monotonic()
+        result = await models.Account.authenticate(
+            fakes.Connection(*results), 'poet@example.com', 'wrong password'
+        )
+        self.assertIsNone(result)
+        return time.monotonic() - start
+
+    async def test_unknown_account_takes_as_long_as_a_legacy_check(
+        self,
+    ) -> None:
+        salt = os.urandom(16)
+        key = hashlib.pbkdf2_hmac('sha256', b'secret', salt, 100_000)
+        legacy = {
+            'id': uuid.uuid4(),
+            'password': base64.b64encode(key).decode(),
+            'salt': salt,
+        }
+        known = await self._elapsed([legacy])
+        unknown = await self._elapsed([])
+        minimum = passwords._cost(passwords._LEGACY) / 1000
+        self.assertGreaterEqual(unknown, minimum)
+        self.assertGreaterEqual(known, minimum)
@@ -0,0 +1,39 @@
+import unittest
+
+from emuse import admission
+
+
+class ClassifyTestCase(unittest.TestCase):
+    def test_password_endpoints(self) -> None:
+        for path in ('/api/login', '/api/signup'):
+            self.assertEqual(
+                admission.classify(path), admission.Priority.hashing
+            )
+
+    def test_database_backed_paths(self) -> None:
+        for path in ('/api/poems', '/sitemap.xml', '/sitemap-3.xml.gz'):
+            self.assertEqual(admission.classify(path), admission.Priority.api)
+
+    def test_shell_paths(self) -> None:
+        for path in ('/', '/status', '/assets/index.js', '/poems/1'):
+            self.assertEqual(
+                admission.classify(path), admission.Priority.shell
+            )
+
+
+class RejectReasonTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.middleware = admission.AdmissionMiddleware(None)
+
+    def test_sitemaps_are_shed_when_the_pool_is_saturated(self) -> None:
+        class Pool:
+            def get_stats(self) -> dict:
+                return {'requests_waiting': 1000}
+
+        state = {'postgres': Pool()}
+        priority = admission.classify('/sitemap.xml')
+        self.assertEqual(
+            self.middleware._reject_reason(priority, state), 'pool'
+        )
+        priority = admission.classify('/')
+        self.assertIsNone(self.middleware._reject_reason(priority, state))
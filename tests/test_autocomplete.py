@@ -0,0 +1,121 @@
+import asyncio
+import time
+import unittest
+import uuid
+
+import fastapi
+
+from emuse import models
+from emuse.endpoints import autocomplete
+from tests import benchmarks, fakes
+
+
+def _authors(count: int) -> list[models.Author]:
+    return [
+        models.Author(id=uuid.uuid4(), display_name=f'Ada {i}', memorial=False)
+        for i in range(count)
+    ]
+
+
+def _tags(count: int) -> list[dict]:
+    return [{'tag': f'ada{i}'} for i in range(count)]
+
+
+class EscapeTestCase(unittest.TestCase):
+    def test_wildcards_are_escaped(self) -> None:
+        self.assertEqual(autocomplete._escape('50%_a\\b'), '50\\%\\_a\\\\b')
+
+    def test_plain_text_is_unchanged(self) -> None:
+        self.assertEqual(autocomplete._escape('ada lovelace'), 'ada lovelace')
+
+
+class AutocompleteTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        autocomplete._suggestions.clear()
+
+    async def _call(
+        self, postgres: fakes.Connection, q: str, **kwargs: object
+    ) -> tuple[autocomplete.Suggestions, fastapi.Response]:
+        response = fastapi.Response()
+        kwargs.setdefault('kind', None)
+        kwargs.setdefault('limit', autocomplete._MAX_RESULTS)
+        result = await autocomplete.autocomplete(
+            postgres, response, q, **kwargs
+        )
+        return result, response
+
+    async def test_authors_and_tags(self) -> None:
+        authors = _authors(3)
+        postgres = fakes.Connection(authors, _tags(2))
+        result, response = await self._call(postgres, ' Ada ')
+        self.assertEqual(result.authors, authors)
+        self.assertEqual(result.tags, ['ada0', 'ada1'])
+        self.assertEqual(
+            response.headers['Cache-Control'], autocomplete._CACHE_CONTROL
+        )
+        params = postgres.executed[0][1]
+        self.assertEqual(params['prefix'], 'ada%')
+        self.assertEqual(params['word'], '% ada%')
+        self.assertEqual(params['limit'], autocomplete._MAX_RESULTS)
+
+    async def test_prefix_is_escaped(self) -> None:
+        postgres = fakes.Connection([], [])
+        await self._call(postgres, '5%_')
+        self.assertEqual(postgres.executed[0][1]['prefix'], '5\\%\\_%')
+
+    async def test_repeated_prefixes_are_cached(self) -> None:
+        postgres = fakes.Connection(_authors(2), _tags(2))
+        await self._call(postgres, 'Ada')
+        result, _ = await self._call(postgres, 'ADA')
+        self.assertEqual(len(postgres.executed), 2)
+        self.assertEqual(len(result.authors), 2)
+        self.assertEqual(len(result.tags), 2)
+
+    async def test_limit_slices_cached_results(self) -> None:
+        postgres = fakes.Connection(_authors(10), _tags(10))
+        await self._call(postgres, 'ada')
+        result, _ = await self._call(postgres, 'ada', limit=3)
+        self.assertEqual(len(result.authors), 3)
+        self.assertEqual(len(result.tags), 3)
+        self.assertEqual(len(postgres.executed), 2)
+
+    async def test_kind_filters_queries(self) -> None:
+        postgres = fakes.Connection(_tags(1))
+        result, _ = await self._call(postgres, 'ada', kind='tags')
+        self.assertEqual(result.authors, [])
+        self.assertEqual(result.tags, ['ada0'])
+        self.assertEqual(len(postgres.executed), 1)
+        self.assertIs(postgres.executed[0][0], autocomplete._TAGS_SQL)
+
+    async def test_blank_prefix_does_not_query(self) -> None:
+        postgres = fakes.Connection()
+        result, _ = await self._call(postgres, '  a ')
+        self.assertEqual(result, autocomplete.Suggestions())
+        self.assertEqual(postgres.executed, [])
+
+
+@benchmarks.opt_in
+class AutocompleteBenchmarkTestCase(unittest.TestCase):
+    """Cached prefixes are answered without touching Postgres"""
+
+    BUDGET = 0.0002
+    ITERATIONS = 2000
+
+    def test_cached_lookup(self) -> None:
+        autocomplete._suggestions.clear()
+        postgres = fakes.Connection(_authors(10), _tags(10))
+
+        async def run() -> float:
+            await autocomplete.autocomplete(
+                postgres, fastapi.Response(), 'ada', None, 5
+            )
+            start = time.perf_counter()
+            for _ in range(self.ITERATIONS):
+                await autocomplete.autocomplete(
+                    postgres, fastapi.Response(), 'ada', None, 5
+                )
+            return (time.perf_counter() - start) / self.ITERATIONS
+
+        per_call = asyncio.run(run())
+        self.assertEqual(len(postgres.executed), 2)
+        self.assertLess(per_call, self.BUDGET)
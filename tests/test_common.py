@@ -0,0 +1,39 @@
+import atexit
+import logging
+import queue
+import threading
+import unittest
+from logging import handlers
+
+from emuse import common
+
+
+class _Listener(handlers.QueueListener):
+    def __init__(self, record_queue: queue.Queue) -> None:
+        super().__init__(record_queue)
+        self.starts = 0
+
+    def start(self) -> None:
+        self.starts += 1
+        super().start()
+
+
+class QueuedHandlerTestCase(unittest.TestCase):
+    def test_listener_starts_once_under_concurrent_logging(self) -> None:
+        record_queue: queue.Queue = queue.Queue()
+        handler = common.QueuedHandler(record_queue)
+        handler.listener = _Listener(record_queue)
+        barrier = threading.Barrier(8)
+
+        def log() -> None:
+            barrier.wait()
+            handler.emit(logging.makeLogRecord({'msg': 'hello'}))
+
+        threads = [threading.Thread(target=log) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        handler.listener.stop()
+        atexit.unregister(handler.listener.stop)
+        self.assertEqual(handler.listener.starts, 1)
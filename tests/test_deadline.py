@@ -0,0 +1,48 @@
+import asyncio
+import unittest
+
+from emuse import deadline
+
+
+async def _receive() -> dict:
+    await asyncio.sleep(60)
+    return {'type': 'http.disconnect'}
+
+
+class DeadlineMiddlewareTestCase(unittest.IsolatedAsyncioTestCase):
+    async def _call(self, app, budget: float = 10.0) -> list[dict]:
+        middleware = deadline.DeadlineMiddleware(app)
+        middleware.settings.default = budget
+        messages = []
+
+        async def send(message: dict) -> None:  # noqa: RUF029
+            messages.append(message)
+
+        scope = {'type': 'http', 'path': '/test', 'headers': []}
+        await middleware(scope, _receive, send)
+        return messages
+
+    async def test_expired_deadline_returns_504(self) -> None:
+        async def app(scope, receive, send) -> None:
+            await asyncio.sleep(1)
+
+        messages = await self._call(app, budget=0.01)
+        self.assertEqual(messages[0]['status'], 504)
+
+    async def test_application_timeout_is_raised(self) -> None:
+        async def app(scope, receive, send) -> None:
+            async with asyncio.timeout(0.01):
+                await asyncio.sleep(1)
+
+        with self.assertRaises(TimeoutError):
+            await self._call(app)
+
+    async def test_remaining_is_bounded_by_the_budget(self) -> None:
+        remaining = []
+
+        async def app(scope, receive, send) -> None:  # noqa: RUF029
+            remaining.append(deadline.remaining(60.0))
+
+        await self._call(app, budget=5.0)
+        self.assertLessEqual(remaining[0], 5.0)
+        self.assertEqual(deadline.remaining(60.0), 60.0)
@@ -0,0 +1,34 @@
+import datetime
+import json
+import unittest
+import uuid
+
+from emuse import feed, models
+from tests import fakes
+
+NOW = datetime.datetime(2026, 5, 1, tzinfo=datetime.UTC)
+
+
+class RebuildTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_feed_is_serialized_for_the_shell(self) -> None:
+        owner = uuid.uuid4()
+        poem = models.PoemSummary(
+            id=uuid.uuid4(),
+            owner=owner,
+            title='</script><script>alert(1)</script>',
+            posted_at=NOW,
+            updated_at=NOW,
+            privacy_level=models.PrivacyLevel.public,
+            tags=['night'],
+        )
+        author = models.Author(id=owner, display_name="O'Hara", memorial=False)
+        pool = fakes.Pool(fakes.Connection([poem], [author]))
+        homepage_feed = feed.HomepageFeed(pool, 10, 300.0, 0.0)
+        await homepage_feed.rebuild()
+        self.assertNotIn('<', homepage_feed.json)
+        self.assertNotIn("'", homepage_feed.json)
+        items = json.loads(homepage_feed.json)
+        self.assertEqual(items[0]['title'], poem.title)
+        self.assertEqual(items[0]['author']['display_name'], "O'Hara")
+        self.assertEqual(items[0]['posted_at'], '2026-05-01T00:00:00Z')
+        self.assertEqual(pool.connection_count, 1)
@@ -0,0 +1,101 @@
+import datetime
+import unittest
+import uuid
+
+from emuse import database, models
+from emuse.models import friendship
+from tests import fakes
+
+
+class VisibleLevelsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.owner = uuid.uuid4()
+
+    def test_owner_reads_everything(self) -> None:
+        self.assertEqual(
+            models.poem.visible_levels(self.owner, self.owner),
+            list(models.PrivacyLevel),
+        )
+
+    def test_anonymous_reads_public_only(self) -> None:
+        self.assertEqual(
+            models.poem.visible_levels(self.owner, None),
+            [models.PrivacyLevel.public],
+        )
+
+    def test_friend_reads_friends_only(self) -> None:
+        account_id = uuid.uuid4()
+        levels = models.poem.visible_levels(
+            self.owner, account_id, frozenset({self.owner})
+        )
+        self.assertIn(models.PrivacyLevel.friends_only, levels)
+        self.assertNotIn(models.PrivacyLevel.private, levels)
+        levels = models.poem.visible_levels(self.owner, account_id)
+        self.assertNotIn(models.PrivacyLevel.friends_only, levels)
+
+
+class ViewerTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        friendship._friend_ids.clear()
+        self.account_id = uuid.uuid4()
+        self.friend_id = uuid.uuid4()
+
+    def tearDown(self) -> None:
+        friendship._friend_ids.clear()
+
+    async def test_friend_ids_are_loaded_once(self) -> None:
+        postgres = fakes.Connection([{'friend_id': self.friend_id}])
+        viewer = friendship.Viewer(self.account_id)
+        self.assertEqual(await viewer.friend_ids(postgres), {self.friend_id})
+        self.assertEqual(await viewer.friend_ids(postgres), {self.friend_id})
+        other = friendship.Viewer(self.account_id)
+        self.assertEqual(await other.friend_ids(postgres), {self.friend_id})
+        self.assertEqual(len(postgres.executed), 1)
+
+    async def test_anonymous_viewer_does_not_query(self) -> None:
+        postgres = fakes.Connection()
+        viewer = friendship.Viewer(None)
+        self.assertEqual(await viewer.friend_ids(postgres), frozenset())
+        self.assertEqual(postgres.executed, [])
+
+    async def test_replica_answers_are_not_cached(self) -> None:
+        postgres = fakes.Connection([{'friend_id': self.friend_id}])
+        database._replica_connections.add(postgres)
+        viewer = friendship.Viewer(self.account_id)
+        self.assertEqual(await viewer.friend_ids(postgres), {self.friend_id})
+        self.assertEqual(await viewer.friend_ids(postgres), {self.friend_id})
+        self.assertEqual(len(postgres.executed), 1)
+        self.assertIsNone(friendship._friend_ids.get(self.account_id))
+
+    async def test_remove_invalidates_cached_friends(self) -> None:
+        postgres = fakes.Connection([{'friend_id': self.friend_id}])
+        await friendship.friend_ids(postgres, self.account_id)
+        await friendship.remove(postgres, self.account_id, self.friend_id)
+        self.assertIsNone(friendship._friend_ids.get(self.account_id))
+        self.assertIsNone(friendship._friend_ids.get(self.friend_id))
+        self.assertEqual(
+            await friendship.friend_ids(postgres, self.account_id), frozenset()
+        )
+
+
+class FromFriendsTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_friends_are_matched_with_one_query(self) -> None:
+        friends = frozenset(uuid.uuid4() for _ in range(3))
+        postgres = fakes.Connection([])
+        before = datetime.datetime.now(datetime.UTC)
+        await models.PoemSummary.from_friends(postgres, friends, before, 5)
+        self.assertEqual(len(postgres.executed), 1)
+        query, params = postgres.executed[0]
+        self.assertIs(query, models.poem._FROM_FRIENDS_SQL)
+        self.assertIn('owner = ANY(%(friend_ids)s::uuid[])', query)
+        self.assertIn("privacy_level <> 'private'", query)
+        self.assertEqual(set(params['friend_ids']), friends)
+        self.assertEqual(params['before'], before)
+        self.assertEqual(params['limit'], 5)
+
+    async def test_no_friends_does_not_query(self) -> None:
+        postgres = fakes.Connection()
+        self.assertEqual(
+            await models.PoemSummary.from_friends(postgres, frozenset()), []
+        )
+        self.assertEqual(postgres.executed, [])
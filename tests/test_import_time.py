@@ -0,0 +1,36 @@
+import os
+import re
+import subprocess
+import sys
+import unittest
+
+# Cumulative microseconds allowed for importing emuse.main, generous
+# enough for a loaded CI runner
+BUDGET = int(os.environ.get('EMUSE_IMPORT_BUDGET_US', '2500000'))
+
+# Imported on first use only, see common.lazy_import
+DEFERRED = {'aiosmtplib', 'httpx', 'jinja2'}
+
+
+class ImportTimeTestCase(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls) -> None:
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', 'import emuse.main'],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        cls.cumulative = {}
+        for line in result.stderr.splitlines():
+            match = re.match(
+                r'import time:\s+\d+ \|\s+(\d+) \|\s+(\S+)$', line
+            )
+            if match:
+                cls.cumulative[match.group(2)] = int(match.group(1))
+
+    def test_within_budget(self) -> None:
+        self.assertLess(self.cumulative['emuse.main'], BUDGET)
+
+    def test_deferred_modules_are_not_imported(self) -> None:
+        self.assertEqual(DEFERRED & self.cumulative.keys(), set())
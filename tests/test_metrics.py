@@ -0,0 +1,44 @@
+import os
+import unittest
+from unittest import mock
+
+import fastapi
+from fastapi import testclient
+
+from emuse.endpoints import metrics
+
+
+class MetricsAccessTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        app = fastapi.FastAPI()
+        app.include_router(metrics.router)
+        self.client = testclient.TestClient(app)
+
+    def test_public_client_is_refused(self) -> None:
+        client = testclient.TestClient(
+            self.client.app, client=('8.8.8.8', 50000)
+        )
+        self.assertEqual(client.get('/metrics').status_code, 404)
+
+    def test_private_client_is_allowed(self) -> None:
+        client = testclient.TestClient(
+            self.client.app, client=('10.0.0.5', 50000)
+        )
+        response = client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('# TYPE', response.text)
+
+    def test_token_is_required_when_configured(self) -> None:
+        client = testclient.TestClient(
+            self.client.app, client=('127.0.0.1', 50000)
+        )
+        with mock.patch.dict(os.environ, {'METRICS_TOKEN': 'secret'}):
+            self.assertEqual(client.get('/metrics').status_code, 404)
+            response = client.get(
+                '/metrics', headers={'Authorization': 'Bearer wrong'}
+            )
+            self.assertEqual(response.status_code, 404)
+            response = client.get(
+                '/metrics', headers={'Authorization': 'Bearer secret'}
+            )
+            self.assertEqual(response.status_code, 200)
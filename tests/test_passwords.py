@@ -0,0 +1,58 @@
+import base64
+import hashlib
+import os
+import unittest
+from unittest import mock
+
+from emuse import passwords
+
+
+def _legacy(password: str, salt: bytes) -> str:
+    key = hashlib.pbkdf2_hmac('sha256', password.encode(), salt, 100_000)
+    return base64.b64encode(key).decode()
+
+
+class PasswordsTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        passwords._cost.cache_clear()
+        self.salt = os.urandom(16)
+
+    def test_round_trip(self) -> None:
+        encoded = passwords.hash('correct horse', self.salt)
+        self.assertTrue(encoded.startswith('pbkdf2_sha256$100000$'))
+        self.assertTrue(passwords.verify('correct horse', encoded, b''))
+        self.assertFalse(passwords.verify('wrong horse', encoded, b''))
+
+    def test_legacy_hash_is_verified(self) -> None:
+        encoded = _legacy('correct horse', self.salt)
+        self.assertTrue(passwords.verify('correct horse', encoded, self.salt))
+
+    def test_legacy_hash_needs_rehash_with_defaults(self) -> None:
+        self.assertTrue(
+            passwords.needs_rehash(_legacy('correct horse', self.salt))
+        )
+
+    def test_current_hash_does_not_need_rehash(self) -> None:
+        encoded = passwords.hash('correct horse')
+        self.assertFalse(passwords.needs_rehash(encoded))
+        with mock.patch.dict(os.environ, {'PASSWORDS_ALGORITHM': 'scrypt'}):
+            self.assertTrue(passwords.needs_rehash(encoded))
+
+    def test_dummy_verify_uses_the_costliest_parameters(self) -> None:
+        env = {'PASSWORDS_PBKDF2_ITERATIONS': '1000'}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(passwords._costliest(), passwords._LEGACY)
+            self.assertFalse(passwords.dummy_verify('correct horse'))
+        env = {'PASSWORDS_PBKDF2_ITERATIONS': '300000'}
+        with mock.patch.dict(os.environ, env):
+            self.assertEqual(
+                passwords._costliest(), passwords.Parameters.configured()
+            )
+
+    def test_min_duration_covers_a_legacy_check(self) -> None:
+        env = {'PASSWORDS_PBKDF2_ITERATIONS': '1000'}
+        with mock.patch.dict(os.environ, env):
+            self.assertAlmostEqual(
+                passwords.min_duration(),
+                passwords._cost(passwords._LEGACY) / 1000,
+            )
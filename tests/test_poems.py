@@ -0,0 +1,81 @@
+import datetime
+import json
+import unittest
+import uuid
+
+import fastapi
+
+from emuse import models
+from emuse.endpoints import poems
+from emuse.models import friendship
+from tests import fakes
+
+UPDATED_AT = datetime.datetime(2026, 3, 1, tzinfo=datetime.UTC)
+
+
+class _Views:
+    def __init__(self) -> None:
+        self.recorded: list[uuid.UUID] = []
+
+    def record(self, poem_id: uuid.UUID) -> None:
+        self.recorded.append(poem_id)
+
+
+def _request(etag: str | None = None) -> fastapi.Request:
+    headers = [(b'if-none-match', etag.encode())] if etag else []
+    return fastapi.Request({'type': 'http', 'headers': headers})
+
+
+class GetPoemTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        poems._public_poems.clear()
+        self.poem = models.Poem(
+            owner=uuid.uuid4(), content='a poem', updated_at=UPDATED_AT
+        )
+        self.viewer = friendship.Viewer(None)
+
+    def _version(self, name: str = 'Ada') -> dict:
+        return {
+            'id': self.poem.id,
+            'owner': self.poem.owner,
+            'privacy_level': models.PrivacyLevel.public,
+            'updated_at': UPDATED_AT,
+            'author_name': name,
+            'author_memorial': False,
+        }
+
+    async def _get(
+        self, version: dict, etag: str | None = None
+    ) -> tuple[fastapi.Response, _Views]:
+        postgres = fakes.Connection(
+            [models.PoemVersion(**version)], [self.poem.model_dump()]
+        )
+        views = _Views()
+        response = await poems.get_poem(
+            self.poem.id, _request(etag), postgres, self.viewer, views
+        )
+        return response, views
+
+    async def test_body_uses_the_author_from_the_version(self) -> None:
+        response, views = await self._get(self._version())
+        body = json.loads(response.body)
+        self.assertEqual(body['author']['display_name'], 'Ada')
+        self.assertEqual(views.recorded, [self.poem.id])
+        self.assertNotIn('Last-Modified', response.headers)
+
+    async def test_revalidation_is_not_a_view(self) -> None:
+        response, _ = await self._get(self._version())
+        response, views = await self._get(
+            self._version(), response.headers['ETag']
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(views.recorded, [])
+
+    async def test_author_rename_changes_the_etag(self) -> None:
+        response, _ = await self._get(self._version())
+        response, _ = await self._get(
+            self._version('Ada L.'), response.headers['ETag']
+        )
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.body)
+        self.assertEqual(body['author']['display_name'], 'Ada L.')
@@ -0,0 +1,87 @@
+import os
+import unittest
+from unittest import mock
+
+import fastapi
+from fastapi import testclient
+
+from emuse import rate_limit
+
+
+class RetryAfterTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.limiter = rate_limit.Limiter(60, 100)
+
+    def _allowed(
+        self, current: int, previous: int, elapsed: float, limit: int
+    ) -> bool:
+        return (
+            self.limiter._retry_after(current, previous, elapsed, limit) == 0
+        )
+
+    def assert_retry_is_allowed(
+        self, current: int, previous: int, elapsed: float, limit: int
+    ) -> None:
+        wait = self.limiter._retry_after(current, previous, elapsed, limit)
+        self.assertGreater(wait, 0)
+        # The next attempt after waiting is counted before it is checked
+        later = elapsed + wait + 0.001
+        if later < 60:
+            self.assertTrue(self._allowed(current + 1, previous, later, limit))
+            self.assertFalse(
+                self._allowed(current + 1, previous, later - 1, limit)
+            )
+        else:
+            self.assertTrue(
+                self._allowed(1, current, later - 60, limit), (current, wait)
+            )
+
+    def test_allowed_within_limit(self) -> None:
+        self.assertEqual(self.limiter._retry_after(3, 0, 10, 5), 0)
+
+    def test_previous_window_decay(self) -> None:
+        self.assert_retry_is_allowed(3, 10, 10, 5)
+
+    def test_current_window_at_limit(self) -> None:
+        self.assert_retry_is_allowed(5, 4, 10, 5)
+
+    def test_current_window_over_limit(self) -> None:
+        self.assert_retry_is_allowed(8, 0, 10, 5)
+
+
+class DependencyTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        rate_limit._limiter = None
+        self.connections = 0
+
+        async def connection() -> None:  # noqa: RUF029
+            self.connections += 1
+
+        app = fastapi.FastAPI()
+
+        @app.post(
+            '/attempt',
+            dependencies=[fastapi.Depends(rate_limit.limit('test'))],
+        )
+        async def attempt(_: None = fastapi.Depends(connection)) -> dict:
+            return {}
+
+        self.client = testclient.TestClient(app)
+
+    def tearDown(self) -> None:
+        rate_limit._limiter = None
+
+    def test_rejected_before_connection_is_taken(self) -> None:
+        env = {'RATE_LIMIT_EMAIL_LIMIT': '2', 'RATE_LIMIT_IP_LIMIT': '100'}
+        with mock.patch.dict(os.environ, env):
+            for _ in range(2):
+                response = self.client.post(
+                    '/attempt', json={'email': 'Poet@example.com'}
+                )
+                self.assertEqual(response.status_code, 200)
+            response = self.client.post(
+                '/attempt', json={'email': 'poet@example.com'}
+            )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response.headers)
+        self.assertEqual(self.connections, 2)
@@ -0,0 +1,233 @@
+import datetime
+import io
+import json
+import random
+import time
+import unittest
+import uuid
+
+import fastapi
+
+from emuse import importer, models
+from emuse.endpoints import poems
+from emuse.models import friendship, poem, revision
+from tests import benchmarks, fakes
+
+NOW = datetime.datetime(2026, 1, 2, tzinfo=datetime.UTC)
+
+
+def _poem(lines: int, seed: int = 1) -> str:
+    words = random.Random(seed).choices(
+        ['moon', 'river', 'ash', 'quiet', 'salt', 'winter', 'lamp'],
+        k=lines * 6,
+    )
+    return ''.join(
+        ' '.join(words[i : i + 6]) + '\n' for i in range(0, len(words), 6)
+    )
+
+
+def _edit(text: str, seed: int) -> str:
+    lines = text.splitlines(keepends=True)
+    index = random.Random(seed).randrange(len(lines))
+    lines[index] = f'edited line {seed}\n'
+    return ''.join(lines)
+
+
+class DiffTestCase(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        base = _poem(40)
+        target = _edit(_edit(base, 1), 2) + 'a new last line'
+        self.assertEqual(
+            revision.patch(base, revision.diff(base, target)), target
+        )
+
+    def test_unchanged_lines_are_copied(self) -> None:
+        base = _poem(40)
+        delta = revision.diff(base, _edit(base, 1))
+        self.assertEqual(sum(isinstance(op, str) for op in delta), 1)
+
+    def test_empty_texts(self) -> None:
+        self.assertEqual(revision.patch('', revision.diff('', 'new')), 'new')
+        self.assertEqual(revision.patch('old', revision.diff('old', '')), '')
+
+
+class _Store:
+    """Keeps revision rows in memory, answering _CHAIN_SQL and _INSERT_SQL"""
+
+    def __init__(self) -> None:
+        self.rows: list[dict] = []
+
+    def connection(self) -> fakes.Connection:
+        chain = []
+        for row in reversed(self.rows):
+            chain.insert(0, row)
+            if row['snapshot']:
+                break
+        # The lock, the chain, then the insert
+        return fakes.Connection([], [dict(row) for row in chain], [])
+
+    def insert(self, postgres: fakes.Connection) -> dict:
+        params = postgres.executed[-1][1]
+        row = {
+            'revision': params['revision'],
+            'created_at': NOW,
+            'snapshot': params['snapshot'],
+            'data': json.loads(json.dumps(params['data'].obj)),
+        }
+        self.rows.append(row)
+        return row
+
+
+class RecordTestCase(unittest.IsolatedAsyncioTestCase):
+    async def _record_history(self, versions: list[str]) -> list[dict]:
+        store = _Store()
+        for content in versions:
+            postgres = store.connection()
+            await revision.record(postgres, uuid.uuid4(), content, None)
+            store.insert(postgres)
+        return store.rows
+
+    async def test_edits_are_stored_as_deltas(self) -> None:
+        versions = [_poem(60)]
+        for seed in range(5):
+            versions.append(_edit(versions[-1], seed))
+        rows = await self._record_history(versions)
+        self.assertEqual([row['revision'] for row in rows], [1, 2, 3, 4, 5, 6])
+        self.assertEqual(
+            [row['snapshot'] for row in rows], [True] + [False] * 5
+        )
+        snapshot = len(json.dumps(rows[0]['data']))
+        for row in rows[1:]:
+            self.assertLess(len(json.dumps(row['data'])) * 10, snapshot)
+
+    async def test_snapshots_bound_the_chain(self) -> None:
+        versions = [_poem(60)]
+        for seed in range(24):
+            versions.append(_edit(versions[-1], seed))
+        rows = await self._record_history(versions)
+        snapshots = [row['revision'] for row in rows if row['snapshot']]
+        self.assertEqual(snapshots, [1, 21])
+
+    async def test_rewrites_are_stored_as_snapshots(self) -> None:
+        rows = await self._record_history([_poem(30, 1), _poem(30, 2)])
+        self.assertEqual([row['snapshot'] for row in rows], [True, True])
+
+    async def test_reconstruction(self) -> None:
+        versions = [_poem(60)]
+        for seed in range(8):
+            versions.append(_edit(versions[-1], seed))
+        rows = await self._record_history(versions)
+        poem_id = uuid.uuid4()
+        for number in (1, 5, 9):
+            postgres = fakes.Connection(rows[:number])
+            value = await revision.get(postgres, poem_id, number)
+            self.assertEqual(value.content, versions[number - 1])
+            self.assertEqual(value.revision, number)
+
+
+class UpdateTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_edits_are_recorded_as_deltas(self) -> None:
+        owner, poem_id = uuid.uuid4(), uuid.uuid4()
+        before = _poem(60)
+        after = _edit(before, 1)
+        version = models.PoemVersion(
+            id=poem_id,
+            owner=owner,
+            privacy_level=models.PrivacyLevel.private,
+            updated_at=NOW,
+        )
+        previous = {
+            'revision': 1,
+            'created_at': NOW,
+            'snapshot': True,
+            'data': {'content': before, 'notes': None},
+        }
+        postgres = fakes.Connection([version], [], [previous], [], [])
+        result = await poems.update_poem(
+            poem_id,
+            poems.PoemText(content=after),
+            postgres,
+            friendship.Viewer(owner),
+        )
+        self.assertEqual(result.revision, 2)
+        insert, update = postgres.executed[-2:]
+        self.assertFalse(insert[1]['snapshot'])
+        self.assertEqual(
+            revision.patch(before, insert[1]['data'].obj['content']), after
+        )
+        self.assertIs(update[0], poem._UPDATE_TEXT_SQL)
+        self.assertEqual(update[1]['content'], after)
+
+    async def test_only_the_owner_may_edit(self) -> None:
+        version = models.PoemVersion(
+            id=uuid.uuid4(),
+            owner=uuid.uuid4(),
+            privacy_level=models.PrivacyLevel.public,
+            updated_at=NOW,
+        )
+        postgres = fakes.Connection([version])
+        with self.assertRaises(fastapi.HTTPException) as context:
+            await poems.update_poem(
+                version.id,
+                poems.PoemText(content='defaced'),
+                postgres,
+                friendship.Viewer(uuid.uuid4()),
+            )
+        self.assertEqual(context.exception.status_code, 404)
+        self.assertEqual(len(postgres.executed), 1)
+
+
+class ImportTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_imported_poems_get_a_first_revision(self) -> None:
+        postgres = fakes.Connection()
+        stream = io.StringIO(
+            '{"title": "One", "content": "first poem", "notes": "n"}\n'
+            '{"title": "Two", "content": "second poem"}\n'
+        )
+        result = await importer.import_poems(
+            postgres, uuid.uuid4(), stream, importer.Format.ndjson
+        )
+        self.assertEqual(result.imported, 2)
+        self.assertEqual(postgres.transactions, 1)
+        rows = postgres.copied[0][1]
+        params = postgres.executed[-1][1]
+        self.assertEqual(params['ids'], [row[importer._ID] for row in rows])
+        self.assertEqual(params['contents'], ['first poem', 'second poem'])
+        self.assertEqual(params['notes'], ['n', None])
+
+
+@benchmarks.opt_in
+class ReconstructionBenchmarkTestCase(unittest.TestCase):
+    """Rebuilding a revision replays at most snapshot_interval deltas"""
+
+    BUDGET = 0.005
+
+    def test_latest_of_a_long_chain(self) -> None:
+        text = _poem(300)
+        rows = [
+            {
+                'revision': 1,
+                'created_at': NOW,
+                'data': {'content': text, 'notes': None},
+            }
+        ]
+        for number in range(2, 21):
+            edited = _edit(text, number)
+            rows.append({
+                'revision': number,
+                'created_at': NOW,
+                'data': {
+                    'content': revision.diff(text, edited),
+                    'notes': None,
+                },
+            })
+            text = edited
+        start = time.perf_counter()
+        value = rows[0]['data']
+        for row in rows[1:]:
+            value = revision._apply(value, row['data'])
+        elapsed = time.perf_counter() - start
+        self.assertEqual(value['content'], text)
+        self.assertLess(elapsed, self.BUDGET)
+        stored = sum(len(json.dumps(row['data'])) for row in rows)
+        self.assertLess(stored, len(json.dumps(rows[0]['data'])) * 2)
@@ -0,0 +1,108 @@
+import asyncio
+import time
+import unittest
+import uuid
+from unittest import mock
+
+import fastapi
+from fastapi import testclient
+
+from emuse import session
+from tests import benchmarks
+
+
+def _app() -> fastapi.FastAPI:
+    app = fastapi.FastAPI()
+    app.add_middleware(session.SessionMiddleware)
+
+    @app.post('/api/login')
+    async def login(response: fastapi.Response) -> dict:
+        account_id = uuid.uuid4()
+        await session.create(response, account_id)
+        return {'account_id': str(account_id)}
+
+    @app.get('/api/whoami')
+    async def whoami(request: fastapi.Request) -> dict:
+        data = await session.current(request)
+        return {'account_id': str(data.account_id) if data else None}
+
+    @app.get('/api/ping')
+    async def ping() -> dict:
+        return {}
+
+    @app.get('/static/app.js')
+    async def static(request: fastapi.Request) -> dict:
+        return {'session': 'session_ids' in request.state._state}
+
+    return app
+
+
+class SessionMiddlewareTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.client = testclient.TestClient(_app())
+
+    def test_session_round_trip(self) -> None:
+        account_id = self.client.post('/api/login').json()['account_id']
+        response = self.client.get('/api/whoami')
+        self.assertEqual(response.json()['account_id'], account_id)
+
+    def test_anonymous_request(self) -> None:
+        response = self.client.get('/api/whoami')
+        self.assertIsNone(response.json()['account_id'])
+
+    def test_cookie_is_only_verified_when_needed(self) -> None:
+        self.client.post('/api/login')
+        with mock.patch.object(
+            session.Session.get_instance().cookie, '__call__'
+        ) as frontend:
+            self.client.get('/api/ping')
+        frontend.assert_not_called()
+
+    def test_static_requests_are_untouched(self) -> None:
+        self.assertFalse(self.client.get('/static/app.js').json()['session'])
+
+    def test_cookie_is_verified_once_per_request(self) -> None:
+        self.client.post('/api/login')
+        cls = type(session.Session.get_instance().cookie)
+        with mock.patch.object(
+            cls, '__call__', autospec=True, side_effect=cls.__call__
+        ) as call:
+            self.client.get('/api/whoami')
+        self.assertEqual(call.call_count, 1)
+
+
+@benchmarks.opt_in
+class SessionMiddlewareBenchmarkTestCase(unittest.TestCase):
+    """The middleware adds little to requests that skip the session"""
+
+    REQUESTS = 20000
+    BUDGET = 0.00002
+
+    def _overhead(self, path: str) -> float:
+        async def app(scope, receive, send) -> None:
+            pass
+
+        middleware = session.SessionMiddleware(app)
+        scopes = [
+            {'type': 'http', 'path': path, 'headers': []}
+            for _ in range(self.REQUESTS)
+        ]
+
+        async def run() -> tuple[float, float]:
+            start = time.perf_counter()
+            for scope in scopes:
+                await app(scope, None, None)
+            bare = time.perf_counter() - start
+            start = time.perf_counter()
+            for scope in scopes:
+                await middleware(scope, None, None)
+            return bare, time.perf_counter() - start
+
+        bare, wrapped = asyncio.run(run())
+        return (wrapped - bare) / self.REQUESTS
+
+    def test_static_overhead(self) -> None:
+        self.assertLess(self._overhead('/static/app.js'), self.BUDGET)
+
+    def test_api_overhead(self) -> None:
+        self.assertLess(self._overhead('/api/ping'), self.BUDGET)
@@ -0,0 +1,58 @@
+import datetime
+import gzip
+import unittest
+import uuid
+
+from emuse.endpoints import sitemap
+from tests import fakes
+
+NOW = datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.UTC)
+
+
+def _chunk(kind: str, count: int) -> sitemap.Chunk:
+    first, last = sorted((uuid.uuid4(), uuid.uuid4()))
+    return sitemap.Chunk(
+        kind=kind, first=first, last=last, count=count, lastmod=NOW
+    )
+
+
+class ChunksTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        sitemap._chunks.clear()
+
+    def tearDown(self) -> None:
+        sitemap._chunks.clear()
+
+    async def test_boundaries_are_read_by_keyset(self) -> None:
+        full, partial = _chunk('poems', 2), _chunk('poems', 1)
+        authors = _chunk('authors', 2)
+        postgres = fakes.Connection([full], [partial], [authors], [])
+        chunks = await sitemap._get_chunks(postgres, 2)
+        self.assertEqual(chunks, [full, partial, authors])
+        afters = [params['after'] for _, params in postgres.executed]
+        self.assertEqual(
+            afters,
+            [uuid.UUID(int=0), full.last, uuid.UUID(int=0), authors.last],
+        )
+
+    async def test_chunks_are_cached(self) -> None:
+        postgres = fakes.Connection([_chunk('poems', 1)], [])
+        first = await sitemap._get_chunks(postgres, 10)
+        self.assertIs(await sitemap._get_chunks(postgres, 10), first)
+        self.assertEqual(len(postgres.executed), 2)
+
+
+class StreamTestCase(unittest.IsolatedAsyncioTestCase):
+    async def test_urls_point_at_the_spa_routes(self) -> None:
+        sitemap._files.clear()
+        poem_id = uuid.uuid4()
+        chunk = _chunk('poems', 1)
+        pool = fakes.Pool(fakes.Connection([{'id': poem_id, 'lastmod': NOW}]))
+        parts = [
+            part
+            async for part in sitemap._stream(pool, chunk, 'https://emuse.org')
+        ]
+        body = gzip.decompress(b''.join(parts)).decode()
+        self.assertIn(f'<loc>https://emuse.org/poems/{poem_id}</loc>', body)
+        self.assertIn('<lastmod>2026-01-02T03:04:05+00:00</lastmod>', body)
+        self.assertEqual(sitemap._files.get(chunk.key), b''.join(parts))
@@ -0,0 +1,43 @@
+import pathlib
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+from emuse import template
+
+
+class CompiledTemplatesTestCase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp = pathlib.Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.temp)
+        self.sources = self.temp / 'templates'
+        shutil.copytree(template.TEMPLATE_PATH, self.sources)
+        self.compiled = self.temp / 'compiled'
+        patcher = mock.patch.object(template, 'TEMPLATE_PATH', self.sources)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        template.compile_templates(self.compiled)
+
+    def test_current_after_compiling(self) -> None:
+        self.assertTrue(template._compiled_is_current(self.compiled))
+
+    def test_stale_after_a_source_changes(self) -> None:
+        source = next(path for path in self.sources.rglob('*.j2'))
+        source.write_text(source.read_text() + '\n')
+        self.assertFalse(template._compiled_is_current(self.compiled))
+
+    def test_stale_without_a_manifest(self) -> None:
+        (self.compiled / template.SOURCES_MANIFEST).unlink()
+        self.assertFalse(template._compiled_is_current(self.compiled))
+
+    def test_stale_templates_are_not_loaded(self) -> None:
+        source = next(path for path in self.sources.rglob('*.j2'))
+        source.write_text(source.read_text() + '\n')
+        with (
+            mock.patch.object(template, 'COMPILED_PATH', self.compiled),
+            mock.patch.object(template.jinja2, 'ModuleLoader') as loader,
+        ):
+            template.initialize()
+        loader.assert_not_called()
+        template._environment = None
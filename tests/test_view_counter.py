@@ -0,0 +1,48 @@
+import contextlib
+import unittest
+import uuid
+
+import psycopg
+
+from emuse import view_counter
+
+
+class _FailingPool:
+    @contextlib.asynccontextmanager
+    async def connection(self):
+        raise psycopg.OperationalError('connection refused')
+        yield
+
+
+class FlushFailureTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.counter = view_counter.ViewCounter(
+            _FailingPool(), flush_interval=60, max_pending=3
+        )
+
+    async def test_failed_flush_keeps_views(self) -> None:
+        poem_id = uuid.uuid4()
+        self.counter.record(poem_id)
+        self.counter.record(poem_id)
+        self.assertEqual(await self.counter.flush(), 0)
+        self.assertEqual(self.counter._pending[poem_id], 2)
+
+    async def test_failed_flush_is_capped_at_max_pending(self) -> None:
+        failed = [uuid.uuid4() for _ in range(3)]
+        for poem_id in failed:
+            self.counter.record(poem_id)
+        dropped = view_counter.DROPPED.value()
+        # Fill the buffer again while the flush is failing
+        original = self.counter._restore
+
+        def restore(pending) -> None:
+            for _ in range(2):
+                self.counter.record(uuid.uuid4())
+            self.counter.record(failed[0])
+            original(pending)
+
+        self.counter._restore = restore
+        await self.counter.flush()
+        self.assertEqual(len(self.counter._pending), 3)
+        self.assertEqual(self.counter._pending[failed[0]], 2)
+        self.assertEqual(view_counter.DROPPED.value() - dropped, 2)